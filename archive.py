@@ -0,0 +1,62 @@
+import os
+import time
+import sqlite3
+import threading
+from typing import Optional, Tuple
+
+
+class DownloadArchive:
+    """Persistent index of finished downloads
+
+    Entries are keyed by (extractor, video ID) and the format profile the
+    video was downloaded with, so the same video can be archived once as MP4
+    and once as MP3. The archive, not the file system, decides whether a
+    video was downloaded: renaming or moving the file doesn't cause a
+    re-download, and two videos with the same title never shadow each other.
+    """
+    def __init__(self, db_path: str):
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.execute('''
+            CREATE TABLE IF NOT EXISTS downloads (
+                extractor TEXT NOT NULL,
+                video_id TEXT NOT NULL,
+                profile TEXT NOT NULL,
+                path TEXT,
+                downloaded_at REAL NOT NULL,
+                PRIMARY KEY (extractor, video_id, profile)
+            )
+        ''')
+        self._db.commit()
+
+    def get(self, key: Tuple[str, str], profile: str) -> Optional[str]:
+        """Return the path a video was downloaded to, or None if it wasn't"""
+        with self._lock:
+            row = self._db.execute(
+                'SELECT path FROM downloads WHERE extractor = ? AND video_id = ? AND profile = ?',
+                (key[0], key[1], profile)).fetchone()
+        if row is None:
+            return None
+        return row[0] or ''
+
+    def put(self, key: Tuple[str, str], profile: str, path: str):
+        """Record a finished download"""
+        with self._lock:
+            self._db.execute('INSERT OR REPLACE INTO downloads VALUES (?, ?, ?, ?, ?)',
+                             (key[0], key[1], profile, path, time.time()))
+            self._db.commit()
+
+    def remove(self, key: Tuple[str, str], profile: str):
+        """Forget a download so the video is fetched again"""
+        with self._lock:
+            self._db.execute('DELETE FROM downloads WHERE extractor = ? AND video_id = ? AND profile = ?',
+                             (key[0], key[1], profile))
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,231 @@
+import time
+import base64
+import socket
+import select
+import threading
+import socketserver
+import logging
+from urllib.parse import urlsplit
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger('VideoDownloader')
+
+CHUNK_SIZE = 16 * 1024
+MAX_HEADER_BYTES = 64 * 1024
+RATE_WINDOW = 2.0  # seconds of traffic the measured rate is averaged over
+
+
+class _Bucket:
+    def __init__(self, weight: float):
+        self.weight = weight
+        self.tokens = 0.0
+        self.updated = time.monotonic()
+
+
+class BandwidthGovernor:
+    """Splits one global bandwidth budget among the active downloads
+
+    Each registered job gets `limit * weight / total weight` bytes per second,
+    recomputed on every call, so shares rebalance the moment a job starts,
+    finishes or changes weight. consume() is a token bucket that lets a job go
+    into debt for the chunk it just read and then sleeps the debt off, which
+    keeps its average at its share without capping the chunk size.
+    A limit of 0 disables throttling but traffic is still measured.
+    """
+    def __init__(self, limit: float = 0, burst: float = 0.25):
+        self.limit = limit
+        self.burst = burst  # seconds of its share a job may save up
+        self._cond = threading.Condition()
+        self._jobs: Dict[Any, _Bucket] = {}
+        self._total_weight = 0.0
+        self._window_start = time.monotonic()
+        self._window_bytes = 0
+        self._rate = 0.0
+
+    def register(self, job, weight: float = 1.0):
+        """Start sharing the budget with a job"""
+        with self._cond:
+            if job not in self._jobs:
+                self._jobs[job] = _Bucket(max(weight, 0.01))
+                self._total_weight += self._jobs[job].weight
+            self._cond.notify_all()
+
+    def unregister(self, job):
+        """Give a finished job's share back to the others"""
+        with self._cond:
+            bucket = self._jobs.pop(job, None)
+            if bucket is not None:
+                self._total_weight -= bucket.weight
+            self._cond.notify_all()
+
+    def set_weight(self, job, weight: float):
+        with self._cond:
+            bucket = self._jobs.get(job)
+            if bucket is not None:
+                self._total_weight += max(weight, 0.01) - bucket.weight
+                bucket.weight = max(weight, 0.01)
+            self._cond.notify_all()
+
+    def set_limit(self, limit: float):
+        """Change the global budget in bytes per second; 0 for unlimited"""
+        with self._cond:
+            self.limit = max(0, limit)
+            self._cond.notify_all()
+
+    def share(self, job=None) -> float:
+        """Bytes per second a job may use now, or the split for one more job"""
+        with self._cond:
+            return self._share(job)
+
+    def _share(self, job) -> float:
+        if self.limit <= 0:
+            return 0.0
+        bucket = self._jobs.get(job)
+        if bucket is None:
+            return self.limit / (len(self._jobs) + 1) if self._jobs else self.limit
+        return self.limit * bucket.weight / self._total_weight
+
+    def consume(self, job, amount: int):
+        """Account for bytes a job moved, sleeping as long as its share requires"""
+        with self._cond:
+            self._measure(amount)
+            while self.limit > 0:
+                bucket = self._jobs.get(job)
+                if bucket is None:
+                    return  # not a registered download; don't hold it up
+                now = time.monotonic()
+                rate = self._share(job)
+                bucket.tokens = min(rate * self.burst, bucket.tokens + rate * (now - bucket.updated))
+                bucket.updated = now
+                if bucket.tokens > 0:
+                    bucket.tokens -= amount
+                    return
+                # Sleep off the debt; a rebalance wakes us early to recompute
+                self._cond.wait(-bucket.tokens / rate)
+
+    def _measure(self, amount: int):
+        """Fold traffic into the measured aggregate rate (lock held)"""
+        now = time.monotonic()
+        self._window_bytes += amount
+        elapsed = now - self._window_start
+        if elapsed >= RATE_WINDOW:
+            self._rate = self._window_bytes / elapsed
+            self._window_start = now
+            self._window_bytes = 0
+
+    def rate(self) -> float:
+        """Measured aggregate rate in bytes per second over the last window"""
+        with self._cond:
+            elapsed = time.monotonic() - self._window_start
+            if elapsed > 2 * RATE_WINDOW:
+                return 0.0  # no traffic recently
+            if elapsed >= RATE_WINDOW / 2:
+                return self._window_bytes / elapsed
+            return self._rate
+
+
+class ThrottlingProxy:
+    """Local HTTP proxy that paces downloads through a BandwidthGovernor
+
+    yt-dlp is pointed at `proxy_url(job_id)`; the job ID travels as the proxy
+    user name, so every connection is charged to its download's share. HTTPS
+    is tunnelled with CONNECT and never decrypted; plain HTTP requests are
+    forwarded with `Connection: close`. Only the download direction is paced.
+    """
+    def __init__(self, governor: BandwidthGovernor, host: str = '127.0.0.1', port: int = 0):
+        self.governor = governor
+        proxy = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                proxy._handle(self.request)
+
+        self._server = socketserver.ThreadingTCPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self._server.server_address[:2]
+
+    def proxy_url(self, job_id: str) -> str:
+        host, port = self.address
+        return f"http://{job_id}:x@{host}:{port}"
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handle(self, client: socket.socket):
+        try:
+            head, rest = self._read_head(client)
+            if head is None:
+                return
+            lines = head.decode('latin-1').split('\r\n')
+            method, target, version = lines[0].split(' ', 2)
+            headers = [line for line in lines[1:] if line]
+            job = self._job_of(headers)
+
+            if method.upper() == 'CONNECT':
+                host, _, port = target.rpartition(':')
+                upstream = socket.create_connection((host.strip('[]'), int(port or 443)))
+                client.sendall(b'HTTP/1.1 200 Connection Established\r\n\r\n')
+            else:
+                parts = urlsplit(target)
+                upstream = socket.create_connection((parts.hostname, parts.port or 80))
+                path = parts.path or '/'
+                if parts.query:
+                    path += '?' + parts.query
+                kept = [line for line in headers
+                        if not line.lower().startswith(('proxy-', 'connection:', 'keep-alive:'))]
+                request = '\r\n'.join([f"{method} {path} {version}"] + kept + ['Connection: close', '', ''])
+                upstream.sendall(request.encode('latin-1'))
+            if rest:
+                upstream.sendall(rest)
+            self._pipe(client, upstream, job)
+        except (OSError, ValueError) as e:
+            logger.debug(f"Proxy connection ended: {e}")
+        finally:
+            client.close()
+
+    def _read_head(self, client: socket.socket) -> Tuple[Optional[bytes], bytes]:
+        data = b''
+        while b'\r\n\r\n' not in data:
+            chunk = client.recv(CHUNK_SIZE)
+            if not chunk or len(data) > MAX_HEADER_BYTES:
+                return None, b''
+            data += chunk
+        head, _, rest = data.partition(b'\r\n\r\n')
+        return head, rest
+
+    def _job_of(self, headers) -> Optional[str]:
+        """Return the job ID sent as the proxy user name"""
+        for line in headers:
+            name, _, value = line.partition(':')
+            if name.strip().lower() == 'proxy-authorization':
+                scheme, _, credentials = value.strip().partition(' ')
+                if scheme.lower() == 'basic':
+                    try:
+                        return base64.b64decode(credentials).decode('utf-8').partition(':')[0]
+                    except ValueError:
+                        return None
+        return None
+
+    def _pipe(self, client: socket.socket, upstream: socket.socket, job: Optional[str]):
+        """Copy bytes both ways until either side closes, pacing the download side"""
+        try:
+            sockets = [client, upstream]
+            while True:
+                readable, _, _ = select.select(sockets, [], [])
+                for sock in readable:
+                    chunk = sock.recv(CHUNK_SIZE)
+                    if not chunk:
+                        return
+                    if sock is upstream:
+                        self.governor.consume(job, len(chunk))
+                        client.sendall(chunk)
+                    else:
+                        upstream.sendall(chunk)
+        finally:
+            upstream.close()
@@ -0,0 +1,168 @@
+"""Scripted stand-in for the yt-dlp executable
+
+Understands the invocations the engine makes (--version, --flat-playlist,
+--dump-json --batch-file -, downloads with --progress-template, --print and
+--output) and answers them without touching the network. Behaviour is set
+through environment variables so every run of a benchmark is identical:
+
+- FAKE_YTDLP_STARTUP: seconds of simulated interpreter/extractor startup
+- FAKE_YTDLP_EXTRACT: seconds spent extracting each URL
+- FAKE_YTDLP_PLAYLIST_SIZE: entries listed for a playlist URL
+- FAKE_YTDLP_PROGRESS_LINES: progress lines printed per download
+- FAKE_YTDLP_PROGRESS_RATE: progress lines per second
+- FAKE_YTDLP_FILESIZE: bytes reported (and written, capped) per download
+- FAKE_YTDLP_THUMBNAIL_BASE: base URL of the thumbnail server
+- FAKE_YTDLP_FAIL: substring of URLs that fail
+"""
+import os
+import re
+import sys
+import json
+import time
+from typing import Any, Dict, List, Optional
+
+STARTUP = float(os.environ.get('FAKE_YTDLP_STARTUP', '0.05'))
+EXTRACT = float(os.environ.get('FAKE_YTDLP_EXTRACT', '0.005'))
+PLAYLIST_SIZE = int(os.environ.get('FAKE_YTDLP_PLAYLIST_SIZE', '100'))
+PROGRESS_LINES = int(os.environ.get('FAKE_YTDLP_PROGRESS_LINES', '20'))
+PROGRESS_RATE = float(os.environ.get('FAKE_YTDLP_PROGRESS_RATE', '200'))
+FILESIZE = int(os.environ.get('FAKE_YTDLP_FILESIZE', str(10 * 1024 * 1024)))
+THUMBNAIL_BASE = os.environ.get('FAKE_YTDLP_THUMBNAIL_BASE', '')
+FAIL = os.environ.get('FAKE_YTDLP_FAIL', '')
+# Files on disk stay small; only the reported size is FILESIZE
+WRITTEN_BYTES = 1024
+
+FIELD_PATTERN = re.compile(r'%\(([\w.]+)\)s')
+
+
+def option(args: List[str], name: str) -> Optional[str]:
+    """Return the value following an option, or None"""
+    if name in args:
+        index = args.index(name)
+        if index + 1 < len(args):
+            return args[index + 1]
+    return None
+
+
+def options(args: List[str], name: str) -> List[str]:
+    """Return the values of an option that may be repeated"""
+    return [args[index + 1] for index, arg in enumerate(args[:-1]) if arg == name]
+
+
+def render(template: str, fields: Dict[str, Any]) -> str:
+    """Fill %(field)s placeholders the way yt-dlp does, with NA for unknown fields"""
+    return FIELD_PATTERN.sub(lambda match: str(fields.get(match.group(1), 'NA')), template)
+
+
+def video_id(url: str) -> str:
+    match = re.search(r'(?:v=|youtu\.be/|/)([\w-]{11})(?:$|[&?#])', url)
+    return match.group(1) if match else re.sub(r'\W', '', url)[-11:]
+
+
+def info_dict(url: str) -> Dict[str, Any]:
+    """A compact but realistic --dump-json record"""
+    vid = video_id(url)
+    info = {
+        'id': vid,
+        'title': f"Benchmark video {vid}",
+        'duration': 60 + sum(map(ord, vid)) % 600,
+        'extractor_key': 'Youtube',
+        'original_url': url,
+        'webpage_url': f"https://www.youtube.com/watch?v={vid}",
+        'formats': [
+            {'format_id': '18', 'ext': 'mp4', 'height': 360, 'filesize': FILESIZE // 4},
+            {'format_id': '137', 'ext': 'mp4', 'height': 1080, 'filesize': FILESIZE},
+            {'format_id': '140', 'ext': 'm4a', 'acodec': 'mp4a.40.2', 'filesize_approx': FILESIZE // 10},
+        ],
+    }
+    if THUMBNAIL_BASE:
+        info['thumbnail'] = f"{THUMBNAIL_BASE}/{vid}.jpg"
+    return info
+
+
+def dump_batch():
+    for line in sys.stdin:
+        url = line.strip()
+        if not url:
+            continue
+        time.sleep(EXTRACT)
+        if FAIL and FAIL in url:
+            print(f"ERROR: [youtube] {video_id(url)}: Video unavailable", file=sys.stderr, flush=True)
+            continue
+        print(json.dumps(info_dict(url)), flush=True)
+
+
+def list_playlist(url: str):
+    for index in range(PLAYLIST_SIZE):
+        vid = f"pl{index:09d}"
+        print(json.dumps({'id': vid, 'title': f"Entry {index}",
+                          'url': f"https://www.youtube.com/watch?v={vid}"}), flush=True)
+
+
+def download(args: List[str], url: str) -> int:
+    if FAIL and FAIL in url:
+        time.sleep(EXTRACT)
+        print(f"ERROR: [youtube] {video_id(url)}: HTTP Error 404: Not Found", file=sys.stderr, flush=True)
+        return 1
+
+    info = info_dict(url)
+    progress_template = option(args, '--progress-template') or ''
+    if progress_template.startswith('download:'):
+        progress_template = progress_template[len('download:'):]
+    prints = options(args, '--print')
+    ext = 'mp3' if '-x' in args else 'mp4'
+    path = render(option(args, '--output') or '%(title)s [%(id)s].%(ext)s', dict(info, ext=ext))
+
+    time.sleep(EXTRACT)
+    lines = max(1, PROGRESS_LINES)
+    interval = 1.0 / PROGRESS_RATE if PROGRESS_RATE > 0 else 0
+    speed = FILESIZE / (lines * interval) if interval else FILESIZE
+    for index in range(1, lines + 1):
+        downloaded = FILESIZE * index // lines
+        if progress_template:
+            print(render(progress_template, {
+                'progress.downloaded_bytes': downloaded,
+                'progress.total_bytes': FILESIZE,
+                'progress.speed': speed,
+                'progress.eta': int((FILESIZE - downloaded) / speed) if speed else 0,
+            }), flush=True)
+        if interval:
+            time.sleep(interval)
+
+    for when, template in (value.split(':', 1) for value in prints if ':' in value):
+        if when == 'post_process':
+            print(render(template, info), flush=True)
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'wb') as out_file:
+        out_file.write(b'\0' * min(FILESIZE, WRITTEN_BYTES))
+
+    for when, template in (value.split(':', 1) for value in prints if ':' in value):
+        if when == 'after_move':
+            print(render(template, dict(info, filepath=path)), flush=True)
+    return 0
+
+
+def main(args: List[str]) -> int:
+    time.sleep(STARTUP)
+    if '--version' in args:
+        print("2099.01.01")
+        return 0
+    if '--batch-file' in args:
+        dump_batch()
+        return 0
+
+    url = args[-1] if args else ''
+    if '--flat-playlist' in args:
+        list_playlist(url)
+        return 0
+    if '--dump-json' in args:
+        print(json.dumps(info_dict(url)), flush=True)
+        return 0
+    return download(args, url)
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
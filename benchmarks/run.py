@@ -0,0 +1,398 @@
+"""Offline benchmarks for the download engine
+
+Every scenario runs in its own process against benchmarks/fake_ytdlp.py
+(and, when Pillow is installed, a local thumbnail server), with a fresh
+config directory, so results don't depend on the network or on earlier runs.
+
+    python -m benchmarks.run --sizes 100,1000 --concurrency 1,4,8 --output results.json
+    python -m benchmarks.run --compare results.json --output new.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import threading
+import subprocess
+from typing import Any, Callable, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FAKE_YTDLP = os.path.join(ROOT, 'benchmarks', 'fake_ytdlp.py')
+UI_REFRESH_INTERVAL = 0.1  # matches the GUI's PROGRESS_REFRESH_MS
+WAIT_TIMEOUT = 600  # seconds a scenario may take before it is abandoned
+# Metrics compared by --compare, and whether bigger is better
+COMPARED_METRICS = {
+    'per_second': True,
+    'seconds': False,
+    'first_item_seconds': False,
+    'latency_p50': False,
+    'latency_p99': False,
+    'thumbnail_p50': False,
+    'events_per_second': False,
+    'ui_rows_per_second': False,
+    'peak_rss_bytes': False,
+}
+
+
+def percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    """Return p50/p90/p99/max/mean of a sample"""
+    if not values:
+        return {'p50': None, 'p90': None, 'p99': None, 'max': None, 'mean': None}
+    ordered = sorted(values)
+
+    def pick(fraction: float) -> float:
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+    return {'p50': pick(0.5), 'p90': pick(0.9), 'p99': pick(0.99), 'max': ordered[-1],
+            'mean': sum(ordered) / len(ordered)}
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """Peak resident set size of this process, where the platform reports it"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+
+def test_urls(count: int, prefix: str = 'b') -> List[str]:
+    """Distinct YouTube watch URLs with 11-character IDs"""
+    return [f"https://www.youtube.com/watch?v={prefix}{index:0{11 - len(prefix)}d}" for index in range(count)]
+
+
+class Harness:
+    """A fresh engine wired to the fake yt-dlp inside a temporary directory"""
+    def __init__(self, concurrency: int = 4, thumbnails: bool = False):
+        self.directory = tempfile.mkdtemp(prefix='grabzilla-bench-')
+        # The engine keeps its caches under the config dir; start from an empty one
+        os.environ['XDG_CONFIG_HOME'] = os.path.join(self.directory, 'config')
+        os.environ['APPDATA'] = os.path.join(self.directory, 'config')
+
+        self.server = None
+        if thumbnails:
+            from benchmarks.thumbnail_server import ThumbnailServer
+            self.server = ThumbnailServer()
+            self.server.start()
+            os.environ['FAKE_YTDLP_THUMBNAIL_BASE'] = self.server.base_url
+
+        sys.path.insert(0, ROOT)
+        from engine import DownloadEngine, DownloadOptions
+        options = DownloadOptions(save_path=os.path.join(self.directory, 'downloads'),
+                                  max_workers=concurrency, ytdlp_exe=self._write_wrapper(),
+                                  fetch_thumbnails=thumbnails, backend='exe',
+                                  # The fake yt-dlp writes finished files; there are no streams to merge
+                                  ffmpeg_exe=None,
+                                  staging_path=os.path.join(self.directory, 'staging'))
+        self.engine = DownloadEngine(options)
+
+        self.events: Dict[str, int] = {}
+        self.event_times: Dict[str, Dict[Any, float]] = {}
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self.engine.add_listener(self._on_event)
+
+    def _write_wrapper(self) -> str:
+        """Write an executable that runs fake_ytdlp.py, as the engine expects a binary"""
+        if os.name == 'nt':
+            path = os.path.join(self.directory, 'yt-dlp.cmd')
+            with open(path, 'w') as wrapper:
+                wrapper.write(f'@"{sys.executable}" "{FAKE_YTDLP}" %*\n')
+        else:
+            path = os.path.join(self.directory, 'yt-dlp')
+            with open(path, 'w') as wrapper:
+                wrapper.write(f'#!/bin/sh\nexec "{sys.executable}" "{FAKE_YTDLP}" "$@"\n')
+            os.chmod(path, 0o755)
+        return path
+
+    def _on_event(self, event: str, video_info, data: Dict[str, Any]):
+        now = time.monotonic()
+        with self._changed:
+            self.events[event] = self.events.get(event, 0) + 1
+            times = self.event_times.setdefault(event, {})
+            for item in data.get('videos') or [video_info]:
+                if item is not None:
+                    times.setdefault(item, now)
+            if event == 'status':
+                times = self.event_times.setdefault(f"status:{data['status']}", {})
+                times.setdefault(video_info, now)
+            self._changed.notify_all()
+
+    def wait_for(self, predicate: Callable[[], bool], timeout: float = WAIT_TIMEOUT) -> bool:
+        """Wait until predicate() holds; it is checked after every event"""
+        with self._changed:
+            return self._changed.wait_for(predicate, timeout)
+
+    def times(self, event: str) -> Dict[Any, float]:
+        return self.event_times.get(event, {})
+
+    def close(self):
+        self.engine.close()
+        if self.server is not None:
+            self.server.stop()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def bench_add_video(size: int, concurrency: int, thumbnails: bool) -> Dict[str, Any]:
+    """Queue URLs one at a time through add_video()"""
+    harness = Harness(concurrency)
+    from engine import VideoInfo
+    urls = test_urls(size)
+    try:
+        start = time.perf_counter()
+        for url in urls:
+            harness.engine.add_video(VideoInfo(url=url))
+        seconds = time.perf_counter() - start
+    finally:
+        harness.close()
+    return {'items': size, 'seconds': seconds, 'per_second': size / seconds if seconds else None}
+
+
+def bench_import_urls(size: int, concurrency: int, thumbnails: bool) -> Dict[str, Any]:
+    """Import a URL file where every tenth line repeats an earlier URL"""
+    harness = Harness(concurrency)
+    urls = test_urls(size)
+    path = os.path.join(harness.directory, 'urls.txt')
+    with open(path, 'w') as url_file:
+        for index, url in enumerate(urls):
+            url_file.write(url + '\n')
+            if index % 10 == 9:
+                url_file.write(urls[index // 2] + '\n')
+    from importer import iter_links
+    try:
+        start = time.perf_counter()
+        harness.engine.import_links(iter_links(path))
+        seconds = time.perf_counter() - start
+        queued = len(harness.engine.videos)
+    finally:
+        harness.close()
+    return {'items': size, 'queued': queued, 'seconds': seconds, 'per_second': size / seconds if seconds else None}
+
+
+def bench_playlist(size: int, concurrency: int, thumbnails: bool) -> Dict[str, Any]:
+    """Expand a playlist of `size` entries"""
+    os.environ['FAKE_YTDLP_PLAYLIST_SIZE'] = str(size)
+    harness = Harness(concurrency)
+    try:
+        start = time.monotonic()
+        harness.engine.process_playlist("https://www.youtube.com/playlist?list=PLbenchmark")
+        seconds = time.monotonic() - start
+        added = harness.times('added')
+        first = min(added.values()) - start if added else None
+        queued = len(harness.engine.videos)
+    finally:
+        harness.close()
+    return {'items': queued, 'seconds': seconds, 'first_item_seconds': first,
+            'per_second': queued / seconds if seconds else None}
+
+
+def bench_metadata(size: int, concurrency: int, thumbnails: bool) -> Dict[str, Any]:
+    """Latency from queueing a video to its metadata (and thumbnail) arriving"""
+    harness = Harness(concurrency, thumbnails=thumbnails)
+    from engine import VideoInfo
+    videos = [VideoInfo(url=url) for url in test_urls(size, prefix='m')]
+    try:
+        start = time.monotonic()
+        harness.engine.add_videos(videos)
+        resolved = lambda: len(harness.times('metadata')) + len(harness.times('status:Error')) >= size
+        harness.wait_for(resolved)
+        if thumbnails:
+            harness.wait_for(lambda: len(harness.times('thumbnail')) >= len(harness.times('metadata')))
+        seconds = time.monotonic() - start
+
+        queued_at = harness.times('added')
+        latencies = [at - queued_at[video] for video, at in harness.times('metadata').items()]
+        thumbnail_latencies = [at - queued_at[video] for video, at in harness.times('thumbnail').items()]
+        result = {'items': size, 'seconds': seconds, 'per_second': size / seconds if seconds else None,
+                  'errors': len(harness.times('status:Error'))}
+        result.update({f"latency_{name}": value for name, value in percentiles(latencies).items()})
+        if thumbnails:
+            result.update({f"thumbnail_{name}": value for name, value in percentiles(thumbnail_latencies).items()})
+            result['thumbnail_requests'] = harness.server.requests
+            result['thumbnail_connections'] = harness.server.connections
+    finally:
+        harness.close()
+    return result
+
+
+def bench_end_to_end(size: int, concurrency: int, thumbnails: bool) -> Dict[str, Any]:
+    """Queue, fetch metadata for and download `size` videos"""
+    harness = Harness(concurrency, thumbnails=thumbnails)
+    from engine import VideoInfo
+    engine = harness.engine
+    videos = [VideoInfo(url=url) for url in test_urls(size, prefix='e')]
+    # All test URLs are YouTube; let the per-site limit follow the concurrency under test
+    engine.set_site_limit('youtube', concurrency)
+
+    # Drain progress like the GUI's refresh timer does
+    ui_rows = [0]
+    ui_ticks = [0]
+    stop = threading.Event()
+
+    def refresh():
+        while not stop.wait(UI_REFRESH_INTERVAL):
+            ui_rows[0] += len(engine.progress.take_dirty())
+            ui_ticks[0] += 1
+    refresher = threading.Thread(target=refresh, daemon=True)
+
+    try:
+        start = time.monotonic()
+        refresher.start()
+        engine.scheduler.hold()
+        engine.start()
+        engine.add_videos(videos)
+        engine.scheduler.release()
+        harness.wait_for(lambda: harness.events.get('finished', 0) > 0)
+        seconds = time.monotonic() - start
+        stop.set()
+        refresher.join()
+
+        events = sum(count for event, count in harness.events.items())
+        downloaded = len(harness.times('status:Downloaded'))
+        result = {'items': size, 'concurrency': concurrency, 'seconds': seconds,
+                  'per_second': downloaded / seconds if seconds else None,
+                  'downloaded': downloaded, 'failed': len(harness.times('status:Failed')),
+                  'events': events, 'events_per_second': events / seconds if seconds else None,
+                  'ui_rows_per_second': ui_rows[0] / seconds if seconds else None,
+                  'ui_rows_per_tick': ui_rows[0] / ui_ticks[0] if ui_ticks[0] else None}
+    finally:
+        stop.set()
+        harness.close()
+    return result
+
+
+SCENARIOS = {
+    'add_video': bench_add_video,
+    'import_urls': bench_import_urls,
+    'playlist': bench_playlist,
+    'metadata': bench_metadata,
+    'end_to_end': bench_end_to_end,
+}
+# Scenarios whose results depend on the worker count
+CONCURRENT_SCENARIOS = ('end_to_end',)
+
+
+def run_child(scenario: str, size: int, concurrency: int, thumbnails: bool) -> Dict[str, Any]:
+    """Run one scenario in this process and return its result"""
+    result = SCENARIOS[scenario](size, concurrency, thumbnails)
+    result['peak_rss_bytes'] = peak_rss_bytes()
+    return result
+
+
+def run_scenario(scenario: str, size: int, concurrency: int, thumbnails: bool,
+                 env: Dict[str, str]) -> Dict[str, Any]:
+    """Run one scenario in a fresh interpreter so peak RSS is its own"""
+    command = [sys.executable, '-m', 'benchmarks.run', '--child', scenario,
+               '--sizes', str(size), '--concurrency', str(concurrency)]
+    if thumbnails:
+        command.append('--thumbnails')
+    completed = subprocess.run(command, cwd=ROOT, env=env, capture_output=True, text=True)
+    record: Dict[str, Any] = {'scenario': scenario, 'size': size, 'concurrency': concurrency,
+                              'thumbnails': thumbnails}
+    if completed.returncode != 0:
+        record['error'] = completed.stderr.strip()[-2000:]
+        return record
+    record.update(json.loads(completed.stdout.strip().splitlines()[-1]))
+    return record
+
+
+def environment(args) -> Dict[str, Any]:
+    """Describe the machine and code a result file was produced with"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True,
+                                text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'fake_ytdlp': {'startup': args.startup, 'extract': args.extract,
+                       'progress_lines': args.progress_lines, 'progress_rate': args.progress_rate},
+    }
+
+
+def compare(old: Dict[str, Any], new: Dict[str, Any]) -> List[str]:
+    """Describe how each compared metric moved between two result files"""
+    def key(record):
+        return record['scenario'], record['size'], record['concurrency'], record.get('thumbnails', False)
+    baseline = {key(record): record for record in old.get('results', [])}
+    lines = []
+    for record in new.get('results', []):
+        before = baseline.get(key(record))
+        if before is None:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            old_value, new_value = before.get(metric), record.get(metric)
+            if not old_value or new_value is None:
+                continue
+            ratio = new_value / old_value
+            better = ratio > 1 if higher_is_better else ratio < 1
+            verdict = "better" if better else "worse" if ratio != 1 else "same"
+            lines.append(f"{record['scenario']:<12} size={record['size']:<7} c={record['concurrency']:<3} "
+                         f"{metric:<20} {old_value:>12.4g} -> {new_value:<12.4g} x{ratio:.2f} {verdict}")
+    return lines
+
+
+def parse_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(',') if item.strip()]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the download engine")
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help="Comma-separated scenarios to run")
+    parser.add_argument('--sizes', default='100,1000', help="Comma-separated queue sizes")
+    parser.add_argument('--concurrency', default='1,4,8', help="Comma-separated parallel download counts")
+    parser.add_argument('--thumbnails', action='store_true',
+                        help="Fetch thumbnails from a local server (needs Pillow)")
+    parser.add_argument('--startup', type=float, default=0.05, help="Fake yt-dlp startup time in seconds")
+    parser.add_argument('--extract', type=float, default=0.005, help="Fake extraction time per URL in seconds")
+    parser.add_argument('--progress-lines', type=int, default=20, help="Progress lines per fake download")
+    parser.add_argument('--progress-rate', type=float, default=200, help="Fake progress lines per second")
+    parser.add_argument('--output', help="Write results to this JSON file")
+    parser.add_argument('--compare', metavar='FILE', help="Compare the results with an earlier result file")
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    sizes = parse_list(args.sizes)
+    concurrencies = parse_list(args.concurrency)
+    if args.child:
+        print(json.dumps(run_child(args.child, sizes[0], concurrencies[0], args.thumbnails)))
+        return 0
+
+    env = dict(os.environ,
+               FAKE_YTDLP_STARTUP=str(args.startup),
+               FAKE_YTDLP_EXTRACT=str(args.extract),
+               FAKE_YTDLP_PROGRESS_LINES=str(args.progress_lines),
+               FAKE_YTDLP_PROGRESS_RATE=str(args.progress_rate))
+    results = []
+    for scenario in args.scenarios.split(','):
+        for size in sizes:
+            for concurrency in (concurrencies if scenario in CONCURRENT_SCENARIOS else concurrencies[:1]):
+                record = run_scenario(scenario, size, concurrency, args.thumbnails, env)
+                results.append(record)
+                summary = record.get('error') or f"{record.get('seconds', 0):.3f}s"
+                print(f"{scenario:<12} size={size:<7} c={concurrency:<3} {summary}", file=sys.stderr)
+
+    report = {'environment': environment(args), 'results': results}
+    if args.output:
+        with open(args.output, 'w') as out_file:
+            json.dump(report, out_file, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.compare:
+        with open(args.compare, 'r') as baseline_file:
+            for line in compare(json.load(baseline_file), report):
+                print(line, file=sys.stderr)
+    return 0 if all('error' not in record for record in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
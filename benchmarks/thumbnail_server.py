@@ -0,0 +1,68 @@
+import threading
+from io import BytesIO
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+
+def make_jpeg(size=(480, 360)) -> bytes:
+    """Render a YouTube-sized test thumbnail"""
+    from PIL import Image
+    img = Image.new('RGB', size)
+    # A gradient so the JPEG isn't trivially small
+    img.putdata([(x % 256, y % 256, (x + y) % 256) for y in range(size[1]) for x in range(size[0])])
+    buffer = BytesIO()
+    img.save(buffer, 'JPEG', quality=85)
+    return buffer.getvalue()
+
+
+class ThumbnailServer:
+    """Local keep-alive HTTP server that answers every GET with the same JPEG
+
+    Counts requests and TCP connections so a benchmark can check how well the
+    client reuses connections.
+    """
+    def __init__(self, body: Optional[bytes] = None, delay: float = 0.0):
+        self.body = body if body is not None else make_jpeg()
+        self.delay = delay
+        self.requests = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def setup(self):
+                super().setup()
+                with server._lock:
+                    server.connections += 1
+
+            def do_GET(self):
+                with server._lock:
+                    server.requests += 1
+                if server.delay:
+                    threading.Event().wait(server.delay)
+                self.send_response(200)
+                self.send_header('Content-Type', 'image/jpeg')
+                self.send_header('Content-Length', str(len(server.body)))
+                self.end_headers()
+                self.wfile.write(server.body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
@@ -0,0 +1,134 @@
+import sys
+import json
+import time
+import threading
+import logging
+from typing import Any, Dict, Iterable, Optional, TextIO
+from config import DEFAULT_SAVE_PATH
+from engine import DownloadEngine, DownloadOptions, VideoInfo, format_duration
+from importer import iter_links
+from startup import startup_timer
+
+logger = logging.getLogger('VideoDownloader')
+
+
+class JsonLinesReporter:
+    """Write engine events and download progress as one JSON object per line"""
+    def __init__(self, engine: DownloadEngine, stream: TextIO = sys.stdout):
+        self.engine = engine
+        self.stream = stream
+        self._lock = threading.Lock()
+
+    def write(self, record: Dict[str, Any]):
+        record.setdefault('time', round(time.time(), 3))
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            self.stream.write(line + '\n')
+            self.stream.flush()
+
+    def on_event(self, event: str, video_info: Optional[VideoInfo], data: Dict[str, Any]):
+        if event == 'added':
+            for added in data['videos']:
+                self.write({'event': 'added', 'id': added.id, 'url': added.url})
+            return
+        record: Dict[str, Any] = {'event': event}
+        if video_info is not None:
+            record['id'] = video_info.id
+            record['url'] = video_info.url
+            if event == 'metadata':
+                record['title'] = video_info.title
+                record['duration'] = format_duration(video_info.duration)
+        record.update(data)
+        self.write(record)
+
+    def report_progress(self):
+        """Write one line per download whose progress changed since the last call"""
+        for video_info, state in self.engine.progress.take_dirty():
+            self.write({
+                'event': 'progress',
+                'id': video_info.id,
+                'url': video_info.url,
+                'percent': round(state.percent, 1) if state.percent is not None else None,
+                'downloaded': state.downloaded,
+                'total': state.total,
+                'speed': state.speed,
+                'eta': state.eta,
+            })
+
+
+def read_links(args) -> Iterable[str]:
+    """Yield URLs from the command line, an input file and/or stdin"""
+    for url in args.urls:
+        yield url
+    if args.input and args.input != '-':
+        # Text, CSV, JSON-lines and OPML files, gzipped or not
+        yield from iter_links(args.input)
+    elif args.input == '-' or (not args.urls and not sys.stdin.isatty()):
+        for line in sys.stdin:
+            yield line
+
+
+def run_headless(args) -> int:
+    """Download the given URLs without a GUI; returns the process exit code"""
+    options = DownloadOptions(
+        save_path=args.output or DEFAULT_SAVE_PATH,
+        staging_path=args.staging_dir or None,
+        audio_only=args.audio_only,
+        quality=args.quality,
+        expand_playlists=not args.no_playlist,
+        max_workers=args.parallel,
+        bandwidth_limit=args.limit_rate * 1024,
+        backend=args.ytdlp_backend,
+        fetch_thumbnails=False,
+        journal_path=args.journal,
+        metrics_path=args.metrics
+    )
+    engine = DownloadEngine(options)
+    startup_timer.mark('engine created')
+    reporter = JsonLinesReporter(engine)
+    engine.add_listener(reporter.on_event)
+
+    finished = threading.Event()
+    totals: Dict[str, int] = {}
+
+    def on_finished(event: str, video_info: Optional[VideoInfo], data: Dict[str, Any]):
+        if event == 'finished':
+            totals.update(data)
+            finished.set()
+    engine.add_listener(on_finished)
+
+    # Downloads start while the input is still being read; the hold keeps
+    # the run open until every link and playlist has been queued
+    engine.scheduler.hold()
+    try:
+        try:
+            engine.start()
+        except OSError as e:
+            engine.scheduler.release()
+            logger.error(f"Failed to create download directory: {e}")
+            reporter.write({'event': 'error', 'text': f"Failed to create download directory: {e}"})
+            return 2
+        try:
+            engine.restore()
+            startup_timer.mark('queue restored')
+            # Batched and deduplicated like a GUI import; the counts take the place of
+            # one line per invalid or duplicate link
+            links = (link for link in read_links(args) if link.strip() and not link.strip().startswith('#'))
+            counts = engine.import_links(links)
+            reporter.write({'event': 'imported', **counts})
+        finally:
+            engine.scheduler.release()
+        startup_timer.mark('input queued')
+        if args.measure_startup:
+            print(startup_timer.report(), file=sys.stderr)
+
+        while not finished.wait(args.progress_interval):
+            reporter.report_progress()
+        reporter.report_progress()
+    except KeyboardInterrupt:
+        reporter.write({'event': 'interrupted'})
+        return 130
+    finally:
+        engine.close()
+
+    return 0 if totals.get('failed', 0) == 0 else 1
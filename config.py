@@ -0,0 +1,87 @@
+import os
+from urls import URL_PATTERNS
+
+# Constants
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+YTDLP_EXE = os.path.join("src", "bin", "yt-dlp.exe")
+YTDLP_URL = "https://github.com/yt-dlp/yt-dlp/releases/latest/download/yt-dlp.exe"
+YTDLP_RELEASE_API = "https://api.github.com/repos/yt-dlp/yt-dlp/releases/latest"
+# "module" runs the yt_dlp package in warm worker processes, "exe" starts YTDLP_EXE
+# for every call, "auto" uses the package when it is installed
+YTDLP_BACKEND = "auto"
+if os.name == 'nt':  # Windows
+    CONFIG_DIR = os.path.join(os.environ.get('APPDATA', os.path.expanduser('~')), 'VideoDownloader')
+    DEFAULT_SAVE_PATH = os.path.join(os.environ.get('USERPROFILE', os.path.expanduser('~')), 'Desktop', 'VideoDownloader')
+else:  # macOS/Linux
+    CONFIG_DIR = os.path.join(os.environ.get('XDG_CONFIG_HOME', os.path.expanduser('~/.config')), 'VideoDownloader')
+    DEFAULT_SAVE_PATH = os.path.join(os.environ.get('HOME', os.path.expanduser('~')), 'Desktop', 'VideoDownloader')
+# Downloads are written here and moved into the save path once finished, so a slow
+# (e.g. network) save path only sees whole files; put it on a fast local disk
+DOWNLOAD_STAGING_PATH = os.path.join(CONFIG_DIR, 'staging')
+# Downloads only start while the disk has room for them beyond this many bytes,
+# which also leaves room for merging streams that are already downloaded
+DISK_RESERVE_BYTES = 1024 * 1024 * 1024
+DISK_UNKNOWN_JOB_SIZE = 512 * 1024 * 1024  # assumed size of a download whose metadata gives none
+DISK_RECHECK_INTERVAL = 30  # seconds a download that didn't fit waits before trying again
+METADATA_CACHE_PATH = os.path.join(CONFIG_DIR, 'metadata.sqlite3')
+THUMBNAIL_DIR = os.path.join(CONFIG_DIR, 'thumbnails')
+DOWNLOAD_ARCHIVE_PATH = os.path.join(CONFIG_DIR, 'archive.sqlite3')
+# Metrics snapshot written after each run; .prom for Prometheus text, anything else for JSON
+METRICS_PATH = os.path.join(CONFIG_DIR, 'metrics.prom')
+JOB_JOURNAL_PATH = os.path.join(CONFIG_DIR, 'jobs.jsonl')
+# Installed and latest yt-dlp versions, so launches don't probe the executable or GitHub every time
+VERSION_CACHE_PATH = os.path.join(CONFIG_DIR, 'ytdlp_version.json')
+VERSION_CHECK_TTL = 24 * 60 * 60  # seconds between checks for a new yt-dlp release
+# JSON-lines log, written by one background thread and rotated by size and by day
+LOG_PATH = os.path.join(CONFIG_DIR, 'logs', 'video_downloader.jsonl')
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+LOG_ROTATE_INTERVAL = 24 * 60 * 60  # seconds
+LOG_QUEUE_SIZE = 10000  # records waiting for the writer; more are dropped, not waited for
+LOG_MAX_MESSAGE_CHARS = 4000  # longer messages (yt-dlp stderr dumps) keep only their start and end
+JOURNAL_PROGRESS_INTERVAL = 5  # seconds between journaled byte offsets of a download
+THUMBNAIL_SIZE = (90, 50)
+THUMBNAIL_CACHE_MAX_BYTES = 50 * 1024 * 1024
+METADATA_CACHE_TTL = 7 * 24 * 60 * 60  # seconds
+METADATA_CACHE_MAX_ENTRIES = 50000
+DEFAULT_QUALITY = "Best"
+QUALITY_CHOICES = ["Best", "1080p", "720p", "480p", "360p"]
+# yt-dlp output template; the ID keeps videos with the same title apart
+OUTPUT_TEMPLATE = "%(title)s [%(id)s].%(ext)s"
+MAX_CONCURRENT_DOWNLOADS = 4
+# Per-site download limits, keyed like URL_PATTERNS; unknown sites only share the global limit
+SITE_DOWNLOAD_LIMITS = {platform: 2 for platform in URL_PATTERNS}
+# Retries: attempts per job, and backoff in seconds (doubling per attempt, with jitter)
+MAX_DOWNLOAD_ATTEMPTS = 4
+MAX_METADATA_ATTEMPTS = 3
+RETRY_BASE_DELAY = 2
+RATE_LIMIT_BASE_DELAY = 30  # rate-limited failures back off from here instead
+RETRY_MAX_DELAY = 600
+# A site whose attempts fail this often (or that rate limits) gets its concurrency halved
+BREAKER_WINDOW = 20  # recent attempts per site the failure rate is taken over
+BREAKER_FAILURE_RATE = 0.5
+BREAKER_COOLDOWN = 60  # seconds a tripped site rests, doubling on every trip in a row
+BREAKER_RECOVERY = 5  # successes in a row before a site gets one more slot back
+# Concurrent fragments per DASH/HLS download, tuned per site between jobs by hill climbing
+FRAGMENTS_START = 4
+FRAGMENTS_MAX = 16
+FRAGMENT_CONNECTION_BUDGET = 32  # fragment connections shared by all running downloads
+FRAGMENT_TUNE_MIN_BYTES = 8 * 1024 * 1024  # shorter transfers are too noisy to tune on
+# Merging and MP3 extraction run in their own stage with ffmpeg, so download slots don't wait
+# on them; without ffmpeg on PATH yt-dlp post-processes inside the download instead
+FFMPEG_EXE = "ffmpeg"
+POSTPROCESS_WORKERS = os.cpu_count() or 2  # ffmpeg processes at once
+POSTPROCESS_QUEUE_SIZE = 2 * POSTPROCESS_WORKERS  # finished transfers that may wait for ffmpeg
+BANDWIDTH_LIMIT = 0  # bytes per second shared by all downloads; 0 for unlimited
+METADATA_BATCH_SIZE = 20  # URLs per yt-dlp metadata process
+METADATA_FLUSH_LATENCY = 0.5  # seconds a partial batch may wait for more URLs
+METADATA_MAX_PROCESSES = 2
+THUMBNAIL_WORKERS = 4
+PREFETCH_AHEAD = 10  # videos next in download order whose metadata is fetched before off-screen rows
+PLAYLIST_BATCH_SIZE = 50  # playlist entries added to the queue at once
+PLAYLIST_FLUSH_LATENCY = 0.25  # seconds listed entries may wait before they're added
+IMPORT_BATCH_SIZE = 1000  # imported URLs added to the queue at once
+HTTP_MAX_CONNECTIONS_PER_HOST = 4
+HTTP_MAX_CONCURRENCY = 8
+HTTP_TIMEOUT = 15  # seconds
+HTTP_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
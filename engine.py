@@ -0,0 +1,1359 @@
+import os
+import subprocess
+import threading
+import json
+import time
+import uuid
+import logging
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from config import (YTDLP_EXE, YTDLP_BACKEND, YTDLP_URL, YTDLP_RELEASE_API, DEFAULT_SAVE_PATH, DEFAULT_QUALITY,
+                    OUTPUT_TEMPLATE, BANDWIDTH_LIMIT, DOWNLOAD_ARCHIVE_PATH, METADATA_CACHE_PATH, METADATA_CACHE_TTL, METADATA_CACHE_MAX_ENTRIES,
+                    THUMBNAIL_DIR, THUMBNAIL_SIZE, THUMBNAIL_CACHE_MAX_BYTES, MAX_CONCURRENT_DOWNLOADS,
+                    SITE_DOWNLOAD_LIMITS, METADATA_BATCH_SIZE, METADATA_FLUSH_LATENCY,
+                    METADATA_MAX_PROCESSES, THUMBNAIL_WORKERS, PLAYLIST_BATCH_SIZE, IMPORT_BATCH_SIZE,
+                    PLAYLIST_FLUSH_LATENCY, JOURNAL_PROGRESS_INTERVAL, HTTP_MAX_CONNECTIONS_PER_HOST,
+                    HTTP_MAX_CONCURRENCY, HTTP_TIMEOUT, HTTP_USER_AGENT, PREFETCH_AHEAD,
+                    MAX_DOWNLOAD_ATTEMPTS, MAX_METADATA_ATTEMPTS, RETRY_BASE_DELAY, RATE_LIMIT_BASE_DELAY,
+                    RETRY_MAX_DELAY, BREAKER_WINDOW, BREAKER_FAILURE_RATE, BREAKER_COOLDOWN, BREAKER_RECOVERY,
+                    VERSION_CACHE_PATH, VERSION_CHECK_TTL, FRAGMENTS_START, FRAGMENTS_MAX,
+                    FRAGMENT_CONNECTION_BUDGET, FRAGMENT_TUNE_MIN_BYTES, FFMPEG_EXE, POSTPROCESS_WORKERS,
+                    POSTPROCESS_QUEUE_SIZE, DOWNLOAD_STAGING_PATH, DISK_RESERVE_BYTES, DISK_UNKNOWN_JOB_SIZE,
+                    DISK_RECHECK_INTERVAL)
+from scheduler import DownloadScheduler
+from metadata import MetadataBatcher, MetadataCache
+from archive import DownloadArchive
+from bandwidth import BandwidthGovernor, ThrottlingProxy
+from fragments import FragmentTuner
+from http_pool import HttpClient
+from metrics import Metrics
+from postprocess import (RAW_OUTPUT_TEMPLATE, PostProcessPool, extract_mp3_args, ffmpeg_available, final_path,
+                         merge_args, order_streams, run_ffmpeg)
+from prefetch import PrefetchExecutor
+from storage import DiskBudget, estimate_size, publish
+from retry import PERMANENT, RATE_LIMITED, SiteBreaker, backoff_delay, classify_error
+from ytdlp_pool import WorkerError, YtdlpError, YtdlpWorkerPool, ytdlp_module_available
+from logs import log_context
+from journal import JobJournal, QUEUED, METADATA, DOWNLOADING, POSTPROCESSING, DONE, FAILED, REMOVED
+from progress import (PROGRESS_TEMPLATE, POSTPROCESS_TEMPLATE, FILEPATH_TEMPLATE, STREAM_TEMPLATE, ProgressTable,
+                      is_postprocessing_line, parse_filepath_line, parse_progress_line, parse_stream_line)
+from version_cache import VersionCache
+from urls import canonical_url, extract_video_id, get_site, is_playlist, is_valid_link, match_video
+
+logger = logging.getLogger('VideoDownloader')
+
+FORMAT_SPECS = {
+    "Best": "bestvideo+bestaudio[ext=m4a]/best",
+    "1080p": "bestvideo[height<=1080]+bestaudio[ext=m4a]/best[height<=1080]",
+    "720p": "bestvideo[height<=720]+bestaudio[ext=m4a]/best[height<=720]",
+    "480p": "bestvideo[height<=480]+bestaudio[ext=m4a]/best[height<=480]",
+    "360p": "bestvideo[height<=360]+bestaudio[ext=m4a]/best[height<=360]",
+}
+SUCCESS_STATUSES = ("Downloaded", "Already Downloaded")
+FAILURE_STATUSES = ("Failed", "Error")
+# Statuses that end a job, as recorded in the job journal
+JOURNAL_STATES = {status: DONE for status in SUCCESS_STATUSES}
+JOURNAL_STATES.update({status: FAILED for status in FAILURE_STATUSES})
+
+
+def format_duration(duration) -> str:
+    """Format a duration in seconds as [h:]mm:ss"""
+    if not duration:
+        return "Unknown"
+    duration = int(duration)
+    if duration > 3600:  # More than an hour
+        return f"{duration // 3600}:{(duration % 3600) // 60:02d}:{duration % 60:02d}"
+    return f"{duration // 60}:{duration % 60:02d}"
+
+
+class VideoInfo:
+    """Class to store video information"""
+    def __init__(self, url: str, title: str = "", duration: int = 0,
+                 thumbnail_url: str = "", thumbnail_path: str = "",
+                 status: str = "Pending"):
+        self.id = uuid.uuid4().hex[:12]
+        self.url = url
+        self.title = title
+        self.duration = duration
+        self.thumbnail_url = thumbnail_url
+        self.thumbnail_path = thumbnail_path
+        self.status = status
+        self.error = ""
+        self.row = -1  # position in the queue, kept current by the engine
+        self.priority: float = 1.0  # weight of this download's bandwidth share
+        self.attempts = 0  # failed download attempts that were retried
+        self.metadata_attempts = 0  # failed metadata attempts that were retried
+        self.estimated_size: Optional[int] = None  # bytes, judged from the metadata's format list
+        self.timings: Dict[str, float] = {}  # seconds spent per phase, filled by the engine's metrics
+
+
+class DownloadOptions:
+    """Settings that control what the engine downloads and how"""
+    def __init__(self, save_path: str = DEFAULT_SAVE_PATH, audio_only: bool = False,
+                 quality: str = DEFAULT_QUALITY, expand_playlists: bool = True,
+                 max_workers: int = MAX_CONCURRENT_DOWNLOADS, ytdlp_exe: str = YTDLP_EXE,
+                 fetch_thumbnails: bool = True, use_cache: bool = True,
+                 journal_path: Optional[str] = None, use_archive: bool = True,
+                 metrics_path: Optional[str] = None, bandwidth_limit: float = BANDWIDTH_LIMIT,
+                 throttle_proxy: bool = True, backend: str = YTDLP_BACKEND,
+                 ffmpeg_exe: Optional[str] = FFMPEG_EXE,
+                 staging_path: Optional[str] = DOWNLOAD_STAGING_PATH):
+        self.save_path = save_path
+        self.audio_only = audio_only
+        self.quality = quality
+        self.expand_playlists = expand_playlists
+        self.max_workers = max_workers
+        self.ytdlp_exe = ytdlp_exe
+        self.fetch_thumbnails = fetch_thumbnails
+        self.use_cache = use_cache
+        # Where the queue is journaled so it survives restarts; None keeps it in memory
+        self.journal_path = journal_path
+        # Skip videos the download archive has already seen in the same profile
+        self.use_archive = use_archive
+        # Where a metrics snapshot is written after each run; None to skip it
+        self.metrics_path = metrics_path
+        # Bytes per second shared by all downloads (0 for unlimited), enforced
+        # through a local throttling proxy or, without it, per-process --limit-rate
+        self.bandwidth_limit = bandwidth_limit
+        self.throttle_proxy = throttle_proxy
+        # "module", "exe" or "auto"; see config.YTDLP_BACKEND
+        self.backend = backend
+        # ffmpeg for the post-processing stage; None (or ffmpeg missing) leaves it to yt-dlp
+        self.ffmpeg_exe = ffmpeg_exe
+        # Where downloads are written before being moved into save_path; None writes there directly
+        self.staging_path = staging_path
+
+
+class _DownloadRun:
+    """What a running download has reported so far"""
+    def __init__(self, fragments: int = 1):
+        self.started = time.perf_counter()
+        self.first_progress: Optional[float] = None  # when yt-dlp finished starting up and extracting
+        self.postprocess_started: Optional[float] = None
+        self.transferred: Optional[float] = None
+        self.earlier_streams = 0.0  # bytes of streams finished before the current one
+        self.output_path: Optional[str] = None
+        self.raw_paths: List[str] = []  # unmerged streams, when post-processing is a separate stage
+        self.stream_codecs: List[Tuple[str, str]] = []  # (vcodec, acodec) of each raw stream, from the executable
+        self.journaled_at = time.monotonic()
+        self.fragments = fragments  # fragments yt-dlp may fetch at once
+        self.fragmented = False  # whether the stream turned out to come in fragments
+
+    def transfer_rate(self) -> Optional[float]:
+        """Average bytes per second from the first progress update to the end of the transfer"""
+        if self.first_progress is None or not self.transferred:
+            return None
+        ended = self.postprocess_started if self.postprocess_started is not None else time.perf_counter()
+        return (self.earlier_streams + self.transferred) / max(ended - self.first_progress, 1e-3)
+
+
+class DownloadEngine:
+    """Download queue, metadata and download logic without any GUI
+
+    Front ends register listeners with add_listener(). A listener is called as
+    listener(event, video_info, data) on whichever thread produced the event,
+    so GUIs must hand it over to their own thread. Events:
+
+    - added: videos joined the queue (data: videos, in queue order)
+    - status: a video's status changed (data: status)
+    - metadata: a video's title and duration are known
+    - thumbnail: a video's thumbnail is on disk (data: path)
+    - message: something worth showing the user (data: text, alert)
+    - imported: a file import is done (data: path and the counts of import_links())
+    - finished: the download run is over (data: succeeded, failed, summary)
+
+    Download progress is not sent as events; poll `progress` instead.
+    """
+    def __init__(self, options: Optional[DownloadOptions] = None):
+        self.options = options or DownloadOptions()
+        self.videos: List[VideoInfo] = []
+        # Canonical URL -> queued video, kept in sync with self.videos
+        self.video_index: Dict[str, VideoInfo] = {}
+        self.downloading: bool = False
+        # Workers write their latest progress here; front ends poll it
+        self.progress = ProgressTable()
+
+        self._lock = threading.RLock()
+        # Per-phase timings of every job; see metrics.Metrics
+        self.metrics = Metrics()
+        self._metadata_requested: Dict[VideoInfo, float] = {}
+        # Active downloads, keyed by job ID, share the bandwidth budget by priority
+        self.governor = BandwidthGovernor(self.options.bandwidth_limit)
+        self._proxy: Optional[ThrottlingProxy] = None
+        self._listeners: List[Callable[[str, Optional[VideoInfo], Dict[str, Any]], None]] = []
+
+        self.scheduler = DownloadScheduler(
+            self.videos,
+            run_job=self.download_video,
+            site_of=lambda video_info: get_site(video_info.url),
+            max_workers=self.options.max_workers,
+            site_limits=SITE_DOWNLOAD_LIMITS,
+            on_idle=self._on_downloads_complete
+        )
+        # Concurrent fragments per download, learned per site from finished downloads
+        self.fragment_tuner = FragmentTuner(start=FRAGMENTS_START, max_fragments=FRAGMENTS_MAX,
+                                            budget=FRAGMENT_CONNECTION_BUDGET)
+        # Lowers a site's concurrency while it fails or rate limits, and restores it after
+        self.breaker = SiteBreaker(
+            SITE_DOWNLOAD_LIMITS,
+            default_limit=self.options.max_workers,
+            apply_limit=self.scheduler.set_site_limit,
+            window=BREAKER_WINDOW,
+            failure_rate=BREAKER_FAILURE_RATE,
+            cooldown=BREAKER_COOLDOWN,
+            recovery=BREAKER_RECOVERY
+        )
+        self.metadata_cache = None
+        if self.options.use_cache:
+            try:
+                self.metadata_cache = MetadataCache(METADATA_CACHE_PATH, ttl=METADATA_CACHE_TTL,
+                                                    max_entries=METADATA_CACHE_MAX_ENTRIES)
+            except Exception as e:
+                logger.error(f"Error opening metadata cache: {e}")
+        # Warm yt_dlp worker processes; the executable is used without them
+        self.workers: Optional[YtdlpWorkerPool] = None
+        if self.options.backend == 'module' or (self.options.backend == 'auto' and ytdlp_module_available()):
+            self.workers = YtdlpWorkerPool(self.options.max_workers + METADATA_MAX_PROCESSES + 1)
+        self.metadata_batcher = MetadataBatcher(
+            self.options.ytdlp_exe,
+            on_result=self.apply_metadata,
+            on_error=self.on_metadata_error,
+            batch_size=METADATA_BATCH_SIZE,
+            flush_latency=METADATA_FLUSH_LATENCY,
+            max_processes=METADATA_MAX_PROCESSES,
+            cache=self.metadata_cache,
+            cache_key=match_video,
+            metrics=self.metrics,
+            workers=self.workers
+        )
+        # Shared keep-alive connections for thumbnails, the GitHub API and updates
+        self.http = HttpClient(max_per_host=HTTP_MAX_CONNECTIONS_PER_HOST,
+                               max_concurrency=HTTP_MAX_CONCURRENCY,
+                               timeout=HTTP_TIMEOUT, user_agent=HTTP_USER_AGENT)
+        self.thumbnail_store = None
+        if self.options.fetch_thumbnails:
+            # PIL is only needed when thumbnails are shown, and only loads with the first one
+            from thumbnails import ThumbnailStore
+            self.thumbnail_store = ThumbnailStore(THUMBNAIL_DIR, size=THUMBNAIL_SIZE,
+                                                  max_bytes=THUMBNAIL_CACHE_MAX_BYTES)
+        self.archive = None
+        if self.options.use_archive:
+            try:
+                self.archive = DownloadArchive(DOWNLOAD_ARCHIVE_PATH)
+            except Exception as e:
+                logger.error(f"Error opening download archive: {e}")
+        self.journal = None
+        if self.options.journal_path:
+            try:
+                self.journal = JobJournal(self.options.journal_path)
+            except Exception as e:
+                logger.error(f"Error opening job journal: {e}")
+        # Thumbnails are fetched off the metadata reader so it keeps draining yt-dlp,
+        # by a bounded pool keyed by video so visible rows can be fetched first
+        self.thumbnail_executor = PrefetchExecutor(max_workers=THUMBNAIL_WORKERS)
+        self._visible_rows = (0, -1)  # first and last row a front end shows
+        self.version_cache = VersionCache(VERSION_CACHE_PATH, ttl=VERSION_CHECK_TTL)
+        # Downloads hand their raw streams to ffmpeg here and go on to the next job
+        self.postprocessor: Optional[PostProcessPool] = None
+        if self.options.ffmpeg_exe and ffmpeg_available(self.options.ffmpeg_exe):
+            self.postprocessor = PostProcessPool(POSTPROCESS_WORKERS, POSTPROCESS_QUEUE_SIZE, metrics=self.metrics)
+        # Downloads start only while the disks they write to have room for them
+        self.disk_budget = DiskBudget(DISK_RESERVE_BYTES, DISK_UNKNOWN_JOB_SIZE)
+
+    def add_listener(self, listener: Callable[[str, Optional[VideoInfo], Dict[str, Any]], None]):
+        """Register a callable for engine events"""
+        self._listeners.append(listener)
+
+    def emit(self, event: str, video_info: Optional[VideoInfo] = None, **data):
+        for listener in list(self._listeners):
+            try:
+                listener(event, video_info, data)
+            except Exception as e:
+                logger.error(f"Error in engine listener for {event}: {e}")
+
+    def message(self, text: str, alert: bool = False):
+        """Send a user-facing message; alerts deserve a dialog in a GUI"""
+        self.emit('message', text=text, alert=alert)
+
+    # Queue management
+
+    def add_link(self, link: str) -> str:
+        """Add a link typed or pasted by the user
+
+        Returns 'added', 'duplicate', 'invalid' or 'playlist' (the playlist is
+        expanded in the background).
+        """
+        link = link.strip()
+        if not is_valid_link(link):
+            return 'invalid'
+        # Playlist entries are deduplicated one by one as they are added
+        if is_playlist(link) and self.options.expand_playlists:
+            # Hold the run open from now, not from when the thread gets going
+            self.scheduler.hold()
+            threading.Thread(target=self._expand_playlist, args=(link,), daemon=True).start()
+            return 'playlist'
+        return 'added' if self.add_video(VideoInfo(url=link)) else 'duplicate'
+
+    def add_video(self, video_info: VideoInfo) -> bool:
+        """Queue a video and start fetching its metadata
+
+        Returns False without adding anything if the video is already queued.
+        """
+        return self.add_videos([video_info]) == 1
+
+    def add_videos(self, video_infos: List[VideoInfo]) -> int:
+        """Queue several videos with a single 'added' event
+
+        Videos already queued (or repeated within the batch) are skipped.
+        Returns the number of videos added.
+        """
+        added = self._enqueue(video_infos)
+        if not added:
+            return 0
+
+        if self.journal is not None:
+            self.journal.record_many([(video_info.id, QUEUED, {'url': video_info.url})
+                                      for video_info in added])
+        self.emit('added', videos=added)
+        for video_info in added:
+            self.fetch_metadata(video_info)
+        self.scheduler.notify(added[0].row)
+        return len(added)
+
+    def _enqueue(self, video_infos: List[VideoInfo]) -> List[VideoInfo]:
+        """Append the videos not queued yet and return them"""
+        added = []
+        with self._lock:
+            for video_info in video_infos:
+                key = canonical_url(video_info.url)
+                if key in self.video_index:
+                    continue
+                self.video_index[key] = video_info
+                video_info.row = len(self.videos)
+                self.videos.append(video_info)
+                added.append(video_info)
+        return added
+
+    def restore(self) -> int:
+        """Re-queue the unfinished jobs of a previous session from the journal
+
+        Videos whose metadata was already fetched keep it. Downloads that
+        were interrupted resume from yt-dlp's .part files, because the output
+        template names them after the video's title and ID as before.
+        Returns the number of videos restored.
+        """
+        if self.journal is None:
+            return 0
+        video_infos = []
+        interrupted = 0
+        for job in self.journal.jobs():
+            video_info = VideoInfo(url=job['url'], title=job.get('title', ''),
+                                   duration=job.get('duration', 0),
+                                   thumbnail_url=job.get('thumbnail_url') or '')
+            video_info.id = job['id']
+            if job.get('state') in (DOWNLOADING, POSTPROCESSING):
+                interrupted += 1
+            video_infos.append(video_info)
+
+        added = self._enqueue(video_infos)
+        if not added:
+            return 0
+        self.emit('added', videos=added)
+        for video_info in added:
+            if video_info.title:
+                self.apply_metadata(video_info, {'title': video_info.title, 'duration': video_info.duration,
+                                                 'thumbnail': video_info.thumbnail_url}, quiet=True)
+            else:
+                self.fetch_metadata(video_info)
+        self.scheduler.notify(added[0].row)
+
+        message = f"Restored {len(added)} video(s) from the last session"
+        if interrupted:
+            message += f", {interrupted} interrupted download(s) will resume"
+        self.message(message)
+        return len(added)
+
+    def is_url_in_queue(self, url: str) -> bool:
+        """Check if the video a URL points to is already in the queue"""
+        return canonical_url(url) in self.video_index
+
+    def remove(self, index: int) -> Optional[VideoInfo]:
+        """Remove the video at a queue position and return it"""
+        with self._lock:
+            if not 0 <= index < len(self.videos):
+                return None
+            # Remove from the queue and renumber the rows after it
+            video_info = self.videos.pop(index)
+            self.video_index.pop(canonical_url(video_info.url), None)
+            for row in range(index, len(self.videos)):
+                self.videos[row].row = row
+        if self.journal is not None:
+            self.journal.record(video_info.id, REMOVED)
+        self.metadata_batcher.cancel(video_info)
+        self.thumbnail_executor.cancel(video_info)
+        self.scheduler.notify(index)
+        self._update_prefetch_order()
+        return video_info
+
+    def swap(self, first: int, second: int):
+        """Swap two queue positions, e.g. to move a video up or down"""
+        with self._lock:
+            self.videos[first], self.videos[second] = self.videos[second], self.videos[first]
+            self.videos[first].row = first
+            self.videos[second].row = second
+        self.scheduler.notify(min(first, second))
+        # Moving a video changes what downloads next, and so what to prefetch first
+        self._update_prefetch_order()
+
+    def set_visible_rows(self, first: int, last: int):
+        """Tell the engine which rows a front end shows, to fetch those first"""
+        self._visible_rows = (first, last)
+        self._update_prefetch_order()
+
+    def _update_prefetch_order(self):
+        """Fetch metadata and thumbnails for visible rows, then the next downloads, first"""
+        first, last = self._visible_rows
+        with self._lock:
+            urgent = self.videos[max(0, first):last + 1]
+        visible = set(urgent)
+        urgent += [video_info for video_info in self.scheduler.upcoming(PREFETCH_AHEAD)
+                   if video_info not in visible]
+        self.metadata_batcher.prioritize(urgent)
+        self.thumbnail_executor.prioritize(urgent)
+
+    def clear(self):
+        """Empty the queue"""
+        with self._lock:
+            cleared = list(self.videos)
+            self.videos.clear()
+            self.video_index.clear()
+        if self.journal is not None:
+            self.journal.clear()
+        # Nothing is left to show the metadata or thumbnails that haven't been fetched
+        for video_info in cleared:
+            self.metadata_batcher.cancel(video_info)
+            self.thumbnail_executor.cancel(video_info)
+        self.scheduler.notify(0)
+
+    def row_of(self, video_info: VideoInfo) -> int:
+        """Return the current queue position of a video, or -1 if it was removed"""
+        row = video_info.row
+        if 0 <= row < len(self.videos) and self.videos[row] is video_info:
+            return row
+        return -1
+
+    def process_playlist(self, playlist_url: str):
+        """Process a playlist URL and add all videos
+
+        Entries are read as yt-dlp lists them and added in batches, so the
+        first videos show up, fetch metadata and can start downloading while
+        the rest of a long playlist is still being listed.
+        """
+        self.message("Fetching playlist videos...")
+        # A download run must not end while entries are still arriving
+        self.scheduler.hold()
+        try:
+            found = 0
+            added = 0
+            batch: List[VideoInfo] = []
+            batch_started = 0.0
+
+            def add_entry(video_url: Optional[str]):
+                nonlocal found, added, batch, batch_started
+                if video_url is None:
+                    return
+                found += 1
+                # Skip entries that are already queued before building anything for them
+                if self.is_url_in_queue(video_url):
+                    return
+                if not batch:
+                    batch_started = time.monotonic()
+                batch.append(VideoInfo(url=video_url))
+                if len(batch) >= PLAYLIST_BATCH_SIZE or time.monotonic() - batch_started >= PLAYLIST_FLUSH_LATENCY:
+                    added += self.add_videos(batch)
+                    batch = []
+                    self.message(f"Listing playlist: {found} videos found...")
+
+            error_msg = None
+            listed = False
+            if self.workers is not None and self.workers.available:
+                try:
+                    self.workers.run({'op': 'playlist', 'url': playlist_url},
+                                     lambda message: add_entry(self._playlist_entry_link(message['entry'])))
+                    listed = True
+                except YtdlpError as e:
+                    error_msg = str(e)
+                    listed = True
+                except WorkerError as e:
+                    logger.error(f"yt-dlp worker failed, using the executable: {e}")
+            if not listed:
+                error_msg = self._list_playlist_with_executable(playlist_url, add_entry)
+            if batch:
+                added += self.add_videos(batch)
+
+            if error_msg is None or found:
+                self.message(f"Found {found} videos in playlist, {added} added")
+            else:
+                logger.error(f"Failed to process playlist: {error_msg}")
+                self.message(f"Failed to process playlist. Error: {error_msg}", alert=True)
+
+        except Exception as e:
+            logger.error(f"Error processing playlist: {e}")
+            self.message(f"Error processing playlist: {e}", alert=True)
+        finally:
+            self.scheduler.release()
+
+    def _list_playlist_with_executable(self, playlist_url: str,
+                                       add_entry: Callable[[Optional[str]], None]) -> Optional[str]:
+        """Feed each entry yt-dlp lists to add_entry; returns the error, if it failed"""
+        command = f'"{self.options.ytdlp_exe}" --flat-playlist --dump-json {playlist_url}'
+        process = subprocess.Popen(
+            command,
+            shell=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            bufsize=1,
+            encoding='utf-8',
+            errors='replace'
+        )
+        # Drain stderr on the side so a chatty listing can't fill the pipe and stall
+        errors: List[str] = []
+        stderr_thread = threading.Thread(target=lambda: errors.extend(process.stderr), daemon=True)
+        stderr_thread.start()
+
+        for line in iter(process.stdout.readline, ''):
+            add_entry(self._playlist_entry_url(line))
+
+        process.stdout.close()
+        return_code = process.wait()
+        stderr_thread.join()
+        if return_code == 0:
+            return None
+        return ''.join(errors).strip() or "Unknown error"
+
+    def _expand_playlist(self, playlist_url: str):
+        try:
+            self.process_playlist(playlist_url)
+        finally:
+            self.scheduler.release()
+
+    def _playlist_entry_url(self, line: str) -> Optional[str]:
+        """Return the video URL of one --flat-playlist JSON line, or None"""
+        line = line.strip()
+        if not line:
+            return None
+        try:
+            entry = json.loads(line)
+        except json.JSONDecodeError:
+            return None
+        return self._playlist_entry_link(entry)
+
+    def _playlist_entry_link(self, entry: Dict[str, Any]) -> Optional[str]:
+        """Return the video URL of a flat playlist entry, or None"""
+        url = entry.get('webpage_url') or entry.get('url')
+        if url and url.startswith(('http://', 'https://')):
+            return url
+        if entry.get('id'):
+            return f"https://www.youtube.com/watch?v={entry['id']}"
+        return None
+
+    def import_file(self, path: str):
+        """Import the URLs in a file in the background
+
+        Counts arrive in an 'imported' event once the whole file is read.
+        """
+        # Hold the run open from now, not from when the thread gets going
+        self.scheduler.hold()
+        threading.Thread(target=self._import_file, args=(path,), daemon=True).start()
+
+    def _import_file(self, path: str):
+        try:
+            self.message(f"Importing URLs from {os.path.basename(path)}...")
+            from importer import iter_links
+            counts = self.import_links(iter_links(path))
+            self.emit('imported', path=path, **counts)
+        except Exception as e:
+            logger.error(f"Error importing URLs from {path}: {e}")
+            self.message(f"Error importing URLs: {e}", alert=True)
+        finally:
+            self.scheduler.release()
+
+    def import_links(self, links: Iterable[str]) -> Dict[str, int]:
+        """Queue many links, adding them in batches as they are read
+
+        Links already queued are skipped by their canonical key before any
+        VideoInfo is built for them; playlists are expanded like typed ones.
+        Returns counts of links read, added, duplicate, invalid and playlists.
+        """
+        counts = {'read': 0, 'added': 0, 'duplicate': 0, 'invalid': 0, 'playlists': 0}
+        batch: List[VideoInfo] = []
+        batch_keys = set()
+        batch_started = 0.0
+
+        def flush():
+            added = self.add_videos(batch)
+            counts['added'] += added
+            counts['duplicate'] += len(batch) - added
+            batch.clear()
+            batch_keys.clear()
+            self.message(f"Importing URLs: {counts['read']} read, {counts['added']} added...")
+
+        for link in links:
+            counts['read'] += 1
+            link = link.strip()
+            if not is_valid_link(link):
+                counts['invalid'] += 1
+                continue
+            if is_playlist(link) and self.options.expand_playlists:
+                self.add_link(link)
+                counts['playlists'] += 1
+                continue
+            key = canonical_url(link)
+            if key in self.video_index or key in batch_keys:
+                counts['duplicate'] += 1
+                continue
+            if not batch:
+                batch_started = time.monotonic()
+            batch_keys.add(key)
+            batch.append(VideoInfo(url=link))
+            if len(batch) >= IMPORT_BATCH_SIZE or time.monotonic() - batch_started >= PLAYLIST_FLUSH_LATENCY:
+                flush()
+        if batch:
+            flush()
+        return counts
+
+    # Metadata
+
+    def fetch_metadata(self, video_info: VideoInfo):
+        """Queue a video for batched metadata extraction
+
+        Videos in the download archive are marked as downloaded right away
+        and only get metadata the cache already has, so re-queueing a list
+        that was downloaded before doesn't start yt-dlp at all.
+        """
+        if self.is_archived(video_info.url):
+            self.set_status(video_info, "Already Downloaded")
+            key = match_video(video_info.url)
+            cached = self.metadata_cache.get(key) if key and self.metadata_cache is not None else None
+            if cached is not None:
+                self.apply_metadata(video_info, cached)
+            return
+        self._metadata_requested[video_info] = time.perf_counter()
+        self.metadata_batcher.submit(video_info)
+
+    def apply_metadata(self, video_info: VideoInfo, info_dict: Dict[str, Any], fetched: bool = False,
+                       quiet: bool = False):
+        """Store metadata returned by yt-dlp (fetched), the cache or the journal"""
+        self._record_metadata_latency(video_info, 'ok')
+        if fetched:
+            # The site answered; failures alone would trip its breaker during a bulk import
+            self.breaker.record(get_site(video_info.url), None)
+        try:
+            title = info_dict.get('title', 'Unknown')
+            duration = info_dict.get('duration', 0)
+
+            # Get thumbnail URL
+            thumbnail_url = info_dict.get('thumbnail')
+            video_id = info_dict.get('id', extract_video_id(video_info.url))
+
+            # Update video info
+            video_info.title = title
+            video_info.duration = duration
+            video_info.thumbnail_url = thumbnail_url
+            estimated_size = estimate_size(info_dict, self.options.audio_only, self.max_height())
+            if estimated_size is not None:
+                video_info.estimated_size = estimated_size
+            if self.journal is not None and not quiet:
+                self.journal.record(video_info.id, METADATA, title=title, duration=duration,
+                                    thumbnail_url=thumbnail_url)
+
+            if self.thumbnail_store is not None:
+                # Cached entries may already have their thumbnail on disk
+                thumbnail_path = info_dict.get('thumbnail_path')
+                if thumbnail_path and os.path.exists(thumbnail_path):
+                    video_info.thumbnail_path = thumbnail_path
+                    self.emit('thumbnail', video_info, path=thumbnail_path)
+                elif thumbnail_url:
+                    self.thumbnail_executor.submit(video_info, self.fetch_thumbnail, video_info, thumbnail_url, video_id)
+
+            self.emit('metadata', video_info)
+            # A download may already have started or finished; don't overwrite its status
+            if video_info.status == "Pending":
+                self.set_status(video_info, "Ready")
+            if not quiet:
+                self.message(f"Metadata fetched for {title}")
+        except Exception as e:
+            logger.error(f"Error fetching metadata: {e}", extra={'job': video_info.id, 'phase': 'metadata'})
+            self.on_metadata_error(video_info, str(e))
+
+    def on_metadata_error(self, video_info: VideoInfo, error_msg: str):
+        """Retry a failed metadata fetch, or mark the video once retrying can't help"""
+        failure = classify_error(error_msg)
+        site = get_site(video_info.url)
+        self.breaker.record(site, failure)
+        delay = self._retry_delay(video_info.metadata_attempts, MAX_METADATA_ATTEMPTS, failure, site)
+        if delay is not None and self.row_of(video_info) != -1:
+            video_info.metadata_attempts += 1
+            self.metrics.inc('retries_total', stage='metadata', failure=failure)
+            logger.warning(f"Metadata fetch failed ({failure}), retrying in {delay:.1f}s: {error_msg}",
+                           extra={'job': video_info.id, 'phase': 'metadata'})
+            timer = threading.Timer(delay, self.metadata_batcher.submit, args=(video_info,))
+            timer.daemon = True
+            timer.start()
+            return
+
+        self._record_metadata_latency(video_info, 'error')
+        logger.error(f"Failed to get metadata: {error_msg}", extra={'job': video_info.id, 'phase': 'metadata'})
+        video_info.error = "Metadata fetch failed"
+        if video_info.status == "Pending":
+            self.set_status(video_info, "Error")
+        self.message(f"Failed to get metadata: {error_msg}")
+
+    def _record_metadata_latency(self, video_info: VideoInfo, outcome: str):
+        """Time from fetch_metadata() to the result, cache hits included"""
+        requested = self._metadata_requested.pop(video_info, None)
+        if requested is not None:
+            self.metrics.record('metadata', time.perf_counter() - requested, job=video_info, outcome=outcome)
+
+    def fetch_thumbnail(self, video_info: VideoInfo, thumbnail_url: str, video_id: str):
+        """Download a video's thumbnail and announce it"""
+        thumbnail_path = self.download_thumbnail(thumbnail_url, video_id)
+        if thumbnail_path:
+            video_info.thumbnail_path = thumbnail_path
+            key = match_video(video_info.url)
+            if key and self.metadata_cache is not None:
+                self.metadata_cache.set_thumbnail_path(key, thumbnail_path)
+            self.emit('thumbnail', video_info, path=thumbnail_path)
+
+    def download_thumbnail(self, thumbnail_url: str, video_id: str) -> Optional[str]:
+        """Return a list-sized thumbnail, downloading it only if it isn't stored yet"""
+        try:
+            thumbnail_path = self.thumbnail_store.get(video_id, thumbnail_url)
+            if thumbnail_path:
+                self.metrics.inc('thumbnail_store_total', outcome='hit')
+                return thumbnail_path
+            self.metrics.inc('thumbnail_store_total', outcome='miss')
+
+            # Download the thumbnail over a pooled connection
+            with self.metrics.span('thumbnail_fetch') as span:
+                data = self.http.get(thumbnail_url, verify=False).body
+                span.bytes = len(data)
+
+            # Only the resized rendition is written to disk
+            with self.metrics.span('thumbnail_resize'):
+                return self.thumbnail_store.put(video_id, thumbnail_url, data)
+        except Exception as e:
+            logger.error(f"Error downloading thumbnail: {e}")
+            return None
+
+    # Downloading
+
+    def start(self):
+        """Start downloading every queued video
+
+        Workers pick videos in queue order, including ones added while
+        running, and a 'finished' event follows once the queue is drained.
+        Raises OSError if the save path or the staging path can't be created.
+        """
+        if self.downloading:
+            return
+        # Create the VideoDownloader folder if it doesn't exist
+        os.makedirs(self.options.save_path, exist_ok=True)
+        os.makedirs(self.download_path(), exist_ok=True)
+        self.downloading = True
+        self.scheduler.set_max_workers(self.options.max_workers)
+        self.scheduler.start()
+
+    def set_max_workers(self, max_workers: int):
+        """Apply a new parallel download limit, also to a run in progress"""
+        self.options.max_workers = max_workers
+        self.scheduler.set_max_workers(max_workers)
+        if self.workers is not None:
+            self.workers.resize(max_workers + METADATA_MAX_PROCESSES + 1)
+
+    def set_site_limit(self, site: str, limit: int):
+        """Change how many downloads may run at once for one site"""
+        # While the site is backed off, the lower limit stays until it recovers
+        self.scheduler.set_site_limit(site, self.breaker.set_base_limit(site, limit))
+
+    def _retry_delay(self, attempt: int, max_attempts: int, failure: str, site: str) -> Optional[float]:
+        """Seconds to wait before retrying a failed attempt, or None to give up"""
+        if failure == PERMANENT or attempt + 1 >= max_attempts:
+            return None
+        base = RATE_LIMIT_BASE_DELAY if failure == RATE_LIMITED else RETRY_BASE_DELAY
+        # Never come back before the site has cooled down
+        return max(backoff_delay(attempt, base, RETRY_MAX_DELAY), self.breaker.cooldown(site))
+
+    def set_bandwidth_limit(self, limit: float):
+        """Change the shared bandwidth budget in bytes per second; 0 for unlimited
+
+        Downloads going through the throttling proxy pick up the new split
+        at once; a limit set while unlimited downloads run applies to the
+        downloads started after it.
+        """
+        self.options.bandwidth_limit = limit
+        self.governor.set_limit(limit)
+
+    def set_priority(self, video_info: VideoInfo, priority: float):
+        """Weight a video's share of the bandwidth budget"""
+        video_info.priority = priority
+        self.governor.set_weight(video_info.id, priority)
+
+    def download_rate(self) -> float:
+        """Measured aggregate download rate in bytes per second"""
+        if self._proxy is not None and self.governor.rate():
+            return self.governor.rate()
+        return self.progress.totals()['speed']
+
+    def _on_downloads_complete(self):
+        self.downloading = False
+        succeeded = sum(1 for video_info in self.videos if video_info.status == "Downloaded")
+        failed = sum(1 for video_info in self.videos if video_info.status in FAILURE_STATUSES)
+        summary = self.metrics.summary()
+        for line in summary:
+            logger.info(f"Run summary: {line}")
+        if self.options.metrics_path:
+            try:
+                self.metrics.write(self.options.metrics_path)
+            except OSError as e:
+                logger.error(f"Error writing metrics: {e}")
+        self.emit('finished', succeeded=succeeded, failed=failed, summary=summary)
+
+    def set_status(self, video_info: VideoInfo, status: str):
+        """Set the status of a video and announce it"""
+        video_info.status = status
+        state = JOURNAL_STATES.get(status)
+        if state is not None and self.journal is not None:
+            self.journal.record(video_info.id, state)
+        self.emit('status', video_info, status=status)
+
+    def download_path(self) -> str:
+        """The directory yt-dlp writes to: the staging path, or the save path without one"""
+        return self.options.staging_path or self.options.save_path
+
+    def max_height(self) -> Optional[int]:
+        """The video height the quality setting caps downloads at, if any"""
+        quality = self.options.quality
+        return int(quality[:-1]) if quality.endswith('p') and quality[:-1].isdigit() else None
+
+    def format_profile(self) -> str:
+        """Name the output format the current options produce, for the archive"""
+        if self.options.audio_only:
+            return "mp3"
+        return f"mp4-{self.options.quality if self.options.quality in FORMAT_SPECS else 'Best'}"
+
+    def archive_key(self, video_link: str):
+        """Return the (extractor, video ID) pair a link is archived under"""
+        return match_video(video_link) or ('url', canonical_url(video_link))
+
+    def is_archived(self, video_link: str) -> bool:
+        """Check if a link was downloaded before with the current options"""
+        return self.archive is not None and \
+            self.archive.get(self.archive_key(video_link), self.format_profile()) is not None
+
+    def bandwidth_params(self, video_info: VideoInfo) -> Dict[str, Any]:
+        """YoutubeDL options that hold a download to its bandwidth share"""
+        if self.options.bandwidth_limit <= 0:
+            return {}
+        if self.options.throttle_proxy:
+            proxy = self._throttling_proxy()
+            if proxy is not None:
+                return {'proxy': proxy.proxy_url(video_info.id)}
+        # Without the proxy the share is fixed when the download starts
+        return {'ratelimit': max(1, int(self.governor.share(video_info.id)))}
+
+    def bandwidth_args(self, video_info: VideoInfo) -> str:
+        """yt-dlp arguments that hold a download to its bandwidth share"""
+        params = self.bandwidth_params(video_info)
+        if 'proxy' in params:
+            return f'--proxy "{params["proxy"]}" '
+        if 'ratelimit' in params:
+            return f'--limit-rate {params["ratelimit"]} '
+        return ''
+
+    def _throttling_proxy(self) -> Optional[ThrottlingProxy]:
+        with self._lock:
+            if self._proxy is None:
+                try:
+                    self._proxy = ThrottlingProxy(self.governor)
+                except OSError as e:
+                    logger.error(f"Error starting throttling proxy, falling back to --limit-rate: {e}")
+                    self.options.throttle_proxy = False
+            return self._proxy
+
+    def build_download_command(self, video_link: str, output_template: str, extra_args: str = '') -> str:
+        """Build the yt-dlp command based on the download options
+
+        --print makes yt-dlp quiet, so --progress keeps the progress lines;
+        the printed lines mark post-processing and report the final path.
+        """
+        common = f'{extra_args}--newline --progress --progress-template "{PROGRESS_TEMPLATE}" ' \
+                 f'--print "{POSTPROCESS_TEMPLATE}" --print "{FILEPATH_TEMPLATE}" ' \
+                 f'--output "{output_template}" {video_link}'
+        if self.options.audio_only:
+            return f'"{self.options.ytdlp_exe}" -x --audio-format mp3 --audio-quality 0 {common}'
+        else:
+            format_spec = FORMAT_SPECS.get(self.options.quality, FORMAT_SPECS["Best"])
+
+            return f'"{self.options.ytdlp_exe}" -f {format_spec} --merge-output-format mp4 {common}'
+
+    def build_stream_download_command(self, video_link: str, output_template: str, extra_args: str = '',
+                                      format_spec: Optional[str] = None) -> str:
+        """Build a yt-dlp command that downloads the selected streams as separate, unmerged files"""
+        format_spec = format_spec or self.stream_format_spec(separate=True)
+        return f'"{self.options.ytdlp_exe}" -f "{format_spec}" ' \
+               f'{extra_args}--newline --progress --progress-template "{PROGRESS_TEMPLATE}" ' \
+               f'--print "{STREAM_TEMPLATE}" --print "{FILEPATH_TEMPLATE}" --output "{output_template}" {video_link}'
+
+    def stream_format_spec(self, separate: bool = False) -> str:
+        """Format selector for the streams the post-processing stage turns into the final file
+
+        With `separate`, "video+audio/fallback" becomes "(video,audio)/fallback":
+        yt-dlp then downloads each picked stream as a file of its own from
+        one extraction. Unlike the merge, the group still matches when only
+        one of the two streams exists; see _download_with_executable().
+        """
+        if self.options.audio_only:
+            return 'bestaudio/best'
+        format_spec = FORMAT_SPECS.get(self.options.quality, FORMAT_SPECS["Best"])
+        if not separate:
+            return format_spec
+        merged, _, fallback = format_spec.partition('/')
+        return f"({merged.replace('+', ',')})/{fallback}" if fallback else f"({merged.replace('+', ',')})"
+
+    def build_download_params(self, output_template: str,
+                              extra_params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """YoutubeDL options matching build_download_command(), for the worker pool"""
+        params: Dict[str, Any] = {'outtmpl': output_template}
+        if self.options.audio_only:
+            params['format'] = 'bestaudio/best'
+            params['postprocessors'] = [{'key': 'FFmpegExtractAudio', 'preferredcodec': 'mp3',
+                                         'preferredquality': '0'}]
+        else:
+            params['format'] = FORMAT_SPECS.get(self.options.quality, FORMAT_SPECS["Best"])
+            params['merge_output_format'] = 'mp4'
+        params.update(extra_params or {})
+        return params
+
+    def download_video(self, video_info: VideoInfo):
+        """Download a single video"""
+        with log_context(job=video_info.id, phase='download'):
+            self._download_video(video_info)
+
+    def _download_video(self, video_info: VideoInfo):
+        video_link = video_info.url
+        video_title = video_info.title or video_link
+        handed_off = False
+        try:
+            # The archive answers without starting yt-dlp
+            if self.is_archived(video_link):
+                if video_info.status != "Already Downloaded":
+                    self.set_status(video_info, "Already Downloaded")
+                self.metrics.inc('jobs_total', outcome='archived')
+                return
+
+            # A site that is cooling down gets its jobs back once it may be tried again
+            site = get_site(video_link)
+            cooldown = self.breaker.cooldown(site)
+            if cooldown > 0:
+                self.set_status(video_info, f"Waiting for {site}...")
+                self.scheduler.requeue(video_info, cooldown, video_info.row)
+                return
+
+            if not self.disk_budget.admit(video_info.id, [self.download_path(), self.options.save_path],
+                                          video_info.estimated_size):
+                if not self.disk_budget.busy:
+                    # No running download will give space back; waiting won't help
+                    self.metrics.inc('jobs_total', outcome='failed')
+                    self.set_status(video_info, "Failed")
+                    self.message(f"Not enough disk space for {video_title}", alert=True)
+                    return
+                self.set_status(video_info, "Waiting for disk space...")
+                self.scheduler.requeue(video_info, DISK_RECHECK_INTERVAL, video_info.row)
+                return
+
+            self.set_status(video_info, "Preparing...")
+            self.message(f"Downloading {video_title}...")
+            # The videos after this one are now next in line
+            self._update_prefetch_order()
+
+            # yt-dlp picks the file name and reports it once the file is in place. With
+            # the post-processing stage it downloads raw streams that ffmpeg turns into that file
+            staged = self.postprocessor is not None
+            output_template = os.path.join(self.download_path(), RAW_OUTPUT_TEMPLATE if staged else OUTPUT_TEMPLATE)
+            self.governor.register(video_info.id, video_info.priority)
+            if self.journal is not None:
+                self.journal.record(video_info.id, DOWNLOADING, output=output_template)
+
+            # This download counts itself among the active ones
+            fragments = self.fragment_tuner.fragments_for(site, self.scheduler.active)
+            run = _DownloadRun(fragments)
+            if self.workers is not None and self.workers.available:
+                try:
+                    succeeded, error_output = self._download_in_worker(video_info, run, output_template, staged)
+                except WorkerError as e:
+                    # The executable takes over; it resumes from any .part file the worker left
+                    logger.error(f"yt-dlp worker failed, using the executable: {e}")
+                    run = _DownloadRun(fragments)
+                    succeeded, error_output = self._download_with_executable(video_info, run, output_template,
+                                                                             staged)
+            else:
+                succeeded, error_output = self._download_with_executable(video_info, run, output_template, staged)
+            self.progress.remove(video_info)
+            failure = None if succeeded else classify_error(error_output)
+            self.breaker.record(site, failure)
+            self._tune_fragments(site, run, failure)
+            retry_in = None
+            if not succeeded:
+                retry_in = self._retry_delay(video_info.attempts, MAX_DOWNLOAD_ATTEMPTS, failure, site)
+            handed_off = succeeded and staged
+            self._record_download_phases(video_info, run, succeeded, retried=retry_in is not None,
+                                         handed_off=handed_off)
+
+            if handed_off:
+                self._hand_off(video_info, run)
+            elif succeeded:
+                self._finish_download(video_info, run)
+            elif retry_in is not None:
+                video_info.attempts += 1
+                self.metrics.inc('retries_total', stage='download', failure=failure)
+                logger.warning(f"Download failed ({failure}), retrying in {retry_in:.1f}s: "
+                               f"{error_output or 'Unknown error'}")
+                self.set_status(video_info, f"Retrying in {retry_in:.0f}s...")
+                self.scheduler.requeue(video_info, retry_in, video_info.row)
+            else:
+                logger.error(f"Download failed: {error_output or 'Unknown error'}")
+                self.set_status(video_info, "Failed")
+                self.message(f"Download failed: {video_title}")
+        except Exception as e:
+            self.progress.remove(video_info)
+            logger.error(f"Error downloading video: {e}")
+            self.metrics.inc('jobs_total', outcome='error')
+            self.set_status(video_info, "Error")
+            self.message(f"Error: {str(e)}")
+        finally:
+            self.governor.unregister(video_info.id)
+            if not handed_off:
+                self.disk_budget.release(video_info.id)
+
+    def _download_with_executable(self, video_info: VideoInfo, run: _DownloadRun,
+                                  output_template: str, staged: bool = False) -> Tuple[bool, str]:
+        """Run yt-dlp for a download; returns success and its stderr"""
+        extra_args = self.bandwidth_args(video_info) + f'--concurrent-fragments {run.fragments} '
+        if not staged:
+            return self._run_download_command(
+                video_info, run, self.build_download_command(video_info.url, output_template, extra_args))
+
+        command = self.build_stream_download_command(video_info.url, output_template, extra_args)
+        succeeded, error_output = self._run_download_command(video_info, run, command, staged=True)
+        fallback = self.stream_format_spec().partition('/')[2]
+        if not succeeded or self.options.audio_only or not fallback or self._has_video_and_audio(run):
+            return succeeded, error_output
+        # Video without audio (or the other way round), where the merge selector would have
+        # taken the fallback format; drop the lone stream and download that instead
+        logger.info(f"Only part of a video+audio pair was available, downloading {fallback} instead")
+        for path in run.raw_paths:
+            if os.path.exists(path):
+                os.remove(path)
+        run.raw_paths = []
+        run.stream_codecs = []
+        command = self.build_stream_download_command(video_info.url, output_template, extra_args, fallback)
+        return self._run_download_command(video_info, run, command, staged=True)
+
+    @staticmethod
+    def _has_video_and_audio(run: _DownloadRun) -> bool:
+        """Whether the reported streams have a video and an audio track between them; unknown counts as present"""
+        if not run.stream_codecs:
+            return True
+        return any(vcodec != 'none' for vcodec, _ in run.stream_codecs) and \
+            any(acodec != 'none' for _, acodec in run.stream_codecs)
+
+    def _run_download_command(self, video_info: VideoInfo, run: _DownloadRun, command: str,
+                              staged: bool = False) -> Tuple[bool, str]:
+        """Run a yt-dlp download command, following its progress; returns success and its stderr
+
+        Staged commands download raw streams one after another; fixups yt-dlp
+        runs on one stream don't mean the transfer is over, so they're ignored.
+        """
+        process = subprocess.Popen(
+            command,
+            shell=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            bufsize=1,
+            encoding='utf-8',
+            errors='replace'
+        )
+        # Drain stderr on the side so a chatty download can't fill the pipe and stall
+        errors: List[str] = []
+        stderr_thread = threading.Thread(target=lambda: errors.extend(process.stderr), daemon=True)
+        stderr_thread.start()
+
+        # Monitor stdout for progress updates; front ends poll the table
+        for line in iter(process.stdout.readline, ''):
+            if not line:
+                break
+
+            line = line.strip()
+            progress = parse_progress_line(line)
+            if progress is not None:
+                self._on_download_progress(video_info, run, progress)
+            elif parse_stream_line(line) is not None:
+                run.stream_codecs.append(parse_stream_line(line))
+            elif parse_filepath_line(line) is not None:
+                run.output_path = parse_filepath_line(line)
+                run.raw_paths.append(run.output_path)
+            elif not staged and is_postprocessing_line(line):
+                self._on_postprocess_started(video_info, run)
+
+        # Wait for process to complete
+        process.stdout.close()
+        return_code = process.wait()
+        stderr_thread.join()
+        return return_code == 0, ''.join(errors).strip()
+
+    def _download_in_worker(self, video_info: VideoInfo, run: _DownloadRun,
+                            output_template: str, staged: bool = False) -> Tuple[bool, str]:
+        """Download on a warm yt_dlp worker; returns success and yt-dlp's error"""
+        def on_message(message: Dict[str, Any]):
+            if message['type'] == 'progress':
+                self._on_download_progress(video_info, run, {field: message.get(field) for field in
+                                                             ('downloaded', 'total', 'speed', 'eta', 'fragments')})
+            elif message['type'] == 'postprocess':
+                self._on_postprocess_started(video_info, run)
+
+        extra_params = dict(self.bandwidth_params(video_info), concurrent_fragment_downloads=run.fragments)
+        try:
+            if staged:
+                params = dict(extra_params, outtmpl=output_template, format=self.stream_format_spec())
+                run.raw_paths = self.workers.run({'op': 'download_streams', 'url': video_info.url,
+                                                  'params': params}, on_message)
+                run.output_path = run.raw_paths[-1] if run.raw_paths else None
+            else:
+                params = self.build_download_params(output_template, extra_params)
+                run.output_path = self.workers.run({'op': 'download', 'url': video_info.url, 'params': params},
+                                                   on_message)
+        except YtdlpError as e:
+            return False, str(e)
+        return True, ''
+
+    def _on_download_progress(self, video_info: VideoInfo, run: _DownloadRun, progress: Dict[str, Any]):
+        if run.first_progress is None:
+            run.first_progress = time.perf_counter()
+        if progress['downloaded'] is not None and run.transferred and progress['downloaded'] < run.transferred:
+            # The next stream started, e.g. the audio after the video
+            run.earlier_streams += run.transferred
+        run.transferred = progress['downloaded']
+        self.disk_budget.update(video_info.id, run.earlier_streams + (run.transferred or 0))
+        if progress.pop('fragments', None):
+            run.fragmented = True
+        self.progress.update(video_info, **progress)
+        # Journal the byte offset now and then, not on every update
+        if self.journal is not None and time.monotonic() - run.journaled_at >= JOURNAL_PROGRESS_INTERVAL:
+            run.journaled_at = time.monotonic()
+            self.journal.record(video_info.id, DOWNLOADING, downloaded=progress['downloaded'],
+                                total=progress['total'])
+
+    def _on_postprocess_started(self, video_info: VideoInfo, run: _DownloadRun):
+        if run.postprocess_started is not None:
+            return
+        run.postprocess_started = time.perf_counter()
+        self.progress.remove(video_info)
+        self.set_status(video_info, "Processing...")
+        if self.journal is not None:
+            self.journal.record(video_info.id, POSTPROCESSING)
+
+    def _tune_fragments(self, site: str, run: _DownloadRun, failure: Optional[str]):
+        """Feed a finished download to the fragment tuner, if it says anything about fragments"""
+        if not run.fragmented or failure == PERMANENT:
+            return
+        if failure is not None:
+            self.fragment_tuner.record(site, run.fragments, failed=True)
+        elif (run.transferred or 0) >= FRAGMENT_TUNE_MIN_BYTES and self.options.bandwidth_limit <= 0:
+            # Under a bandwidth limit more fragments can't help; the limit sets the rate
+            self.fragment_tuner.record(site, run.fragments, run.transfer_rate())
+
+    def _record_download_phases(self, video_info: VideoInfo, run: _DownloadRun, succeeded: bool,
+                                retried: bool = False, handed_off: bool = False):
+        """Split a finished download into startup, transfer and post-processing
+
+        A download handed off to the post-processing stage is counted in
+        jobs_total once that stage is done with it.
+        """
+        ended = time.perf_counter()
+        outcome = 'ok' if succeeded else 'error'
+        metrics = self.metrics
+        if run.first_progress is not None:
+            metrics.record('ytdlp_startup', run.first_progress - run.started, job=video_info, stage='download')
+        transfer_end = run.postprocess_started if run.postprocess_started is not None else ended
+        metrics.record('transfer', transfer_end - (run.first_progress or run.started), job=video_info,
+                       outcome=outcome if run.postprocess_started is None else 'ok', bytes=run.transferred)
+        if run.postprocess_started is not None:
+            # The ffmpeg merge, or the MP3 transcode for audio-only downloads
+            kind = 'audio' if self.options.audio_only else 'merge'
+            metrics.record('postprocess', ended - run.postprocess_started, job=video_info, outcome=outcome, kind=kind)
+        metrics.record('download', ended - run.started, job=video_info, outcome=outcome)
+        if not handed_off:
+            metrics.inc('jobs_total', outcome='downloaded' if succeeded else 'retried' if retried else 'failed')
+
+    def _finish_download(self, video_info: VideoInfo, run: _DownloadRun):
+        """Move a finished download into the save path, archive it and announce it"""
+        if self.options.staging_path and run.output_path:
+            try:
+                run.output_path = publish(run.output_path, self.options.save_path)
+            except FileExistsError as e:
+                # Like yt-dlp writing into the save path, keep the file that is already there
+                logger.info(f"{e.filename} already exists, discarding {run.output_path}")
+                os.remove(run.output_path)
+                run.output_path = e.filename
+                if self.archive is not None:
+                    self.archive.put(self.archive_key(video_info.url), self.format_profile(), run.output_path)
+                self.set_status(video_info, "Already Downloaded")
+                self.message(f"Already downloaded: {video_info.title or video_info.url}")
+                return
+            except OSError as e:
+                # The file stays in the staging path
+                logger.error(f"Error moving {run.output_path} into {self.options.save_path}: {e}")
+                self.set_status(video_info, "Failed")
+                self.message(f"Could not save {video_info.title or video_info.url}: {e}")
+                return
+        if self.archive is not None:
+            self.archive.put(self.archive_key(video_info.url), self.format_profile(), run.output_path or '')
+        self.set_status(video_info, "Downloaded")
+        self.message(f"Successfully downloaded: {video_info.title or video_info.url}")
+
+    # Post-processing
+
+    def _hand_off(self, video_info: VideoInfo, run: _DownloadRun):
+        """Queue a download's raw streams for post-processing; blocks while that queue is full"""
+        self.set_status(video_info, "Waiting to process...")
+        if self.journal is not None:
+            self.journal.record(video_info.id, POSTPROCESSING)
+        # The run isn't over until the file is finished
+        self.scheduler.hold()
+        if not self.postprocessor.submit(self._postprocess, video_info, run):
+            # Shutting down; the journal resumes the job next session
+            self.disk_budget.release(video_info.id)
+            self.scheduler.release()
+
+    def _postprocess(self, video_info: VideoInfo, run: _DownloadRun):
+        """Turn a download's raw streams into the finished file, on the post-processing pool"""
+        started = time.perf_counter()
+        try:
+            with log_context(job=video_info.id, phase='postprocess'):
+                self.set_status(video_info, "Processing...")
+                succeeded, error_output, kind = self._process_streams(run)
+                outcome = 'ok' if succeeded else 'error'
+                self.metrics.record('postprocess', time.perf_counter() - started, job=video_info, outcome=outcome,
+                                    kind=kind)
+                self.metrics.inc('jobs_total', outcome='downloaded' if succeeded else 'failed')
+                if succeeded:
+                    self._finish_download(video_info, run)
+                else:
+                    logger.error(f"Post-processing failed: {error_output}")
+                    self.set_status(video_info, "Failed")
+                    self.message(f"Post-processing failed: {video_info.title or video_info.url}")
+        finally:
+            self.disk_budget.release(video_info.id)
+            self.scheduler.release()
+
+    def _process_streams(self, run: _DownloadRun) -> Tuple[bool, str, str]:
+        """Merge, transcode or rename the raw streams; returns success, error and what was done"""
+        paths = order_streams([path for path in run.raw_paths if os.path.exists(path)])
+        if not paths:
+            return False, "yt-dlp reported no downloaded files", 'none'
+        ffmpeg = self.options.ffmpeg_exe
+        if self.options.audio_only:
+            kind = 'audio'
+            output_path = final_path(paths[0], 'mp3')
+            args = extract_mp3_args(ffmpeg, paths[0], output_path)
+        elif len(paths) > 1:
+            kind = 'merge'
+            output_path = final_path(paths[0], 'mp4')
+            args = merge_args(ffmpeg, paths[0], paths[1], output_path)
+        else:
+            # A single stream that already has video and audio only needs its final name
+            output_path = final_path(paths[0], os.path.splitext(paths[0])[1].lstrip('.'))
+            os.replace(paths[0], output_path)
+            run.output_path = output_path
+            return True, '', 'rename'
+
+        succeeded, error_output = run_ffmpeg(args)
+        if not succeeded:
+            if os.path.exists(output_path):
+                os.remove(output_path)
+            # The raw streams stay; a retry finds them already downloaded
+            return False, error_output, kind
+        for path in paths:
+            os.remove(path)
+        run.output_path = output_path
+        return True, '', kind
+
+    # yt-dlp maintenance
+
+    def get_ytdlp_version(self) -> Optional[str]:
+        """Return the installed yt-dlp version, or None if it can't be determined
+
+        The executable is only run when it changed since the last check.
+        """
+        return self.version_cache.installed(self.options.ytdlp_exe, self._probe_ytdlp_version)
+
+    def _probe_ytdlp_version(self) -> Optional[str]:
+        result = subprocess.run(f'"{self.options.ytdlp_exe}" --version', shell=True, capture_output=True, text=True)
+        if result.returncode != 0:
+            return None
+        return result.stdout.strip()
+
+    def get_latest_ytdlp_version(self, force: bool = False) -> str:
+        """Return the latest yt-dlp release tag, asking GitHub at most once per VERSION_CHECK_TTL"""
+        return self.version_cache.latest(self._fetch_latest_ytdlp_version, force=force)
+
+    def _fetch_latest_ytdlp_version(self, etag: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+        headers = {'If-None-Match': etag} if etag else {}
+        response = self.http.get(YTDLP_RELEASE_API, headers=headers, expect=(200, 304))
+        if response.status == 304:
+            return None, etag
+        return response.json()["tag_name"].strip(), response.headers.get('ETag')
+
+    def update_ytdlp(self):
+        """Download the latest yt-dlp executable"""
+        ytdlp_exe = self.options.ytdlp_exe
+        # Ensure the bin directory exists
+        bin_dir = os.path.dirname(ytdlp_exe)
+        if bin_dir:
+            os.makedirs(bin_dir, exist_ok=True)
+
+        # Download the latest version next to the old one, then swap it in
+        download_path = ytdlp_exe + ".download"
+        self.http.download(YTDLP_URL, download_path)
+        os.replace(download_path, ytdlp_exe)
+
+        # Set execute permission on Linux/macOS
+        if os.name != 'nt':
+            os.chmod(ytdlp_exe, 0o755)
+
+    def close(self):
+        """Stop scheduling work and release resources"""
+        # Don't start any more queued downloads or metadata batches
+        self.scheduler.stop()
+        self.metadata_batcher.close()
+        if self.journal is not None:
+            try:
+                # Keep the queue order the user left it in
+                self.journal.compact([video_info.id for video_info in self.videos])
+                self.journal.close()
+            except Exception as e:
+                logger.error(f"Error closing job journal: {e}")
+        self.thumbnail_executor.shutdown(wait=False)
+        if self.postprocessor is not None:
+            self.postprocessor.shutdown()
+        if self.metadata_cache is not None:
+            self.metadata_cache.close()
+        if self.archive is not None:
+            self.archive.close()
+        if self._proxy is not None:
+            self._proxy.close()
+        if self.workers is not None:
+            self.workers.close()
+        self.http.close()
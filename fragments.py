@@ -0,0 +1,101 @@
+import threading
+import logging
+from typing import Dict, Optional
+
+logger = logging.getLogger('VideoDownloader')
+
+
+class _SiteClimb:
+    def __init__(self, level: int):
+        self.level = level
+        self.rates: Dict[int, float] = {}  # level -> moving average of bytes per second
+        self.samples = 0  # jobs measured at the current level since it was reached
+        self.settled = 0  # jobs since the climb last stopped
+
+
+class FragmentTuner:
+    """Picks yt-dlp's concurrent fragment count per download by hill climbing
+
+    yt-dlp fixes how many fragments of a DASH/HLS stream it fetches at once
+    when a download starts, so tuning happens between jobs, per site. Each
+    fragmented download reports the throughput it reached at the level it
+    ran with; levels are powers of two up to `max_fragments`. Once a level
+    has `samples` measurements, the site steps back down if it didn't beat
+    the level below by `min_gain`, climbs one level if the level above hasn't
+    been measured yet, and otherwise stays. A settled site probes the next
+    level again every `probe_every` jobs. Failures step it down one level
+    at once.
+
+    The count a job gets is also capped at its share of `budget`
+    connections, split among the downloads running at the time.
+    """
+    def __init__(self, start: int = 4, max_fragments: int = 16, budget: int = 32, samples: int = 2,
+                 min_gain: float = 0.1, probe_every: int = 20, smoothing: float = 0.5):
+        self.start = max(1, start)
+        self.max_fragments = max(1, max_fragments)
+        self.budget = max(1, budget)
+        self.samples = max(1, samples)
+        self.min_gain = min_gain
+        self.probe_every = probe_every
+        self.smoothing = smoothing
+        self._lock = threading.Lock()
+        self._sites: Dict[str, _SiteClimb] = {}
+
+    def level(self, site: str) -> int:
+        with self._lock:
+            return self._site(site).level
+
+    def fragments_for(self, site: str, active_jobs: int) -> int:
+        """Fragments a download starting now should fetch at once"""
+        share = max(1, self.budget // max(1, active_jobs))
+        return min(self.level(site), share)
+
+    def record(self, site: str, fragments: int, rate: Optional[float] = None, failed: bool = False):
+        """Report a finished fragmented download: its bytes per second, or that it failed"""
+        with self._lock:
+            climb = self._site(site)
+            if fragments != climb.level:
+                # Capped by the budget, or started before the level changed; it says
+                # nothing about the current level
+                if not failed:
+                    return
+            if failed:
+                self._move(site, climb, max(1, climb.level // 2), "failed downloads")
+                return
+            if rate is None or rate <= 0:
+                return
+            previous = climb.rates.get(fragments)
+            climb.rates[fragments] = rate if previous is None else \
+                previous + self.smoothing * (rate - previous)
+            climb.samples += 1
+            if climb.samples < self.samples:
+                return
+
+            current = climb.rates[climb.level]
+            lower = climb.rates.get(climb.level // 2) if climb.level > 1 else None
+            higher = climb.level * 2
+            if lower is not None and current < lower * (1 + self.min_gain):
+                # More connections for no more throughput; go back to fewer
+                self._move(site, climb, climb.level // 2, "no gain")
+            elif higher <= self.max_fragments and higher not in climb.rates:
+                self._move(site, climb, higher, "throughput rising")
+            else:
+                climb.settled += 1
+                if climb.settled >= self.probe_every and higher <= self.max_fragments:
+                    # The link may have changed since the climb stopped
+                    climb.rates.pop(higher, None)
+                    self._move(site, climb, higher, "probing")
+
+    def _site(self, site: str) -> _SiteClimb:
+        climb = self._sites.get(site)
+        if climb is None:
+            climb = self._sites[site] = _SiteClimb(min(self.start, self.max_fragments))
+        return climb
+
+    def _move(self, site: str, climb: _SiteClimb, level: int, reason: str):
+        """Switch a site to a new level (lock held)"""
+        climb.samples = 0
+        climb.settled = 0
+        if level != climb.level:
+            logger.info(f"Concurrent fragments for {site}: {climb.level} -> {level} ({reason})")
+            climb.level = level
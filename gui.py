@@ -0,0 +1,701 @@
+import wx
+import wx.adv
+import os
+import threading
+import logging
+from typing import List, Dict, Optional, Any, Callable
+from config import DEFAULT_SAVE_PATH, JOB_JOURNAL_PATH, METRICS_PATH, QUALITY_CHOICES, MAX_CONCURRENT_DOWNLOADS, BANDWIDTH_LIMIT
+from engine import DownloadEngine, DownloadOptions, VideoInfo, SUCCESS_STATUSES, FAILURE_STATUSES, format_duration
+from image_store import ThumbnailImageStore
+from progress import format_bytes, format_eta
+from startup import startup_timer
+
+logger = logging.getLogger('VideoDownloader')
+
+BANNER_IMG = os.path.join("src", "icons", "banner.png")
+ICON_IMG = os.path.join("src", "icons", "app_icon.ico")
+DELETE_ICON = os.path.join("src", "icons", "delete.png")
+PROGRESS_REFRESH_MS = 100  # UI refresh interval for download progress
+MIB = 1024 * 1024
+THUMBNAIL_SLOTS = 200  # decoded thumbnails kept in the image list around the viewport
+
+class VideoListCtrl(wx.ListCtrl):
+    """Virtual list control that renders rows straight from the video queue"""
+    def __init__(self, parent, frame):
+        super(VideoListCtrl, self).__init__(parent, style=wx.LC_REPORT | wx.LC_VIRTUAL | wx.LC_SINGLE_SEL)
+        self.frame = frame
+        
+        self.success_attr = wx.ItemAttr()
+        self.success_attr.SetBackgroundColour(wx.Colour(200, 255, 200))  # Light green
+        self.error_attr = wx.ItemAttr()
+        self.error_attr.SetBackgroundColour(wx.Colour(255, 200, 200))  # Light red
+
+    def OnGetItemText(self, item, column):
+        video_info = self.frame.videos[item]
+        if column == 1:
+            if video_info.title:
+                return video_info.title
+            if video_info.error:
+                return f"Error: {video_info.error}"
+            return "Fetching metadata..."
+        if column == 2:
+            return format_duration(video_info.duration) if video_info.title else ""
+        if column == 3:
+            # Live progress is read from the engine's table, not stored on the video
+            state = self.frame.engine.progress.get(video_info)
+            if state is not None:
+                return f"Downloading {state.describe()}"
+            return video_info.status
+        return ""
+
+    def OnGetItemImage(self, item):
+        return self.OnGetItemColumnImage(item, 0)
+
+    def OnGetItemColumnImage(self, item, column):
+        if column == 0:
+            return self.frame.thumbnails.slot_of(self.frame.videos[item])
+        if column == 4:
+            return self.frame.delete_icon_idx
+        if column == 5:
+            return self.frame.move_up_idx
+        if column == 6:
+            return self.frame.move_down_idx
+        return -1
+
+    def OnGetItemAttr(self, item):
+        status = self.frame.videos[item].status
+        if status in SUCCESS_STATUSES:
+            return self.success_attr
+        if status in FAILURE_STATUSES:
+            return self.error_attr
+        return None
+
+class VideoDownloader(wx.Frame):
+    def __init__(self, parent, title, measure_startup: bool = False):
+        super(VideoDownloader, self).__init__(parent, title=title, size=(720, 600))
+        # Report where launch time went and close once startup is done
+        self.measure_startup = measure_startup
+
+        self.engine = DownloadEngine(DownloadOptions(save_path=DEFAULT_SAVE_PATH, journal_path=JOB_JOURNAL_PATH,
+                                                     metrics_path=METRICS_PATH))
+        startup_timer.mark('engine created')
+        # The queue lives in the engine; the list view renders it directly
+        self.videos: List[VideoInfo] = self.engine.videos
+        self.downloading: bool = False
+        self.save_path = self.engine.options.save_path
+        self.engine.add_listener(self.on_engine_event)
+
+        # Create status bar
+        self.CreateStatusBar()
+        self.SetStatusText("Ready")
+
+        # Set up the UI
+        self._init_ui()
+        
+        # Set application icon
+        try:
+            self.SetIcon(wx.Icon(ICON_IMG))
+        except Exception as e:
+            logger.error(f"Error loading application icon: {e}")
+
+        # Bind the close event
+        self.Bind(wx.EVT_CLOSE, self.on_close)
+        startup_timer.mark('window built')
+
+        # Restoring the queue and checking yt-dlp wait until the window is on screen
+        self.Bind(wx.EVT_IDLE, self.on_first_idle)
+
+        # Schedule periodic update checks (every 24 hours)
+        self.update_timer = wx.Timer(self)
+        self.Bind(wx.EVT_TIMER, lambda evt: self.check_ytdlp(), self.update_timer)
+        self.update_timer.Start(1000 * 60 * 60 * 24)  # 24 hours in milliseconds
+        
+        # Redraw download progress at a fixed rate instead of once per yt-dlp line
+        self.progress_timer = wx.Timer(self)
+        self.Bind(wx.EVT_TIMER, self.flush_progress, self.progress_timer)
+
+    def _init_ui(self):
+        """Initialize the user interface"""
+        panel = wx.Panel(self)
+        vbox = wx.BoxSizer(wx.VERTICAL)
+
+        # Add header banner
+        try:
+            banner = wx.Image(BANNER_IMG, wx.BITMAP_TYPE_PNG).ConvertToBitmap()
+            banner_bitmap = wx.StaticBitmap(panel, -1, banner)
+            vbox.Add(banner_bitmap, 0, wx.EXPAND | wx.ALL, 10)
+        except Exception as e:
+            logger.error(f"Error loading banner: {e}")
+            # Create placeholder if banner cannot be loaded
+            banner_text = wx.StaticText(panel, -1, "Video Downloader")
+            font = wx.Font(18, wx.DEFAULT, wx.NORMAL, wx.BOLD)
+            banner_text.SetFont(font)
+            vbox.Add(banner_text, 0, wx.ALIGN_CENTER | wx.ALL, 10)
+
+        # Input field for video link and add button
+        hbox_link = wx.BoxSizer(wx.HORIZONTAL)
+        self.link_entry = wx.TextCtrl(panel, style=wx.TE_MULTILINE)
+        hbox_link.Add(self.link_entry, 1, wx.EXPAND | wx.RIGHT, 10)
+
+        # Add buttons panel
+        input_buttons_sizer = wx.BoxSizer(wx.VERTICAL)
+        
+        self.add_button = wx.Button(panel, label='Add Video')
+        self.add_button.Bind(wx.EVT_BUTTON, self.add_video)
+        input_buttons_sizer.Add(self.add_button, 0, wx.EXPAND | wx.BOTTOM, 5)
+        
+        self.add_file_button = wx.Button(panel, label='Import URLs')
+        self.add_file_button.Bind(wx.EVT_BUTTON, self.import_urls_from_file)
+        input_buttons_sizer.Add(self.add_file_button, 0, wx.EXPAND)
+        
+        hbox_link.Add(input_buttons_sizer, 0, wx.EXPAND)
+        vbox.Add(hbox_link, 0, wx.EXPAND | wx.LEFT | wx.RIGHT | wx.BOTTOM, 10)
+
+        # Save path button and text field
+        hbox_save = wx.BoxSizer(wx.HORIZONTAL)
+        self.save_path_button = wx.Button(panel, label='Set Save Path...')
+        self.save_path_button.Bind(wx.EVT_BUTTON, self.set_save_path)
+        hbox_save.Add(self.save_path_button, 0, wx.EXPAND | wx.RIGHT, 10)
+
+        self.save_path_text = wx.TextCtrl(panel, value=self.save_path, style=wx.TE_READONLY)
+        hbox_save.Add(self.save_path_text, 1, wx.EXPAND)
+        vbox.Add(hbox_save, 0, wx.EXPAND | wx.ALL, 10)
+        
+        # Options panel
+        options_box = wx.StaticBox(panel, label="Download Options")
+        options_sizer = wx.StaticBoxSizer(options_box, wx.HORIZONTAL)
+        
+        # Audio-only option
+        self.audio_only = wx.CheckBox(options_box, label='Audio Only (MP3)')
+        self.audio_only.Bind(wx.EVT_CHECKBOX, self.on_format_changed)
+        options_sizer.Add(self.audio_only, 0, wx.ALL, 5)
+        
+        # Add a quality dropdown
+        quality_label = wx.StaticText(options_box, label="Video Quality:")
+        options_sizer.Add(quality_label, 0, wx.ALL | wx.ALIGN_CENTER_VERTICAL, 5)
+        
+        self.quality_choices = QUALITY_CHOICES
+        self.quality_dropdown = wx.Choice(options_box, choices=self.quality_choices)
+        self.quality_dropdown.SetSelection(0)  # Default to Best
+        self.quality_dropdown.Bind(wx.EVT_CHOICE, self.on_format_changed)
+        options_sizer.Add(self.quality_dropdown, 0, wx.ALL, 5)
+        
+        # Add playlist options
+        playlist_label = wx.StaticText(options_box, label="Playlist:")
+        options_sizer.Add(playlist_label, 0, wx.ALL | wx.ALIGN_CENTER_VERTICAL, 5)
+        
+        self.playlist_choices = ["Download All", "First Video Only"]
+        self.playlist_dropdown = wx.Choice(options_box, choices=self.playlist_choices)
+        self.playlist_dropdown.SetSelection(0)  # Default to Download All
+        options_sizer.Add(self.playlist_dropdown, 0, wx.ALL, 5)
+        
+        # Add parallel downloads limit
+        parallel_label = wx.StaticText(options_box, label="Parallel:")
+        options_sizer.Add(parallel_label, 0, wx.ALL | wx.ALIGN_CENTER_VERTICAL, 5)
+        
+        self.parallel_spin = wx.SpinCtrl(options_box, min=1, max=32, initial=MAX_CONCURRENT_DOWNLOADS, size=(60, -1))
+        self.parallel_spin.Bind(wx.EVT_SPINCTRL, self.on_parallel_changed)
+        options_sizer.Add(self.parallel_spin, 0, wx.ALL, 5)
+        
+        # Add total bandwidth limit shared by all downloads; 0 means unlimited
+        limit_label = wx.StaticText(options_box, label="Limit (MiB/s):")
+        options_sizer.Add(limit_label, 0, wx.ALL | wx.ALIGN_CENTER_VERTICAL, 5)
+        
+        self.limit_spin = wx.SpinCtrl(options_box, min=0, max=1000, initial=int(BANDWIDTH_LIMIT // MIB), size=(60, -1))
+        self.limit_spin.Bind(wx.EVT_SPINCTRL, self.on_limit_changed)
+        options_sizer.Add(self.limit_spin, 0, wx.ALL, 5)
+        
+        vbox.Add(options_sizer, 0, wx.EXPAND | wx.LEFT | wx.RIGHT | wx.BOTTOM, 10)
+        
+        # Create image list for thumbnails
+        self.image_list = wx.ImageList(90, 50)
+        self.default_thumbnail_idx = self.image_list.Add(wx.ArtProvider.GetBitmap(wx.ART_MISSING_IMAGE, size=(90, 50)))
+        
+        # Create icons for the action column
+        try:
+            # Use custom delete icon if available
+            if os.path.exists(DELETE_ICON):
+                self.delete_icon = wx.Bitmap(DELETE_ICON)
+            else:
+                self.delete_icon = wx.ArtProvider.GetBitmap(wx.ART_DELETE, wx.ART_MENU, (16, 16))
+        except Exception as e:
+            logger.error(f"Error loading delete icon: {e}")
+            self.delete_icon = wx.ArtProvider.GetBitmap(wx.ART_DELETE, wx.ART_MENU, (16, 16))
+            
+        self.delete_icon_idx = self.image_list.Add(self.delete_icon)
+        
+        # Move up/down icons
+        self.move_up_icon = wx.ArtProvider.GetBitmap(wx.ART_GO_UP, wx.ART_MENU, (16, 16))
+        self.move_up_idx = self.image_list.Add(self.move_up_icon)
+        
+        self.move_down_icon = wx.ArtProvider.GetBitmap(wx.ART_GO_DOWN, wx.ART_MENU, (16, 16))
+        self.move_down_idx = self.image_list.Add(self.move_down_icon)
+        
+        # Thumbnails take the slots after the icons, a bounded number at a time
+        self.thumbnails = ThumbnailImageStore(self.image_list, self.default_thumbnail_idx, THUMBNAIL_SLOTS,
+                                              on_loaded=self.on_thumbnails_loaded)
+        
+        # Video list view, rendered on demand from self.videos
+        self.list_view = VideoListCtrl(panel, self)
+        self.list_view.SetImageList(self.image_list, wx.IMAGE_LIST_SMALL)
+        self.list_view.InsertColumn(0, 'Thumbnail', width=100)
+        self.list_view.InsertColumn(1, 'Title', width=250)
+        self.list_view.InsertColumn(2, 'Duration', width=70)
+        self.list_view.InsertColumn(3, 'Status', width=130)
+        self.list_view.InsertColumn(4, '', width=30)  # Delete icon
+        self.list_view.InsertColumn(5, '', width=30)  # Move up icon
+        self.list_view.InsertColumn(6, '', width=30)  # Move down icon
+        vbox.Add(self.list_view, 1, wx.EXPAND | wx.ALL, 10)
+        
+        # Queue management buttons
+        hbox_queue = wx.BoxSizer(wx.HORIZONTAL)
+        
+        self.move_up_button = wx.Button(panel, label='Move Up')
+        self.move_up_button.Bind(wx.EVT_BUTTON, self.move_item_up)
+        hbox_queue.Add(self.move_up_button, 0, wx.RIGHT, 5)
+        
+        self.move_down_button = wx.Button(panel, label='Move Down')
+        self.move_down_button.Bind(wx.EVT_BUTTON, self.move_item_down)
+        hbox_queue.Add(self.move_down_button, 0, wx.RIGHT, 5)
+        
+        vbox.Add(hbox_queue, 0, wx.EXPAND | wx.LEFT | wx.RIGHT | wx.BOTTOM, 10)
+        
+        # Bind list item events
+        self.list_view.Bind(wx.EVT_LEFT_DOWN, self.on_list_click)
+        self.list_view.Bind(wx.EVT_RIGHT_DOWN, self.on_right_click)
+        # Anything that can change which rows are on screen reorders the prefetch
+        self.visible_rows = (0, -1)
+        for event_type in (wx.EVT_SCROLLWIN, wx.EVT_MOUSEWHEEL, wx.EVT_SIZE, wx.EVT_LIST_ITEM_FOCUSED):
+            self.list_view.Bind(event_type, self.on_list_scrolled)
+
+        # Download and clear list buttons
+        hbox_buttons = wx.BoxSizer(wx.HORIZONTAL)
+        self.clear_button = wx.Button(panel, label='Clear List')
+        self.clear_button.Bind(wx.EVT_BUTTON, self.clear_list)
+        hbox_buttons.Add(self.clear_button, 0, wx.EXPAND | wx.RIGHT, 10)
+
+        # Update YT-DLP button
+        self.update_button = wx.Button(panel, label='Update yt-dlp')
+        self.update_button.Bind(wx.EVT_BUTTON, self.update_yt_dlp)
+        hbox_buttons.Add(self.update_button, 0, wx.EXPAND)
+
+        hbox_buttons.AddStretchSpacer(1)
+
+        self.download_button = wx.Button(panel, label='Download Videos', size=(200, 50))
+        self.download_button.Bind(wx.EVT_BUTTON, self.download_videos)
+        font = wx.Font(14, wx.DEFAULT, wx.NORMAL, wx.BOLD)
+        self.download_button.SetFont(font)
+        hbox_buttons.Add(self.download_button, 0, wx.EXPAND)
+        vbox.Add(hbox_buttons, 0, wx.EXPAND | wx.LEFT | wx.RIGHT | wx.BOTTOM, 10)
+
+        panel.SetSizer(vbox)
+        self.Centre()
+        self.Show()
+
+    def on_first_idle(self, event):
+        """Do the startup work that can wait until the window has been painted"""
+        self.Unbind(wx.EVT_IDLE, handler=self.on_first_idle)
+        startup_timer.mark('first paint')
+
+        # Bring back the queue of the last session
+        self.engine.restore()
+        startup_timer.mark('queue restored')
+
+        # Check for yt-dlp and its updates
+        self.check_ytdlp(on_done=self.on_startup_done if self.measure_startup else None)
+
+    def on_startup_done(self):
+        """Print the --measure-startup report and quit"""
+        startup_timer.mark('yt-dlp checked')
+        print(startup_timer.report())
+        self.Close()
+
+    def check_ytdlp(self, on_done: Optional[Callable[[], None]] = None):
+        """Check if yt-dlp exists and check for updates"""
+        # Start a thread to check version to avoid freezing the UI
+        def check():
+            self.check_ytdlp_version()
+            if on_done is not None:
+                wx.CallAfter(on_done)
+        threading.Thread(target=check, daemon=True).start()
+
+    def check_ytdlp_version(self):
+        """Check if an update is available for yt-dlp"""
+        if not os.path.exists(self.engine.options.ytdlp_exe):
+            logger.warning("yt-dlp not found")
+            wx.CallAfter(self.update_button.Enable)
+            wx.CallAfter(self.SetStatusText, "yt-dlp not found. Click 'Update yt-dlp' to download it.")
+            return
+            
+        try:
+            # Get current version
+            current_version = self.engine.get_ytdlp_version()
+            if current_version is None:
+                logger.warning("Could not determine yt-dlp version")
+                wx.CallAfter(self.update_button.Enable)
+                wx.CallAfter(self.SetStatusText, "Cannot determine yt-dlp version. Update recommended.")
+                return
+            
+            # Check latest version from GitHub API
+            try:
+                latest_version = self.engine.get_latest_ytdlp_version()
+                
+                if latest_version != current_version:
+                    logger.info(f"yt-dlp update available: {current_version} → {latest_version}")
+                    wx.CallAfter(self.update_button.Enable)
+                    wx.CallAfter(self.SetStatusText, f"yt-dlp update available: {current_version} → {latest_version}")
+                else:
+                    logger.info(f"yt-dlp is up to date (version {current_version})")
+                    wx.CallAfter(self.update_button.Disable)
+                    wx.CallAfter(self.SetStatusText, f"yt-dlp is up to date (version {current_version})")
+            except Exception as e:
+                logger.error(f"Error checking for updates: {e}")
+                # Still enable button as a fallback
+                wx.CallAfter(self.update_button.Enable)
+                wx.CallAfter(self.SetStatusText, "Could not check for updates. Update button enabled as precaution.")
+                
+        except Exception as e:
+            logger.error(f"Error checking yt-dlp version: {e}")
+            wx.CallAfter(self.update_button.Enable)
+            wx.CallAfter(self.SetStatusText, "Error checking yt-dlp version. Update recommended.")
+
+    def on_list_click(self, event):
+        """Handle clicks on the list items, particularly for action icons"""
+        # Get mouse position
+        point = event.GetPosition()
+        item, flags = self.list_view.HitTest(point)
+        
+        if item != -1:  # If an item was clicked
+            # Get the column width to determine which column was clicked
+            col_widths = [self.list_view.GetColumnWidth(i) for i in range(self.list_view.GetColumnCount())]
+            total_width = sum(col_widths[:4])  # Width up to Status column
+            
+            x_pos = point.x
+            
+            # Check which action column was clicked
+            if total_width <= x_pos < total_width + col_widths[4]:
+                # Delete icon clicked
+                self.remove_selected_item(item)
+            elif total_width + col_widths[4] <= x_pos < total_width + col_widths[4] + col_widths[5]:
+                # Move up icon clicked
+                self.move_item_up(item=item)
+            elif total_width + col_widths[4] + col_widths[5] <= x_pos:
+                # Move down icon clicked
+                self.move_item_down(item=item)
+        
+        event.Skip()  # Allow default processing
+
+    def on_right_click(self, event):
+        """Handle right-click for context menu"""
+        point = event.GetPosition()
+        item, flags = self.list_view.HitTest(point)
+        
+        if item != -1:  # If an item was right-clicked
+            # Create popup menu
+            menu = wx.Menu()
+            
+            # Add menu items
+            remove_item = menu.Append(-1, "Remove from Queue")
+            move_up_item = menu.Append(-1, "Move Up")
+            move_down_item = menu.Append(-1, "Move Down")
+            
+            # Bind events
+            self.Bind(wx.EVT_MENU, lambda evt: self.remove_selected_item(item), remove_item)
+            self.Bind(wx.EVT_MENU, lambda evt: self.move_item_up(item=item), move_up_item)
+            self.Bind(wx.EVT_MENU, lambda evt: self.move_item_down(item=item), move_down_item)
+            
+            # Show popup menu
+            self.PopupMenu(menu, event.GetPosition())
+            menu.Destroy()
+        
+        event.Skip()
+
+    def on_list_scrolled(self, event):
+        """Re-read the visible rows once the list has finished scrolling"""
+        event.Skip()
+        wx.CallAfter(self.update_visible_rows)
+
+    def update_visible_rows(self):
+        """Have the engine fetch metadata and thumbnails for the rows on screen first"""
+        top = self.list_view.GetTopItem()
+        rows = (top, top + self.list_view.GetCountPerPage())
+        if rows != self.visible_rows:
+            self.visible_rows = rows
+            self.engine.set_visible_rows(*rows)
+
+    def move_item_up(self, event=None, item=None):
+        """Move selected item up in the queue"""
+        if item is None:
+            item = self.list_view.GetFirstSelected()
+            
+        if item > 0:
+            self._swap_videos(item-1, item)
+            
+            # Select the moved item
+            self.list_view.Select(item-1)
+
+    def move_item_down(self, event=None, item=None):
+        """Move selected item down in the queue"""
+        if item is None:
+            item = self.list_view.GetFirstSelected()
+            
+        if item != -1 and item < len(self.videos) - 1:
+            self._swap_videos(item, item+1)
+            
+            # Select the moved item
+            self.list_view.Select(item+1)
+
+    def _swap_videos(self, first: int, second: int):
+        """Swap two queue entries and redraw just their rows"""
+        self.engine.swap(first, second)
+        self.list_view.RefreshItem(first)
+        self.list_view.RefreshItem(second)
+
+    def remove_selected_item(self, index):
+        """Remove item at the specified index"""
+        if index != -1:
+            video_info = self.engine.remove(index)
+            self.thumbnails.release(video_info)
+            # Shrink the virtual list and redraw the shifted rows
+            self.list_view.SetItemCount(len(self.videos))
+            if index < len(self.videos):
+                self.list_view.RefreshItems(index, len(self.videos) - 1)
+            self.SetStatusText(f"Removed item at position {index+1}")
+
+    def add_video(self, event):
+        """Add video URLs to the download queue"""
+        links = self.link_entry.GetValue().split('\n')
+        added_count = 0
+        
+        # Playlists are expanded unless only the first video is wanted
+        self.engine.options.expand_playlists = self.playlist_dropdown.GetSelection() == 0
+        
+        for link in links:
+            link = link.strip()
+            if link:
+                result = self.engine.add_link(link)
+                if result in ('added', 'playlist'):
+                    added_count += 1
+                elif result == 'invalid':
+                    wx.MessageBox(f"Invalid video link: {link}", "Error", wx.ICON_ERROR)
+        
+        if added_count > 0:
+            self.SetStatusText(f"Added {added_count} video(s) to queue")
+        
+        self.link_entry.SetValue("")
+
+    def import_urls_from_file(self, event):
+        """Import URLs from a text, CSV, JSON-lines or OPML file, gzipped or not"""
+        # The file parsers are only loaded when they're needed
+        from importer import IMPORT_WILDCARD
+        with wx.FileDialog(self, "Open URL file", wildcard=IMPORT_WILDCARD,
+                           style=wx.FD_OPEN | wx.FD_FILE_MUST_EXIST) as fileDialog:
+            
+            if fileDialog.ShowModal() == wx.ID_CANCEL:
+                return
+                
+            # The engine reads and queues the file in the background; rows appear batch by batch
+            self.engine.import_file(fileDialog.GetPath())
+
+    def on_import_finished(self, data: Dict[str, Any]):
+        """Report what a file import added"""
+        if data['added'] > 0 or data['playlists'] > 0:
+            message = f"Imported {data['added']} valid URLs from file"
+            if data['duplicate']:
+                message += f", {data['duplicate']} already queued"
+            if data['playlists']:
+                message += f", {data['playlists']} playlist(s) being expanded"
+            self.SetStatusText(message)
+        elif data['duplicate']:
+            self.SetStatusText(f"All {data['duplicate']} URLs in the file are already queued")
+        else:
+            wx.MessageBox("No valid URLs found in the file", "Import URLs", wx.ICON_INFORMATION)
+
+    def update_thumbnail(self, video_info: VideoInfo, thumbnail_path: str):
+        """Update the thumbnail image in the list view"""
+        index = self.engine.row_of(video_info)
+        if index == -1:
+            return
+        # The store loads the image when the row is drawn, if it is on screen
+        self.thumbnails.assign(video_info, thumbnail_path)
+        self.list_view.RefreshItem(index)
+
+    def on_thumbnails_loaded(self, videos: List[VideoInfo]):
+        """Redraw the rows of videos whose thumbnail just came into memory"""
+        for video_info in videos:
+            self.refresh_video(video_info)
+
+    def clear_list(self, event):
+        """Clear the download queue"""
+        if self.downloading:
+            wx.MessageBox("Cannot clear list while downloads are in progress", "Warning", wx.ICON_WARNING)
+            return
+            
+        if self.list_view.GetItemCount() > 0:
+            dialog = wx.MessageDialog(self, "Are you sure you want to clear the download queue?", 
+                                    "Confirm Clear", wx.YES_NO | wx.ICON_QUESTION)
+            if dialog.ShowModal() == wx.ID_YES:
+                self.engine.clear()
+                # Thumbnail slots are kept for the next videos; the icons stay where they are
+                self.thumbnails.clear()
+                self.list_view.SetItemCount(0)
+                self.list_view.Refresh()
+                self.SetStatusText("Download queue cleared")
+            dialog.Destroy()
+
+    def download_videos(self, event):
+        """Start downloading all videos in the queue"""
+        if self.downloading:
+            wx.MessageBox("Downloads are already in progress", "Information", wx.ICON_INFORMATION)
+            return
+            
+        if len(self.videos) == 0:
+            wx.MessageBox("No videos in queue to download", "Information", wx.ICON_INFORMATION)
+            return
+            
+        # Workers read options from the engine, never from the widgets
+        options = self.engine.options
+        options.save_path = self.save_path
+        self.on_format_changed(None)
+        # Through the engine, so the governor and the worker processes follow the widgets too
+        self.engine.set_max_workers(self.parallel_spin.GetValue())
+        self.engine.set_bandwidth_limit(self.limit_spin.GetValue() * MIB)
+        
+        # Creates the VideoDownloader folder if it doesn't exist
+        try:
+            self.engine.start()
+        except Exception as e:
+            logger.error(f"Failed to create download directory: {e}")
+            wx.MessageBox(f"Failed to create download directory: {e}", "Error", wx.ICON_ERROR)
+            return
+
+        self.downloading = True
+        self.download_button.Disable()
+        self.clear_button.Disable()
+        self.progress_timer.Start(PROGRESS_REFRESH_MS)
+
+    def on_format_changed(self, event):
+        """Apply the audio-only and quality settings at once
+
+        Links added from now on are checked against the download archive
+        under the new settings, not the ones of the last run.
+        """
+        self.engine.options.audio_only = self.audio_only.GetValue()
+        self.engine.options.quality = self.quality_choices[self.quality_dropdown.GetSelection()]
+
+    def on_parallel_changed(self, event):
+        """Apply a new parallel download limit, also to a run in progress"""
+        self.engine.set_max_workers(self.parallel_spin.GetValue())
+
+    def on_limit_changed(self, event):
+        """Apply a new total bandwidth limit, also to a run in progress"""
+        self.engine.set_bandwidth_limit(self.limit_spin.GetValue() * MIB)
+
+    def on_downloads_complete(self, success_count: int, failed_count: int, summary: Optional[List[str]] = None):
+        """Handle completion of all downloads"""
+        self.downloading = False
+        self.progress_timer.Stop()
+        self.download_button.Enable()
+        self.clear_button.Enable()
+        self.SetStatusText("All downloads complete")
+        
+        message = f"Downloads complete: {success_count} successful"
+        if failed_count > 0:
+            message += f", {failed_count} failed"
+        if summary:
+            message += "\n\nTime per phase:\n" + "\n".join(summary)
+        
+        wx.MessageBox(message, "Downloads Complete", wx.ICON_INFORMATION)
+
+    def flush_progress(self, event=None):
+        """Show progress that changed since the last refresh, plus queue totals"""
+        for video_info, state in self.engine.progress.take_dirty():
+            self.refresh_video(video_info)
+        
+        totals = self.engine.progress.totals()
+        if totals['active'] == 0:
+            return
+        # Queue ETA assumes videos not started yet are as big as the active ones
+        waiting = self.engine.scheduler.waiting
+        remaining = totals['remaining'] + waiting * totals['average_size']
+        eta = remaining / totals['speed'] if totals['speed'] else None
+        # The governor measures what actually crossed the wire; yt-dlp's own speeds are estimates
+        speed = self.engine.download_rate() or totals['speed']
+        limit = self.engine.options.bandwidth_limit
+        rate = f"{format_bytes(speed)}/s" + (f" of {format_bytes(limit)}/s" if limit else "")
+        self.SetStatusText(f"Downloading {totals['active']} video(s) at {rate}, "
+                           f"{waiting} waiting, queue ETA {format_eta(eta)}")
+    
+    def refresh_video(self, video_info: VideoInfo):
+        """Redraw a video's row if it is still queued"""
+        index = self.engine.row_of(video_info)
+        if index != -1:
+            self.list_view.RefreshItem(index)
+    
+    def on_engine_event(self, event: str, video_info: Optional[VideoInfo], data: Dict[str, Any]):
+        """Receive engine events on any thread and handle them on the GUI thread"""
+        wx.CallAfter(self.handle_engine_event, event, video_info, data)
+    
+    def handle_engine_event(self, event: str, video_info: Optional[VideoInfo], data: Dict[str, Any]):
+        """Reflect an engine event in the UI"""
+        if event == 'added':
+            # The virtual list only needs its row count; rows are drawn from the model
+            self.list_view.SetItemCount(len(self.videos))
+            self.update_visible_rows()
+        elif event in ('status', 'metadata'):
+            self.refresh_video(video_info)
+        elif event == 'thumbnail':
+            self.update_thumbnail(video_info, data['path'])
+        elif event == 'message':
+            self.SetStatusText(data['text'])
+            if data.get('alert'):
+                wx.MessageBox(data['text'], "Error", wx.ICON_ERROR)
+        elif event == 'imported':
+            self.on_import_finished(data)
+        elif event == 'finished':
+            self.on_downloads_complete(data['succeeded'], data['failed'], data.get('summary'))
+    
+    def set_save_path(self, event):
+        """Set the download save path using directory dialog"""
+        save_path_dialog = wx.DirDialog(self, "Select Save Path", self.save_path, wx.DD_DEFAULT_STYLE)
+        if save_path_dialog.ShowModal() == wx.ID_OK:
+            self.save_path = save_path_dialog.GetPath()
+            self.save_path_text.SetValue(self.save_path)
+            self.SetStatusText(f"Save path set to {self.save_path}")
+        save_path_dialog.Destroy()
+
+    def update_yt_dlp(self, event):
+        """Download or update yt-dlp executable"""
+        try:
+            self.SetStatusText("Updating yt-dlp...")
+            wx.MessageBox("Updating yt-dlp. Please wait...", "Update", wx.ICON_INFORMATION)
+            
+            self.engine.update_ytdlp()
+                
+            wx.MessageBox("yt-dlp has been updated successfully!", "Update", wx.ICON_INFORMATION)
+            self.SetStatusText("yt-dlp updated successfully")
+            
+            # Check version after update
+            self.check_ytdlp()
+        except Exception as e:
+            logger.error(f"Failed to update yt-dlp: {e}")
+            wx.MessageBox(f"Failed to update yt-dlp. Error: {e}", "Update Error", wx.ICON_ERROR)
+            self.SetStatusText(f"Update failed: {str(e)}")
+    
+    def on_close(self, event):
+        """Handle closing the application safely"""
+        if self.downloading:
+            dialog = wx.MessageDialog(self, "Downloads are in progress. Are you sure you want to exit?", 
+                                      "Confirm Exit", wx.YES_NO | wx.ICON_QUESTION)
+            if dialog.ShowModal() != wx.ID_YES:
+                return
+        
+        # Stop the update timer
+        if hasattr(self, 'update_timer'):
+            self.update_timer.Stop()
+        self.progress_timer.Stop()
+        
+        # Don't start any more queued downloads or metadata batches
+        self.engine.close()
+            
+        event.Skip()
@@ -0,0 +1,181 @@
+import http.client
+import ssl
+import json
+import threading
+import logging
+from urllib.parse import urljoin, urlsplit
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger('VideoDownloader')
+
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+# Errors that mean a pooled keep-alive connection was closed by the server
+STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, http.client.BadStatusLine,
+                           ConnectionResetError, ConnectionAbortedError, BrokenPipeError)
+
+
+class HttpResponse:
+    """A completed HTTP response"""
+    def __init__(self, url: str, status: int, headers: http.client.HTTPMessage, body: bytes):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    def json(self):
+        return json.loads(self.body.decode('utf-8'))
+
+
+class HttpError(Exception):
+    """Raised for responses with an unexpected status code"""
+    def __init__(self, url: str, status: int):
+        super().__init__(f"HTTP {status} for {url}")
+        self.url = url
+        self.status = status
+
+
+class HttpClient:
+    """Thread-safe HTTP client with per-host keep-alive connection pools
+
+    Connections are reused across requests to the same host, so repeated
+    fetches from a CDN pay the TCP and TLS handshake once. At most
+    `max_per_host` connections are open per host and `max_concurrency`
+    requests run at the same time across all hosts.
+    """
+    def __init__(self, max_per_host: int = 4, max_concurrency: int = 8,
+                 timeout: float = 15, user_agent: Optional[str] = None):
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+        self.user_agent = user_agent
+
+        self._lock = threading.Lock()
+        self._idle: Dict[Tuple, List[http.client.HTTPConnection]] = {}
+        self._host_slots: Dict[Tuple, threading.BoundedSemaphore] = {}
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        # Built on the first HTTPS request; loading the CA store is slow
+        self._contexts: Dict[bool, ssl.SSLContext] = {}
+
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None, verify: bool = True,
+            expect: Tuple[int, ...] = (200,)) -> HttpResponse:
+        """GET a URL, following redirects, and return the full response"""
+        response = self.request('GET', url, headers=headers, verify=verify)
+        if response.status not in expect:
+            raise HttpError(url, response.status)
+        return response
+
+    def download(self, url: str, path: str, headers: Optional[Dict[str, str]] = None,
+                 verify: bool = True, chunk_size: int = 256 * 1024):
+        """Stream a URL to a file, following redirects"""
+        def write_body(response: http.client.HTTPResponse):
+            with open(path, 'wb') as out_file:
+                while True:
+                    chunk = response.read(chunk_size)
+                    if not chunk:
+                        break
+                    out_file.write(chunk)
+            return b''
+
+        response = self.request('GET', url, headers=headers, verify=verify, reader=write_body)
+        if response.status != 200:
+            raise HttpError(url, response.status)
+
+    def request(self, method: str, url: str, headers: Optional[Dict[str, str]] = None,
+                verify: bool = True, max_redirects: int = 5, reader=None) -> HttpResponse:
+        """Send a request and return the response after following redirects
+
+        `reader` may consume the body of the final response itself (for example
+        to stream it to disk); whatever it returns becomes the response body.
+        """
+        for _ in range(max_redirects + 1):
+            response = self._send(method, url, headers or {}, verify, reader)
+            if response.status in REDIRECT_CODES and 'Location' in response.headers:
+                url = urljoin(url, response.headers['Location'])
+                if response.status == 303:
+                    method = 'GET'
+                continue
+            return response
+        raise HttpError(url, response.status)
+
+    def close(self):
+        """Close all idle connections"""
+        with self._lock:
+            for connections in self._idle.values():
+                for connection in connections:
+                    connection.close()
+            self._idle.clear()
+
+    def _host_key(self, url: str, verify: bool) -> Tuple:
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        port = parts.port or (443 if scheme == 'https' else 80)
+        return scheme, parts.hostname, port, verify
+
+    def _host_slot(self, key: Tuple) -> threading.BoundedSemaphore:
+        with self._lock:
+            slot = self._host_slots.get(key)
+            if slot is None:
+                slot = self._host_slots[key] = threading.BoundedSemaphore(self.max_per_host)
+            return slot
+
+    def _checkout(self, key: Tuple) -> Tuple[http.client.HTTPConnection, bool]:
+        """Return an idle connection for a host, or a new one; the flag is True if reused"""
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                return idle.pop(), True
+
+        scheme, host, port, verify = key
+        if scheme == 'https':
+            return http.client.HTTPSConnection(host, port, timeout=self.timeout,
+                                               context=self._context(verify)), False
+        return http.client.HTTPConnection(host, port, timeout=self.timeout), False
+
+    def _context(self, verify: bool) -> ssl.SSLContext:
+        with self._lock:
+            context = self._contexts.get(verify)
+            if context is None:
+                context = ssl.create_default_context() if verify else ssl._create_unverified_context()
+                self._contexts[verify] = context
+            return context
+
+    def _checkin(self, key: Tuple, connection: http.client.HTTPConnection):
+        with self._lock:
+            self._idle.setdefault(key, []).append(connection)
+
+    def _send(self, method: str, url: str, headers: Dict[str, str], verify: bool, reader) -> HttpResponse:
+        key = self._host_key(url, verify)
+        parts = urlsplit(url)
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+
+        request_headers = {'Connection': 'keep-alive'}
+        if self.user_agent:
+            request_headers['User-Agent'] = self.user_agent
+        request_headers.update(headers)
+
+        with self._slots, self._host_slot(key):
+            while True:
+                connection, reused = self._checkout(key)
+                try:
+                    connection.request(method, path, headers=request_headers)
+                    response = connection.getresponse()
+                    if reader is not None and response.status == 200:
+                        body = reader(response)
+                    else:
+                        body = response.read()
+                except STALE_CONNECTION_ERRORS:
+                    connection.close()
+                    if reused:
+                        # The server dropped an idle connection; retry on a fresh one
+                        continue
+                    raise
+                except Exception:
+                    connection.close()
+                    raise
+
+                if response.will_close:
+                    connection.close()
+                else:
+                    self._checkin(key, connection)
+                return HttpResponse(url, response.status, response.headers, body)
@@ -0,0 +1,104 @@
+import os
+import wx
+import logging
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Set
+
+logger = logging.getLogger('VideoDownloader')
+
+
+class ThumbnailImageStore:
+    """Thumbnail slots in a wx.ImageList: shared, reference-counted and bounded
+
+    Videos showing the same thumbnail file share one slot, which is freed
+    when the last of them is released. Only the `capacity` most recently
+    drawn thumbnails stay in the image list; the others fall back to the
+    placeholder and are reloaded from disk the next time their row is drawn.
+    Freed and evicted slots are reused before the image list grows, so it
+    never holds more than `capacity` thumbnails however long the session.
+    Call everything on the GUI thread.
+    """
+    def __init__(self, image_list: wx.ImageList, placeholder: int, capacity: int,
+                 on_loaded: Callable[[List[Any]], None]):
+        self.image_list = image_list
+        self.placeholder = placeholder
+        self.capacity = max(1, capacity)
+        self.on_loaded = on_loaded
+        self._paths: Dict[Any, str] = {}  # video -> thumbnail file
+        self._users: Dict[str, Set[Any]] = {}  # thumbnail file -> videos showing it
+        self._slots: 'OrderedDict[str, int]' = OrderedDict()  # loaded files, least recently drawn first
+        self._free: List[int] = []
+        self._loading: Set[str] = set()
+
+    def slot_of(self, video) -> int:
+        """Image index to draw for a video, scheduling a load if it isn't in memory"""
+        path = self._paths.get(video)
+        if path is None:
+            return self.placeholder
+        slot = self._slots.get(path)
+        if slot is not None:
+            self._slots.move_to_end(path)
+            return slot
+        # Don't touch the image list while the list control is painting
+        if path not in self._loading:
+            self._loading.add(path)
+            wx.CallAfter(self._load, path)
+        return self.placeholder
+
+    def assign(self, video, path: str):
+        """Show a thumbnail file for a video"""
+        if self._paths.get(video) == path:
+            return
+        self.release(video)
+        self._paths[video] = path
+        self._users.setdefault(path, set()).add(video)
+
+    def release(self, video):
+        """Drop a video's reference; its slot is freed once nobody else uses it"""
+        path = self._paths.pop(video, None)
+        if path is None:
+            return
+        users = self._users.get(path, set())
+        users.discard(video)
+        if not users:
+            self._users.pop(path, None)
+            slot = self._slots.pop(path, None)
+            if slot is not None:
+                self._free.append(slot)
+
+    def clear(self):
+        """Release every video; the slots stay allocated for reuse"""
+        self._free.extend(self._slots.values())
+        self._slots.clear()
+        self._paths.clear()
+        self._users.clear()
+        self._loading.clear()
+
+    def _take_slot(self) -> Optional[int]:
+        if self._free:
+            return self._free.pop()
+        if len(self._slots) >= self.capacity:
+            # Evict the thumbnail drawn longest ago; it reloads if its row comes back
+            _, slot = self._slots.popitem(last=False)
+            return slot
+        return None
+
+    def _load(self, path: str):
+        self._loading.discard(path)
+        users = self._users.get(path)
+        if not users or path in self._slots:
+            return
+        if not os.path.exists(path):
+            return
+        try:
+            bitmap = wx.Image(path, wx.BITMAP_TYPE_ANY).ConvertToBitmap()
+        except Exception as e:
+            logger.error(f"Error loading thumbnail {path}: {e}")
+            return
+        slot = self._take_slot()
+        if slot is None:
+            slot = self.image_list.Add(bitmap)
+        else:
+            self.image_list.Replace(slot, bitmap)
+        self._slots[path] = slot
+        self.on_loaded(list(users))
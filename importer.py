@@ -0,0 +1,143 @@
+import io
+import os
+import re
+import csv
+import gzip
+import json
+import logging
+import xml.etree.ElementTree as ElementTree
+from typing import IO, Iterable, Iterator, Optional
+
+logger = logging.getLogger('VideoDownloader')
+
+IMPORT_CHUNK_SIZE = 1024 * 1024  # bytes read from disk at a time
+GZIP_MAGIC = b'\x1f\x8b'
+FORMAT_EXTENSIONS = {
+    '.txt': 'text', '.list': 'text',
+    '.csv': 'csv', '.tsv': 'csv',
+    '.jsonl': 'jsonl', '.ndjson': 'jsonl', '.json': 'jsonl',
+    '.opml': 'opml', '.xml': 'opml',
+}
+# Fields that hold a video's page URL in JSON records, CSV headers and OPML outlines
+URL_FIELDS = ('webpage_url', 'url', 'original_url', 'link', 'href', 'htmlUrl', 'xmlUrl')
+URL_IN_TEXT = re.compile(r'https?://[^\s"\'<>]+')
+IMPORT_WILDCARD = ("URL lists (*.txt;*.csv;*.jsonl;*.json;*.opml;*.gz)|*.txt;*.csv;*.jsonl;*.json;*.opml;*.gz|"
+                   "All files (*.*)|*.*")
+
+
+def open_links_file(path: str) -> IO[str]:
+    """Open a URL file for reading as text, decompressing it if it is gzipped"""
+    raw = open(path, 'rb', buffering=IMPORT_CHUNK_SIZE)
+    try:
+        if raw.peek(len(GZIP_MAGIC))[:len(GZIP_MAGIC)] == GZIP_MAGIC:
+            raw = gzip.GzipFile(fileobj=raw)
+        # utf-8-sig drops the byte order mark spreadsheet exports like to add
+        return io.TextIOWrapper(raw, encoding='utf-8-sig', errors='replace', newline='')
+    except Exception:
+        raw.close()
+        raise
+
+
+def _extension(path: str) -> str:
+    name = path[:-3] if path.lower().endswith('.gz') else path
+    return os.path.splitext(name)[1].lower()
+
+
+def detect_format(path: str, file: IO[str]) -> str:
+    """Guess the format of a URL file from its name, or else its first bytes"""
+    extension = _extension(path)
+    if extension in FORMAT_EXTENSIONS:
+        return FORMAT_EXTENSIONS[extension]
+
+    head = file.buffer.peek(256)[:256]
+    text = head.decode('utf-8', errors='replace').lstrip('\ufeff \t\r\n')
+    if text.startswith('{'):
+        return 'jsonl'
+    if text.startswith('<'):
+        return 'opml'
+    return 'text'
+
+
+def iter_links(path: str, format: Optional[str] = None) -> Iterator[str]:
+    """Yield the URLs in a file one at a time without reading it all
+
+    Plain text (any URLs on each line), CSV (the URL column, or the first
+    cell that looks like a URL), JSON lines (a string or an object with a URL
+    field per line) and OPML outlines are understood, gzipped or not.
+    Whether the URLs are downloadable is left to the caller.
+    """
+    with open_links_file(path) as file:
+        format = format or detect_format(path, file)
+        if format == 'csv':
+            yield from _csv_links(file, delimiter='\t' if _extension(path) == '.tsv' else ',')
+        elif format == 'jsonl':
+            yield from _json_lines_links(file)
+        elif format == 'opml':
+            # The XML parser decodes by the document's own declaration
+            yield from _opml_links(file.buffer)
+        else:
+            yield from _text_links(file)
+
+
+def _text_links(lines: Iterable[str]) -> Iterator[str]:
+    for line in lines:
+        if line.startswith('#'):
+            continue
+        yield from URL_IN_TEXT.findall(line)
+
+
+def _csv_links(file: IO[str], delimiter: str = ',') -> Iterator[str]:
+    column: Optional[int] = None
+    for number, row in enumerate(csv.reader(file, delimiter=delimiter)):
+        if number == 0:
+            # A header row names the URL column; otherwise it is data like any other row
+            names = [cell.strip() for cell in row]
+            for field in URL_FIELDS:
+                if field in names:
+                    column = names.index(field)
+                    break
+            if column is not None:
+                continue
+        if column is not None:
+            if column < len(row) and row[column].strip():
+                yield row[column].strip()
+            continue
+        for cell in row:
+            cell = cell.strip()
+            if cell.startswith(('http://', 'https://')):
+                yield cell
+                break
+
+
+def _json_lines_links(lines: Iterable[str]) -> Iterator[str]:
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            logger.debug(f"Skipping malformed JSON line in import: {line[:100]}")
+            continue
+        # A small .json file may hold one array instead of one record per line
+        for item in record if isinstance(record, list) else [record]:
+            if isinstance(item, str):
+                yield item
+            elif isinstance(item, dict):
+                for field in URL_FIELDS:
+                    value = item.get(field)
+                    if isinstance(value, str) and value:
+                        yield value
+                        break
+
+
+def _opml_links(file: IO[bytes]) -> Iterator[str]:
+    # iterparse keeps memory flat; clearing each outline drops what was parsed
+    for _, element in ElementTree.iterparse(file, events=('end',)):
+        if element.tag.rpartition('}')[2] == 'outline':
+            for field in URL_FIELDS:
+                value = element.get(field)
+                if value:
+                    yield value
+                    break
+        element.clear()
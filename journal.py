@@ -0,0 +1,137 @@
+import os
+import json
+import time
+import threading
+import logging
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger('VideoDownloader')
+
+# Job states written to the journal
+QUEUED = 'queued'
+METADATA = 'metadata'
+DOWNLOADING = 'downloading'
+POSTPROCESSING = 'postprocessing'
+DONE = 'done'
+FAILED = 'failed'
+REMOVED = 'removed'
+CLEARED = 'cleared'  # not a job state: drops every job recorded before it
+# States a job ends in; such jobs are neither restored nor kept by compact()
+FINISHED_STATES = (DONE, FAILED)
+
+
+class JobJournal:
+    """Append-only record of every queue job's state transitions
+
+    Each transition is one JSON line, flushed as soon as it is written, so a
+    crash loses at most the line being written. Replaying the file yields the
+    latest state of every job; the file is compacted to one line per job when
+    it is opened and when compact() is called.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        # Job ID -> merged record, in the order jobs were first queued
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._replay()
+        self._file = None
+        self.compact()
+
+    def jobs(self) -> List[Dict[str, Any]]:
+        """Return the merged record of every job that isn't done, failed or removed"""
+        with self._lock:
+            return [dict(job) for job in self._jobs.values() if job.get('state') not in FINISHED_STATES]
+
+    def record(self, job_id: str, state: str, **fields):
+        """Append one state transition for a job"""
+        self.record_many([(job_id, state, fields)])
+
+    def record_many(self, transitions: List[tuple]):
+        """Append (job_id, state, fields) transitions with a single flush"""
+        now = time.time()
+        lines = []
+        with self._lock:
+            for job_id, state, fields in transitions:
+                entry = dict(fields, id=job_id, state=state, time=now)
+                self._apply(entry)
+                lines.append(json.dumps(entry, ensure_ascii=False))
+            if self._file is None:
+                return
+            try:
+                self._file.write('\n'.join(lines) + '\n')
+                self._file.flush()
+            except OSError as e:
+                logger.error(f"Error writing job journal: {e}")
+
+    def clear(self):
+        """Forget every job"""
+        with self._lock:
+            self._jobs.clear()
+            if self._file is None:
+                return
+            try:
+                self._file.write(json.dumps({'id': None, 'state': CLEARED, 'time': time.time()}) + '\n')
+                self._file.flush()
+            except OSError as e:
+                logger.error(f"Error writing job journal: {e}")
+
+    def compact(self, order: Optional[List[str]] = None):
+        """Rewrite the journal with one line per job that isn't done or failed
+
+        `order` lists job IDs in queue order; jobs it doesn't mention keep
+        their place after the listed ones.
+        """
+        with self._lock:
+            jobs = [job for job in self._jobs.values() if job.get('state') not in FINISHED_STATES]
+            if order is not None:
+                position = {job_id: index for index, job_id in enumerate(order)}
+                jobs.sort(key=lambda job: position.get(job['id'], len(position)))
+            self._jobs = {job['id']: job for job in jobs}
+
+            if self._file is not None:
+                self._file.close()
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as tmp_file:
+                for job in jobs:
+                    tmp_file.write(json.dumps(job, ensure_ascii=False) + '\n')
+                tmp_file.flush()
+                os.fsync(tmp_file.fileno())
+            os.replace(tmp_path, self.path)
+            self._file = open(self.path, 'a', encoding='utf-8')
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._file.close()
+                self._file = None
+
+    def _replay(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as file:
+                for line in file:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # a line torn by a crash
+                    self._apply(entry)
+        except FileNotFoundError:
+            pass
+
+    def _apply(self, entry: Dict[str, Any]):
+        """Merge one transition into the in-memory state (lock held)"""
+        state = entry.get('state')
+        if state == CLEARED:
+            self._jobs.clear()
+        elif state == REMOVED:
+            self._jobs.pop(entry.get('id'), None)
+        elif state == QUEUED:
+            self._jobs.setdefault(entry['id'], {}).update(entry)
+        elif entry.get('id') in self._jobs:
+            # Late transitions of removed jobs are ignored
+            self._jobs[entry['id']].update(entry)
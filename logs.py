@@ -0,0 +1,172 @@
+import os
+import copy
+import json
+import time
+import queue
+import atexit
+import threading
+import logging
+import logging.handlers
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Iterator
+
+# Fields a record may carry (through extra= or log_context()) that go into each JSON line
+CONTEXT_FIELDS = ('job', 'phase')
+
+_context = threading.local()
+
+
+@contextmanager
+def log_context(**fields) -> Iterator[None]:
+    """Tag every record logged on this thread inside the block, e.g. with job= and phase="""
+    previous = {name: getattr(_context, name, None) for name in fields}
+    for name, value in fields.items():
+        setattr(_context, name, value)
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            setattr(_context, name, value)
+
+
+def truncate(text: str, limit: int) -> str:
+    """Shorten text to about `limit` characters, keeping its start and its end
+
+    yt-dlp prints the error that matters last, after pages of warnings.
+    """
+    if limit <= 0 or len(text) <= limit:
+        return text
+    head = limit // 4
+    tail = limit - head
+    return f"{text[:head]} ...[{len(text) - limit} characters cut]... {text[-tail:]}"
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """One JSON object per record, with the job and phase it belongs to when known"""
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'message': record.getMessage(),
+        }
+        for name in CONTEXT_FIELDS:
+            value = getattr(record, name, None)
+            if value is not None:
+                entry[name] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SizeAndTimeRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """Rotates once the file reaches `max_bytes` or a new `interval` window starts
+
+    Windows are aligned to the epoch (for a day: UTC midnight), so a file
+    that was last written in an earlier window is rotated on the first
+    record of this launch, however often the application restarts.
+    """
+    def __init__(self, filename: str, max_bytes: int, backup_count: int, interval: float):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8', delay=True)
+        self.interval = interval
+        self.rollover_at = self._next_rollover(time.time())
+        if interval > 0 and os.path.exists(filename):
+            window_start = self.rollover_at - interval
+            if os.path.getmtime(filename) < window_start:
+                self.rollover_at = 0
+
+    def _next_rollover(self, now: float) -> float:
+        if self.interval <= 0:
+            return float('inf')
+        return (now // self.interval + 1) * self.interval
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if time.time() >= self.rollover_at:
+            return True
+        return bool(super().shouldRollover(record))
+
+    def doRollover(self):
+        super().doRollover()
+        self.rollover_at = self._next_rollover(time.time())
+
+
+_exception_formatter = logging.Formatter()
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records instead of blocking when the writer falls behind
+
+    Records are tagged with the calling thread's log_context() and their
+    message is truncated here, so huge payloads never reach the queue.
+    """
+    def __init__(self, log_queue: queue.Queue, max_message_chars: int):
+        super().__init__(log_queue)
+        self.max_message_chars = max_message_chars
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Like QueueHandler.prepare(), but the traceback stays apart from the
+        # message (for the formatter's 'exception' field) and isn't truncated
+        record = copy.copy(record)
+        for name in CONTEXT_FIELDS:
+            if getattr(record, name, None) is None:
+                setattr(record, name, getattr(_context, name, None))
+        record.msg = truncate(record.getMessage(), self.max_message_chars)
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _DrainingQueueListener(logging.handlers.QueueListener):
+    """QueueListener whose stop() waits for room on a full queue and may be called twice"""
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+    def stop(self):
+        if self._thread is not None:
+            super().stop()
+
+
+def setup_logging(path: str, level: int = logging.INFO, max_bytes: int = 10 * 1024 * 1024,
+                  backup_count: int = 5, interval: float = 24 * 60 * 60, queue_size: int = 10000,
+                  max_message_chars: int = 4000) -> logging.handlers.QueueListener:
+    """Send all logging to a rotating JSON-lines file through one writer thread
+
+    Logging calls only format the message and put it on a bounded queue.
+    The listener is stopped at exit, after the queue has been written out.
+    """
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    except OSError:
+        pass
+    file_handler = SizeAndTimeRotatingFileHandler(path, max_bytes, backup_count, interval)
+    file_handler.setFormatter(JsonLinesFormatter())
+    log_queue: queue.Queue = queue.Queue(queue_size)
+    queue_handler = NonBlockingQueueHandler(log_queue, max_message_chars)
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(queue_handler)
+    listener = _DrainingQueueListener(log_queue, file_handler, respect_handler_level=True)
+    listener.start()
+
+    def stop():
+        if queue_handler.dropped:
+            logging.getLogger('VideoDownloader').warning(
+                f"Dropped {queue_handler.dropped} log records while the log writer was behind")
+        listener.stop()
+        file_handler.close()
+    atexit.register(stop)
+    return listener
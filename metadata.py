@@ -0,0 +1,342 @@
+import os
+import subprocess
+import threading
+import json
+import time
+import sqlite3
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from prefetch import PrefetchQueue
+from ytdlp_pool import WorkerError
+
+logger = logging.getLogger('VideoDownloader')
+
+# Format fields worth keeping from yt-dlp's (very large) format list
+FORMAT_FIELDS = ('format_id', 'ext', 'width', 'height', 'fps', 'vcodec', 'acodec',
+                 'tbr', 'filesize', 'filesize_approx')
+
+
+class MetadataCache:
+    """Persistent SQLite cache of video metadata keyed by (platform, video ID)
+
+    Entries expire after `ttl` seconds and the least recently used ones are
+    evicted once more than `max_entries` are stored.
+    """
+    EVICT_EVERY = 100  # puts between size checks
+
+    def __init__(self, db_path: str, ttl: float = 7 * 24 * 3600, max_entries: int = 50000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._puts = 0
+
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.execute('''
+            CREATE TABLE IF NOT EXISTS metadata (
+                platform TEXT NOT NULL,
+                video_id TEXT NOT NULL,
+                title TEXT,
+                duration REAL,
+                thumbnail_url TEXT,
+                thumbnail_path TEXT,
+                formats TEXT,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (platform, video_id)
+            )
+        ''')
+        self._db.execute('CREATE INDEX IF NOT EXISTS metadata_accessed ON metadata (accessed_at)')
+        self._db.commit()
+
+    def get(self, key: Tuple[str, str]) -> Optional[Dict[str, Any]]:
+        """Return the cached info dict for a key, or None if missing or expired"""
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                'SELECT title, duration, thumbnail_url, thumbnail_path, formats, fetched_at '
+                'FROM metadata WHERE platform = ? AND video_id = ?', key).fetchone()
+            if row is None:
+                return None
+            if now - row[5] > self.ttl:
+                self._db.execute('DELETE FROM metadata WHERE platform = ? AND video_id = ?', key)
+                self._db.commit()
+                return None
+            self._db.execute('UPDATE metadata SET accessed_at = ? WHERE platform = ? AND video_id = ?',
+                             (now,) + tuple(key))
+            self._db.commit()
+
+        return {
+            'id': key[1],
+            'title': row[0],
+            'duration': row[1],
+            'thumbnail': row[2],
+            'thumbnail_path': row[3],
+            'formats': json.loads(row[4]) if row[4] else [],
+        }
+
+    def put(self, key: Tuple[str, str], info_dict: Dict[str, Any]):
+        """Store the parts of a yt-dlp info dict the queue needs"""
+        formats = [{field: fmt[field] for field in FORMAT_FIELDS if fmt.get(field) is not None}
+                   for fmt in info_dict.get('formats') or []]
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                'INSERT OR REPLACE INTO metadata VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (key[0], key[1], info_dict.get('title'), info_dict.get('duration'),
+                 info_dict.get('thumbnail'), info_dict.get('thumbnail_path'),
+                 json.dumps(formats), now, now))
+            self._puts += 1
+            if self._puts % self.EVICT_EVERY == 0:
+                self._evict()
+            self._db.commit()
+
+    def set_thumbnail_path(self, key: Tuple[str, str], thumbnail_path: str):
+        """Remember where a cached video's thumbnail was stored"""
+        with self._lock:
+            self._db.execute('UPDATE metadata SET thumbnail_path = ? WHERE platform = ? AND video_id = ?',
+                             (thumbnail_path,) + tuple(key))
+            self._db.commit()
+
+    def _evict(self):
+        """Drop the least recently used entries beyond max_entries (lock held)"""
+        count = self._db.execute('SELECT COUNT(*) FROM metadata').fetchone()[0]
+        if count > self.max_entries:
+            self._db.execute(
+                'DELETE FROM metadata WHERE rowid IN '
+                '(SELECT rowid FROM metadata ORDER BY accessed_at LIMIT ?)',
+                (count - self.max_entries,))
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class MetadataBatcher:
+    """Resolve video metadata with one yt-dlp process per batch of URLs
+
+    Submitted videos are grouped until `batch_size` are waiting or the oldest
+    has waited `flush_latency` seconds; videos named in prioritize() are put
+    in the next batches ahead of the rest. Each batch is fed to a single
+    `yt-dlp --dump-json` process over stdin and every JSON line is handed to
+    `on_result` as soon as it is printed. Videos the process never reported
+    on are passed to `on_error` once it exits.
+
+    With a `cache`, videos whose `cache_key` is already cached are answered
+    from it on submit without starting yt-dlp, and fresh results are stored.
+    on_result(video_info, info_dict, fetched) tells the two apart: fetched
+    is True only for results yt-dlp just produced.
+    With `metrics`, each batch records its yt-dlp startup time (until the
+    first record) and its total run time. With `workers` (a YtdlpWorkerPool)
+    batches run on a warm worker instead of a new process, falling back to
+    the executable if the workers can't run.
+    """
+    def __init__(self, ytdlp_exe: str,
+                 on_result: Callable[[Any, Dict, bool], None],
+                 on_error: Callable[[Any, str], None],
+                 batch_size: int = 20, flush_latency: float = 0.5,
+                 max_processes: int = 2, cache: Optional[MetadataCache] = None,
+                 cache_key: Optional[Callable[[str], Optional[Tuple[str, str]]]] = None,
+                 metrics=None, workers=None):
+        self.ytdlp_exe = ytdlp_exe
+        self.workers = workers
+        self.on_result = on_result
+        self.on_error = on_error
+        self.cache = cache
+        self.cache_key = cache_key
+        self.metrics = metrics
+        self.batch_size = max(1, batch_size)
+        self.flush_latency = flush_latency
+        self.max_processes = max(1, max_processes)
+
+        self._cond = threading.Condition()
+        # Videos waiting for a batch; visible and soon-to-download ones go first
+        self._pending = PrefetchQueue()
+        self._oldest: float = 0.0  # submit time of the oldest pending video
+        self._slots = threading.Semaphore(self.max_processes)
+        self._closed = False
+        self._thread = threading.Thread(target=self._dispatch, daemon=True)
+        self._thread.start()
+
+    def submit(self, video_info):
+        """Queue a video for metadata extraction"""
+        if self.cache is not None:
+            key = self.cache_key(video_info.url)
+            info_dict = self.cache.get(key) if key else None
+            if info_dict is not None:
+                self.on_result(video_info, info_dict, False)
+                return
+
+        with self._cond:
+            if not self._pending:
+                self._oldest = time.monotonic()
+            self._pending.push(video_info)
+            self._cond.notify()
+
+    def prioritize(self, video_infos: List[Any]):
+        """Put these waiting videos, in this order, into the next batches"""
+        with self._cond:
+            self._pending.prioritize(video_infos)
+
+    def cancel(self, video_info):
+        """Forget a video that no longer needs metadata, if no batch took it yet"""
+        with self._cond:
+            self._pending.discard(video_info)
+
+    def close(self):
+        """Stop the dispatcher; batches already running are left to finish"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+
+    def _take_batch(self) -> Optional[List[Any]]:
+        """Wait until a batch is due and return it, or None once closed"""
+        with self._cond:
+            while True:
+                if self._closed:
+                    return None
+                if self._pending:
+                    waited = time.monotonic() - self._oldest
+                    if len(self._pending) >= self.batch_size or waited >= self.flush_latency:
+                        count = min(self.batch_size, len(self._pending))
+                        batch = [self._pending.pop()[0] for _ in range(count)]
+                        self._oldest = time.monotonic()
+                        return batch
+                    self._cond.wait(self.flush_latency - waited)
+                else:
+                    self._cond.wait()
+
+    def _dispatch(self):
+        while True:
+            # Hold a process slot before cutting the batch, so videos keep
+            # accumulating into bigger batches while all processes are busy
+            self._slots.acquire()
+            batch = self._take_batch()
+            if batch is None:
+                self._slots.release()
+                return
+            threading.Thread(target=self._run_batch, args=(batch,), daemon=True).start()
+
+    def _run_batch(self, batch: List[Any]):
+        try:
+            self._extract(batch)
+        except Exception as e:
+            logger.error(f"Error fetching metadata batch: {e}")
+            for video_info in batch:
+                self.on_error(video_info, str(e))
+        finally:
+            self._slots.release()
+
+    def _extract(self, batch: List[Any]):
+        # Several queue entries may share a URL; all of them get the record
+        waiting: Dict[str, List[Any]] = {}
+        for video_info in batch:
+            waiting.setdefault(video_info.url, []).append(video_info)
+
+        if self.workers is not None and self.workers.available:
+            try:
+                self._extract_in_worker(batch, waiting)
+                return
+            except WorkerError as e:
+                logger.error(f"yt-dlp worker failed, using the executable: {e}")
+
+        command = f'"{self.ytdlp_exe}" --dump-json --ignore-errors --no-playlist --batch-file -'
+        started = time.perf_counter()
+        first_record = None
+        process = subprocess.Popen(
+            command,
+            shell=True,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            encoding='utf-8',
+            errors='replace'
+        )
+
+        # Drain stderr on the side so a chatty batch can't fill the pipe and stall
+        errors: List[str] = []
+        stderr_thread = threading.Thread(target=lambda: errors.extend(process.stderr), daemon=True)
+        stderr_thread.start()
+
+        process.stdin.write('\n'.join(waiting) + '\n')
+        process.stdin.close()
+
+        for line in process.stdout:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                info_dict = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if first_record is None:
+                first_record = time.perf_counter()
+            self._deliver(info_dict.get('original_url') or info_dict.get('webpage_url'), info_dict, waiting)
+
+        process.stdout.close()
+        process.wait()
+        stderr_thread.join()
+
+        self._record_batch(batch, waiting, started, first_record)
+        for url, videos in waiting.items():
+            error_msg = self._error_for(url, errors)
+            for video_info in videos:
+                self.on_error(video_info, error_msg)
+
+    def _extract_in_worker(self, batch: List[Any], waiting: Dict[str, List[Any]]):
+        """Resolve a batch on a warm worker, which reports each URL by name"""
+        started = time.perf_counter()
+        first_record = None
+        errors: Dict[str, str] = {}
+
+        def on_message(message: Dict[str, Any]):
+            nonlocal first_record
+            if message['type'] == 'url_error':
+                errors[message['url']] = message['error']
+            elif message['type'] == 'info':
+                if first_record is None:
+                    first_record = time.perf_counter()
+                self._deliver(message['url'], message['info'], waiting)
+
+        self.workers.run({'op': 'extract', 'urls': list(waiting)}, on_message)
+        self._record_batch(batch, waiting, started, first_record)
+        for url, videos in waiting.items():
+            for video_info in videos:
+                self.on_error(video_info, errors.get(url, "No metadata returned"))
+
+    def _deliver(self, url: str, info_dict: Dict, waiting: Dict[str, List[Any]]):
+        """Cache a record and hand it to the videos waiting for its URL"""
+        videos = waiting.pop(url, [])
+        if videos and self.cache is not None:
+            key = self.cache_key(url)
+            if key:
+                self.cache.put(key, info_dict)
+        for video_info in videos:
+            self.on_result(video_info, info_dict, True)
+
+    def _record_batch(self, batch: List[Any], waiting: Dict[str, List[Any]], started: float,
+                      first_record: Optional[float]):
+        if self.metrics is None:
+            return
+        if first_record is not None:
+            self.metrics.record('ytdlp_startup', first_record - started, stage='metadata')
+        self.metrics.record('metadata_batch', time.perf_counter() - started,
+                            outcome='ok' if not waiting else 'partial')
+        self.metrics.inc('metadata_urls_total', len(batch) - sum(map(len, waiting.values())), outcome='ok')
+        self.metrics.inc('metadata_urls_total', sum(map(len, waiting.values())), outcome='error')
+
+    def _error_for(self, url: str, errors: List[str]) -> str:
+        """Pick the stderr line that belongs to a URL from a batch's output"""
+        error_lines = [line.strip() for line in errors if line.startswith('ERROR')]
+        for line in error_lines:
+            if url in line:
+                return line
+        # yt-dlp usually reports the video ID rather than the URL
+        for line in error_lines:
+            video_id = line.split(':')[1].split(']')[-1].strip() if line.count(':') > 1 else ''
+            if video_id and video_id in url:
+                return line
+        return "No metadata returned"
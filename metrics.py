@@ -0,0 +1,220 @@
+import os
+import json
+import time
+import threading
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger('VideoDownloader')
+
+METRIC_PREFIX = "videodownloader"
+# Histogram bucket upper bounds in seconds; phases range from thumbnail resizes to long downloads
+SECONDS_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+METRIC_HELP = {
+    'phase_seconds': "Time spent in each job phase",
+    'phase_total': "Job phases finished, by outcome",
+    'phase_bytes_total': "Bytes moved in each job phase",
+    'jobs_total': "Jobs finished, by outcome",
+    'metadata_urls_total': "URLs sent to yt-dlp for metadata, by outcome",
+    'retries_total': "Failed attempts that were retried, by stage and failure class",
+}
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    escaped = (value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense"""
+    def __init__(self, buckets: Tuple[float, ...] = SECONDS_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+
+    def cumulative(self) -> List[int]:
+        total = 0
+        result = []
+        for count in self.counts:
+            total += count
+            result.append(total)
+        return result
+
+    def quantile(self, fraction: float) -> Optional[float]:
+        """Upper bucket bound that holds the given fraction of observations"""
+        if not self.count:
+            return None
+        target = fraction * self.count
+        for bound, total in zip(self.buckets, self.cumulative()):
+            if total >= target:
+                return bound
+        return float('inf')
+
+
+class Span:
+    """Times one phase of a job; use as a context manager
+
+    The outcome is 'ok' unless the block raises or sets `outcome` itself.
+    Set `bytes` to count the data the phase moved.
+    """
+    def __init__(self, metrics: 'Metrics', phase: str, job=None, **labels):
+        self.metrics = metrics
+        self.phase = phase
+        self.job = job
+        self.labels = labels
+        self.outcome = 'ok'
+        self.bytes: Optional[float] = None
+        self.start = time.perf_counter()
+
+    def __enter__(self) -> 'Span':
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is not None and self.outcome == 'ok':
+            self.outcome = 'error'
+        self.metrics.record(self.phase, time.perf_counter() - self.start, job=self.job,
+                            outcome=self.outcome, bytes=self.bytes, **self.labels)
+        return False
+
+
+class Metrics:
+    """Thread-safe counters and histograms for job phases
+
+    Every finished phase lands in `phase_seconds` (a histogram) and
+    `phase_total` (a counter), labelled with the phase and its outcome, and
+    is added to the job's own `timings`. Snapshots can be written as
+    Prometheus text (for a node exporter's textfile collector) or JSON.
+    """
+    def __init__(self, prefix: str = METRIC_PREFIX):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """Add to a counter"""
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        """Add an observation to a histogram"""
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram()
+            histogram.observe(value)
+
+    def span(self, phase: str, job=None, **labels) -> Span:
+        """Return a context manager that times a phase"""
+        return Span(self, phase, job, **labels)
+
+    def record(self, phase: str, seconds: float, job=None, outcome: str = 'ok',
+               bytes: Optional[float] = None, **labels):
+        """Record a finished phase that wasn't timed with span()"""
+        self.observe('phase_seconds', seconds, phase=phase, outcome=outcome, **labels)
+        self.inc('phase_total', phase=phase, outcome=outcome, **labels)
+        if bytes:
+            self.inc('phase_bytes_total', bytes, phase=phase, **labels)
+        if job is not None:
+            timings = getattr(job, 'timings', None)
+            if timings is not None:
+                timings[phase] = timings.get(phase, 0.0) + seconds
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return every series as plain data"""
+        with self._lock:
+            counters = {name: [{'labels': dict(key), 'value': value} for key, value in series.items()]
+                        for name, series in self._counters.items()}
+            histograms = {name: [{'labels': dict(key), 'count': histogram.count, 'sum': histogram.sum,
+                                  'buckets': dict(zip(map(str, histogram.buckets), histogram.cumulative()))}
+                                 for key, histogram in series.items()]
+                          for name, series in self._histograms.items()}
+        return {'time': time.time(), 'counters': counters, 'histograms': histograms}
+
+    def to_prometheus(self) -> str:
+        """Render every series in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                metric = f"{self.prefix}_{name}"
+                lines.append(f"# HELP {metric} {METRIC_HELP.get(name, name)}")
+                lines.append(f"# TYPE {metric} counter")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{metric}{_format_labels(key)} {value:g}")
+            for name, series in sorted(self._histograms.items()):
+                metric = f"{self.prefix}_{name}"
+                lines.append(f"# HELP {metric} {METRIC_HELP.get(name, name)}")
+                lines.append(f"# TYPE {metric} histogram")
+                for key, histogram in sorted(series.items()):
+                    for bound, total in zip(histogram.buckets, histogram.cumulative()):
+                        lines.append(f"{metric}_bucket{_format_labels(key, ('le', f'{bound:g}'))} {total}")
+                    lines.append(f"{metric}_bucket{_format_labels(key, ('le', '+Inf'))} {histogram.count}")
+                    lines.append(f"{metric}_sum{_format_labels(key)} {histogram.sum:g}")
+                    lines.append(f"{metric}_count{_format_labels(key)} {histogram.count}")
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path: str):
+        """Write a snapshot atomically: Prometheus text for .prom files, JSON otherwise"""
+        if path.endswith('.prom'):
+            content = self.to_prometheus()
+        else:
+            content = json.dumps(self.snapshot(), indent=2)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as out_file:
+            out_file.write(content)
+        os.replace(tmp_path, path)
+
+    def summary(self) -> List[str]:
+        """One line per phase: counts by outcome, mean and p90 time, throughput"""
+        with self._lock:
+            phases: Dict[str, Dict[str, Any]] = {}
+            for key, histogram in self._histograms.get('phase_seconds', {}).items():
+                labels = dict(key)
+                phase = phases.setdefault(labels['phase'], {'outcomes': {}, 'histogram': Histogram()})
+                outcomes = phase['outcomes']
+                outcomes[labels['outcome']] = outcomes.get(labels['outcome'], 0) + histogram.count
+                merged = phase['histogram']
+                merged.count += histogram.count
+                merged.sum += histogram.sum
+                merged.counts = [a + b for a, b in zip(merged.counts, histogram.counts)]
+            phase_bytes: Dict[str, float] = {}
+            for key, value in self._counters.get('phase_bytes_total', {}).items():
+                name = dict(key)['phase']
+                phase_bytes[name] = phase_bytes.get(name, 0) + value
+
+        lines = []
+        for name, phase in sorted(phases.items()):
+            histogram = phase['histogram']
+            outcomes = ', '.join(f"{count} {outcome}" for outcome, count in sorted(phase['outcomes'].items()))
+            line = f"{name}: {outcomes}, mean {histogram.sum / histogram.count:.2f}s, " \
+                   f"p90 <= {histogram.quantile(0.9):g}s"
+            if phase_bytes.get(name) and histogram.sum:
+                line += f", {phase_bytes[name] / histogram.sum / 1024 / 1024:.2f} MiB/s"
+            lines.append(line)
+        return lines
@@ -0,0 +1,128 @@
+import os
+import time
+import shutil
+import subprocess
+import threading
+import logging
+from collections import deque
+from typing import Callable, Deque, List, Tuple
+
+logger = logging.getLogger('VideoDownloader')
+
+# Raw streams are named "<final name without extension>.raw-<format ID>.<ext>"
+RAW_MARKER = ".raw-"
+RAW_OUTPUT_TEMPLATE = "%(title)s [%(id)s]" + RAW_MARKER + "%(format_id)s.%(ext)s"
+ERROR_CHARS_KEPT = 2000
+
+
+def ffmpeg_available(ffmpeg: str) -> bool:
+    """Check if ffmpeg can be found, as a path or on PATH"""
+    return shutil.which(ffmpeg) is not None
+
+
+def final_path(raw_path: str, ext: str) -> str:
+    """The finished file a raw stream ends up as, with a new extension"""
+    base = raw_path.rsplit(RAW_MARKER, 1)[0] if RAW_MARKER in os.path.basename(raw_path) \
+        else os.path.splitext(raw_path)[0]
+    return f"{base}.{ext}"
+
+
+def merge_args(ffmpeg: str, video_path: str, audio_path: str, output_path: str) -> List[str]:
+    """Mux a video and an audio stream into one file without re-encoding"""
+    return [ffmpeg, '-y', '-loglevel', 'error', '-i', video_path, '-i', audio_path,
+            '-map', '0:v:0', '-map', '1:a:0', '-c', 'copy', '-movflags', '+faststart', output_path]
+
+
+def extract_mp3_args(ffmpeg: str, input_path: str, output_path: str) -> List[str]:
+    """Transcode a stream's audio to MP3 at the best VBR quality, like yt-dlp -x --audio-quality 0"""
+    return [ffmpeg, '-y', '-loglevel', 'error', '-i', input_path, '-vn',
+            '-codec:a', 'libmp3lame', '-q:a', '0', output_path]
+
+
+def run_ffmpeg(args: List[str]) -> Tuple[bool, str]:
+    """Run ffmpeg; returns success and the end of its error output"""
+    # An argument list, not a shell line: titles in file names may contain shell syntax
+    result = subprocess.run(args, capture_output=True, text=True, encoding='utf-8', errors='replace')
+    return result.returncode == 0, result.stderr.strip()[-ERROR_CHARS_KEPT:]
+
+
+def order_streams(paths: List[str]) -> List[str]:
+    """Put the video stream of a video+audio pair first, judging by extension"""
+    audio_exts = ('.m4a', '.mp3', '.opus', '.ogg', '.aac', '.weba', '.wav', '.flac')
+    return sorted(paths, key=lambda path: os.path.splitext(path)[1].lower() in audio_exts)
+
+
+class PostProcessPool:
+    """The CPU-bound stage between a finished transfer and a finished file
+
+    `workers` threads run submitted calls, each typically waiting on an
+    ffmpeg process, so no more transcodes compete for the cores than there
+    are cores. Up to `max_pending` calls wait in a FIFO queue; submit()
+    blocks while it is full. That is the backpressure: if post-processing
+    falls behind, download slots wait to hand over their files instead of
+    piling raw streams up on disk.
+    """
+    def __init__(self, workers: int, max_pending: int, metrics=None):
+        self.workers = max(1, workers)
+        self.max_pending = max(1, max_pending)
+        self.metrics = metrics
+        self._cond = threading.Condition()
+        self._queue: Deque[Tuple[float, Callable, tuple]] = deque()
+        self._running = 0
+        self._closed = False
+        self._threads: List[threading.Thread] = []
+        for _ in range(self.workers):
+            thread = threading.Thread(target=self._worker, daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    @property
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._queue)
+
+    @property
+    def running(self) -> int:
+        with self._cond:
+            return self._running
+
+    def submit(self, fn: Callable, *args) -> bool:
+        """Queue a call, waiting while the queue is full; False if the pool is closed"""
+        with self._cond:
+            if len(self._queue) >= self.max_pending and not self._closed:
+                waited = time.perf_counter()
+                self._cond.wait_for(lambda: len(self._queue) < self.max_pending or self._closed)
+                if self.metrics is not None:
+                    self.metrics.record('postprocess_backpressure', time.perf_counter() - waited)
+            if self._closed:
+                return False
+            self._queue.append((time.perf_counter(), fn, args))
+            self._cond.notify_all()
+            return True
+
+    def shutdown(self):
+        """Stop taking calls and drop the waiting ones; running calls finish"""
+        with self._cond:
+            self._closed = True
+            self._queue.clear()
+            self._cond.notify_all()
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._queue or self._closed)
+                if self._closed:
+                    return
+                queued, fn, args = self._queue.popleft()
+                self._running += 1
+                # A slot opened up for a waiting submit()
+                self._cond.notify_all()
+            if self.metrics is not None:
+                self.metrics.record('postprocess_wait', time.perf_counter() - queued)
+            try:
+                fn(*args)
+            except Exception as e:
+                logger.error(f"Error in post-processing: {e}")
+            finally:
+                with self._cond:
+                    self._running -= 1
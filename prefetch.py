@@ -0,0 +1,101 @@
+import threading
+import logging
+from collections import OrderedDict, deque
+from typing import Any, Callable, Deque, Iterable, List, Tuple
+
+logger = logging.getLogger('VideoDownloader')
+
+
+class PrefetchQueue:
+    """Pending work keyed by item, handed out urgent-first
+
+    Items wait in the order they were pushed. prioritize() names the items
+    that matter right now (rows on screen, the next downloads); those are
+    popped first, in the order given, until the next prioritize() call
+    replaces them. Reprioritizing costs as much as the urgent list is long,
+    however many items are waiting. Not thread-safe; callers hold their
+    own lock.
+    """
+    def __init__(self):
+        self._pending: 'OrderedDict[Any, Any]' = OrderedDict()
+        self._urgent: Deque[Any] = deque()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def __contains__(self, key) -> bool:
+        return key in self._pending
+
+    def push(self, key, value=None):
+        self._pending[key] = value
+
+    def discard(self, key):
+        self._pending.pop(key, None)
+
+    def prioritize(self, keys: Iterable[Any]):
+        self._urgent = deque(keys)
+
+    def pop(self) -> Tuple[Any, Any]:
+        """Remove and return the most urgent (key, value); raises KeyError when empty"""
+        while self._urgent:
+            key = self._urgent.popleft()
+            if key in self._pending:
+                return key, self._pending.pop(key)
+        return self._pending.popitem(last=False)
+
+
+class PrefetchExecutor:
+    """Fixed pool of threads that runs submitted calls urgent-first
+
+    Like a ThreadPoolExecutor with at most `max_workers` calls running, but
+    waiting calls are keyed (one per key; resubmitting replaces the call)
+    and can be reordered with prioritize().
+    """
+    def __init__(self, max_workers: int):
+        self._cond = threading.Condition()
+        self._queue = PrefetchQueue()
+        self._closed = False
+        self._threads: List[threading.Thread] = []
+        for _ in range(max(1, max_workers)):
+            thread = threading.Thread(target=self._worker, daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def submit(self, key, fn: Callable, *args):
+        with self._cond:
+            if self._closed:
+                return
+            self._queue.push(key, (fn, args))
+            self._cond.notify()
+
+    def cancel(self, key):
+        """Drop a call that hasn't started yet"""
+        with self._cond:
+            self._queue.discard(key)
+
+    def prioritize(self, keys: Iterable[Any]):
+        with self._cond:
+            self._queue.prioritize(keys)
+
+    def shutdown(self, wait: bool = False):
+        """Stop taking calls and drop the waiting ones; running calls finish"""
+        with self._cond:
+            self._closed = True
+            self._queue = PrefetchQueue()
+            self._cond.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                _, (fn, args) = self._queue.pop()
+            try:
+                fn(*args)
+            except Exception as e:
+                logger.error(f"Error in prefetch task: {e}")
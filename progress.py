@@ -0,0 +1,174 @@
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+# yt-dlp progress template; every field is printed raw so it can be parsed
+# back without depending on yt-dlp's human-readable formatting
+PROGRESS_PREFIX = "[progress]"
+PROGRESS_TEMPLATE = (
+    f"download:{PROGRESS_PREFIX} %(progress.downloaded_bytes)s %(progress.total_bytes)s "
+    "%(progress.total_bytes_estimate)s %(progress.speed)s %(progress.eta)s %(progress.fragment_count)s"
+)
+# Lines printed with --print at the post_process and after_move stages: the
+# first marks the end of the transfer, the second carries the final file path
+POSTPROCESS_PREFIX = "[postprocess]"
+POSTPROCESS_TEMPLATE = f"post_process:{POSTPROCESS_PREFIX} %(id)s"
+FILEPATH_PREFIX = "[filepath]"
+FILEPATH_TEMPLATE = f"after_move:{FILEPATH_PREFIX} %(filepath)s"
+# Codecs of each stream a staged download writes ("none" for a missing track)
+STREAM_PREFIX = "[stream]"
+STREAM_TEMPLATE = f"after_move:{STREAM_PREFIX} %(vcodec)s %(acodec)s"
+# Output prefixes of yt-dlp post-processors that run after the transfer
+POSTPROCESSOR_PREFIXES = ("[Merger]", "[ExtractAudio]", "[VideoConvertor]", "[VideoRemuxer]",
+                          "[FixupM3u8]", "[FixupM4a]", "[FixupStretched]", "[FixupDuplicateMoov]")
+
+
+def _number(value: str) -> Optional[float]:
+    try:
+        return float(value)
+    except ValueError:
+        return None  # yt-dlp prints NA for unknown fields
+
+
+def parse_progress_line(line: str) -> Optional[Dict[str, Optional[float]]]:
+    """Parse a line printed with PROGRESS_TEMPLATE, or return None"""
+    if not line.startswith(PROGRESS_PREFIX):
+        return None
+    fields = line[len(PROGRESS_PREFIX):].split()
+    if len(fields) != 6:
+        return None
+    downloaded, total, estimate, speed, eta, fragments = (_number(field) for field in fields)
+    return {
+        'downloaded': downloaded,
+        'total': total if total is not None else estimate,
+        'speed': speed,
+        'eta': eta,
+        'fragments': fragments,  # None unless the stream is downloaded in fragments
+    }
+
+
+def is_postprocessing_line(line: str) -> bool:
+    """Check if a yt-dlp output line shows that post-processing started"""
+    return line.startswith(POSTPROCESS_PREFIX) or line.startswith(POSTPROCESSOR_PREFIXES)
+
+
+def parse_filepath_line(line: str) -> Optional[str]:
+    """Return the path from a line printed with FILEPATH_TEMPLATE, or None"""
+    if not line.startswith(FILEPATH_PREFIX):
+        return None
+    return line[len(FILEPATH_PREFIX):].strip() or None
+
+
+def parse_stream_line(line: str) -> Optional[Tuple[str, str]]:
+    """Return the video and audio codec from a line printed with STREAM_TEMPLATE, or None"""
+    if not line.startswith(STREAM_PREFIX):
+        return None
+    fields = line[len(STREAM_PREFIX):].split()
+    if len(fields) != 2:
+        return None
+    return fields[0], fields[1]
+
+
+def format_bytes(size: Optional[float]) -> str:
+    """Format a byte count for display"""
+    if size is None:
+        return "?"
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if size < 1024:
+            return f"{size:.1f} {unit}" if unit != "B" else f"{int(size)} B"
+        size /= 1024
+    return f"{size:.1f} TiB"
+
+
+def format_eta(seconds: Optional[float]) -> str:
+    """Format a number of seconds as [h:]mm:ss"""
+    if seconds is None:
+        return "?"
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}:{(seconds % 3600) // 60:02d}:{seconds % 60:02d}"
+    return f"{seconds // 60}:{seconds % 60:02d}"
+
+
+class ProgressState:
+    """Latest known progress of one download"""
+    def __init__(self):
+        self.downloaded: Optional[float] = None
+        self.total: Optional[float] = None
+        self.speed: Optional[float] = None
+        self.eta: Optional[float] = None
+        self.updated_at: float = 0.0
+
+    @property
+    def percent(self) -> Optional[float]:
+        if self.downloaded is None or not self.total:
+            return None
+        return min(100.0, self.downloaded * 100.0 / self.total)
+
+    def describe(self) -> str:
+        """Short status text, e.g. '45.2% at 2.3 MiB/s'"""
+        percent = self.percent
+        text = f"{percent:.1f}%" if percent is not None else format_bytes(self.downloaded)
+        if self.speed:
+            text += f" at {format_bytes(self.speed)}/s"
+        return text
+
+
+class ProgressTable:
+    """Latest progress per job, written by workers and drained by the UI
+
+    Workers overwrite their job's entry as often as yt-dlp prints. The UI
+    calls take_dirty() at its own frame rate and only sees the jobs that
+    changed since the last call, each at its newest state.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._states: Dict[Any, ProgressState] = {}
+        self._dirty = set()
+
+    def update(self, job, downloaded: Optional[float] = None, total: Optional[float] = None,
+               speed: Optional[float] = None, eta: Optional[float] = None):
+        with self._lock:
+            state = self._states.get(job)
+            if state is None:
+                state = self._states[job] = ProgressState()
+            state.downloaded = downloaded
+            state.total = total
+            state.speed = speed
+            state.eta = eta
+            state.updated_at = time.monotonic()
+            self._dirty.add(job)
+
+    def remove(self, job):
+        """Forget a finished job, including any update not yet drained"""
+        with self._lock:
+            self._states.pop(job, None)
+            self._dirty.discard(job)
+
+    def get(self, job) -> Optional[ProgressState]:
+        with self._lock:
+            return self._states.get(job)
+
+    def take_dirty(self) -> List[Tuple[Any, ProgressState]]:
+        """Return the jobs updated since the last call with their current state"""
+        with self._lock:
+            dirty = [(job, self._states[job]) for job in self._dirty]
+            self._dirty = set()
+            return dirty
+
+    def totals(self) -> Dict[str, float]:
+        """Return combined figures over all active jobs
+
+        Keys: active (job count), speed (bytes/s), remaining (bytes left on
+        jobs with a known size) and average_size (mean known job size).
+        """
+        with self._lock:
+            states = list(self._states.values())
+        sizes = [state.total for state in states if state.total]
+        remaining = sum(state.total - (state.downloaded or 0) for state in states if state.total)
+        return {
+            'active': len(states),
+            'speed': sum(state.speed or 0 for state in states),
+            'remaining': max(0.0, remaining),
+            'average_size': sum(sizes) / len(sizes) if sizes else 0.0,
+        }
@@ -0,0 +1,140 @@
+import re
+import time
+import random
+import threading
+import logging
+from collections import deque
+from typing import Callable, Deque, Dict, Optional
+
+logger = logging.getLogger('VideoDownloader')
+
+# Failure classes, from the error text yt-dlp printed
+TRANSIENT = "transient"  # worth retrying soon: timeouts, resets, server errors
+RATE_LIMITED = "rate_limited"  # the site is pushing back; retry later and slower
+PERMANENT = "permanent"  # retrying can't help: gone, private, unsupported
+
+RATE_LIMITED_PATTERN = re.compile(
+    r"HTTP Error 429|Too Many Requests|HTTP Error 403|rate[- ]limit|confirm you.re not a bot|"
+    r"try again later|temporarily blocked", re.IGNORECASE)
+PERMANENT_PATTERN = re.compile(
+    r"Video unavailable|Private video|has been removed|account .* terminated|HTTP Error 404|HTTP Error 410|"
+    r"Unsupported URL|is not a valid URL|members[- ]only|Join this channel|copyright|"
+    r"Requested format is not available|This video is not available|Sign in to confirm your age|"
+    r"No video formats found", re.IGNORECASE)
+
+
+def classify_error(text: str) -> str:
+    """Sort a yt-dlp error into TRANSIENT, RATE_LIMITED or PERMANENT
+
+    Rate limiting wins over everything else, since a throttled site also
+    fails extraction in ways that look permanent. Errors nobody recognises
+    are treated as transient and get the normal, bounded retries.
+    """
+    if RATE_LIMITED_PATTERN.search(text or ''):
+        return RATE_LIMITED
+    if PERMANENT_PATTERN.search(text or ''):
+        return PERMANENT
+    return TRANSIENT
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Seconds to wait before retry number `attempt` (from 0), with full jitter
+
+    The delay is drawn uniformly from [0, min(cap, base * 2**attempt)], so
+    jobs that failed together don't all come back at the same moment.
+    """
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class SiteBreaker:
+    """Per-site concurrency limits that back off while a site pushes back
+
+    Every attempt on a site is recorded with its outcome. A rate-limited
+    failure, or a failure rate of at least `failure_rate` over the last
+    `window` attempts, trips the site: its limit is halved and it cools
+    down for `cooldown` seconds, doubling with each trip in a row. After
+    `recovery` successes in a row the limit grows by one again, until it is
+    back at the configured limit. Permanent failures say nothing about the
+    site's health and are ignored. Limits are applied through `apply_limit`.
+    """
+    def __init__(self, limits: Dict[str, int], default_limit: int,
+                 apply_limit: Callable[[str, int], None], window: int = 20,
+                 failure_rate: float = 0.5, cooldown: float = 60, max_cooldown: float = 900,
+                 recovery: int = 5):
+        self.base_limits = dict(limits)
+        self.default_limit = default_limit
+        self.apply_limit = apply_limit
+        self.window = window
+        self.failure_rate = failure_rate
+        self.cooldown_seconds = cooldown
+        self.max_cooldown = max_cooldown
+        self.recovery = recovery
+
+        self._lock = threading.Lock()
+        self._limits: Dict[str, int] = {}
+        self._outcomes: Dict[str, Deque[bool]] = {}
+        self._open_until: Dict[str, float] = {}
+        self._trips: Dict[str, int] = {}
+        self._streak: Dict[str, int] = {}
+
+    def base_limit(self, site: str) -> int:
+        return self.base_limits.get(site, self.default_limit)
+
+    def set_base_limit(self, site: str, limit: int) -> int:
+        """Change the limit a site recovers to; returns the limit that applies now"""
+        with self._lock:
+            self.base_limits[site] = max(1, limit)
+            if site in self._limits:
+                self._limits[site] = min(self._limits[site], self.base_limits[site])
+            return self._limits.get(site, self.base_limits[site])
+
+    def limit(self, site: str) -> int:
+        with self._lock:
+            return self._limits.get(site, self.base_limit(site))
+
+    def cooldown(self, site: str) -> float:
+        """Seconds until a tripped site should be tried again; 0 if it's healthy"""
+        with self._lock:
+            return max(0.0, self._open_until.get(site, 0.0) - time.monotonic())
+
+    def record(self, site: str, failure: Optional[str] = None):
+        """Count one attempt on a site; `failure` is None for a success, else its class"""
+        if failure == PERMANENT:
+            return
+        new_limit = None
+        with self._lock:
+            outcomes = self._outcomes.setdefault(site, deque(maxlen=self.window))
+            outcomes.append(failure is not None)
+            limit = self._limits.get(site, self.base_limit(site))
+            if failure is None:
+                self._streak[site] = self._streak.get(site, 0) + 1
+                if self._streak[site] >= self.recovery and limit < self.base_limit(site):
+                    self._streak[site] = 0
+                    new_limit = limit + 1
+                    if new_limit >= self.base_limit(site):
+                        self._trips.pop(site, None)
+            else:
+                self._streak[site] = 0
+                failing = len(outcomes) >= self.window // 2 and \
+                    sum(outcomes) / len(outcomes) >= self.failure_rate
+                if failure == RATE_LIMITED or failing:
+                    new_limit = self._trip(site, limit)
+            if new_limit is not None:
+                self._limits[site] = new_limit
+        if new_limit is not None and new_limit != limit:
+            logger.info(f"Concurrency for {site} is now {new_limit} (was {limit})")
+            self.apply_limit(site, new_limit)
+
+    def _trip(self, site: str, limit: int) -> int:
+        """Open the breaker for a site (lock held) and return its lowered limit"""
+        now = time.monotonic()
+        if self._open_until.get(site, 0.0) > now:
+            # Already cooling down; failures of attempts that started earlier don't count again
+            return limit
+        trips = self._trips.get(site, 0)
+        self._trips[site] = trips + 1
+        cooldown = min(self.max_cooldown, self.cooldown_seconds * 2 ** trips)
+        self._open_until[site] = now + cooldown
+        self._outcomes[site].clear()
+        logger.warning(f"{site} is failing or rate limiting; pausing it for {cooldown:.0f}s")
+        return max(1, limit // 2)
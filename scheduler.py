@@ -0,0 +1,213 @@
+import threading
+import logging
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger('VideoDownloader')
+
+
+class DownloadScheduler:
+    """Fixed-size worker pool that runs queued downloads in queue order
+
+    The scheduler does not copy jobs into a private queue. Every pick walks the
+    shared job list, so reordering it changes what runs next and jobs appended
+    while a run is active are picked up by the next free worker. While a
+    producer holds the run open (see hold()), running out of jobs doesn't end
+    it, so jobs that are still being listed are picked up as they arrive.
+    """
+    def __init__(self, jobs: List[Any], run_job: Callable[[Any], None],
+                 site_of: Callable[[Any], str], max_workers: int = 4,
+                 site_limits: Optional[Dict[str, int]] = None,
+                 on_idle: Optional[Callable[[], None]] = None):
+        self.jobs = jobs
+        self.run_job = run_job
+        self.site_of = site_of
+        self.max_workers = max(1, max_workers)
+        self.site_limits: Dict[str, int] = dict(site_limits or {})
+        self.on_idle = on_idle
+
+        self._cond = threading.Condition()
+        self._running = False
+        self._threads: List[threading.Thread] = []
+        self._seen = set()  # jobs already started in this run
+        self._active_sites: Dict[str, int] = {}
+        self._active = 0
+        self._scan_from = 0  # every job before this index has been started
+        self._holds = 0  # producers that may still add jobs
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    @property
+    def waiting(self) -> int:
+        """Number of jobs in the list not yet started in this run"""
+        with self._cond:
+            return max(0, len(self.jobs) - len(self._seen))
+
+    @property
+    def active(self) -> int:
+        """Number of jobs running right now"""
+        with self._cond:
+            return self._active
+
+    def upcoming(self, count: int) -> List[Any]:
+        """Return up to `count` jobs in the order they would start, ignoring site limits"""
+        with self._cond:
+            index = self._scan_from if self._running else 0
+            seen = self._seen if self._running else set()
+            result = []
+            while len(result) < count and index < len(self.jobs):
+                job = self.jobs[index]
+                if job not in seen:
+                    result.append(job)
+                index += 1
+            return result
+
+    def start(self):
+        """Start a run over every job currently in (or later added to) the list"""
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+            self._seen = set()
+            self._active_sites = {}
+            self._active = 0
+            self._scan_from = 0
+            self._threads = []
+            self._spawn_workers()
+
+    def stop(self):
+        """Stop handing out new jobs; jobs already running are left to finish"""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+
+    def notify(self, index: int = 0):
+        """Tell the scheduler the job list changed at or after `index`
+
+        Call this after adding, removing or reordering jobs so idle workers wake
+        up and the next pick rescans from the changed position.
+        """
+        with self._cond:
+            self._scan_from = max(0, min(self._scan_from, index))
+            self._cond.notify_all()
+
+    def hold(self):
+        """Keep the run open until a matching release(), even if the list runs dry"""
+        with self._cond:
+            self._holds += 1
+
+    def release(self):
+        """Drop a hold taken with hold(); the run ends once nothing is left"""
+        with self._cond:
+            self._holds = max(0, self._holds - 1)
+            self._cond.notify_all()
+
+    def requeue(self, job, delay: float, index: int = 0):
+        """Start a job again `delay` seconds from now, in the same run
+
+        The run is held open while the job waits. `index` is a hint where the
+        job sits in the list, so the next pick doesn't rescan from the top.
+        """
+        self.hold()
+
+        def ready():
+            with self._cond:
+                self._seen.discard(job)
+                self._scan_from = max(0, min(self._scan_from, index))
+                self._cond.notify_all()
+            self.release()
+
+        timer = threading.Timer(delay, ready)
+        timer.daemon = True
+        timer.start()
+
+    def set_max_workers(self, max_workers: int):
+        """Change the global concurrency limit, effective from the next pick"""
+        with self._cond:
+            self.max_workers = max(1, max_workers)
+            if self._running:
+                self._spawn_workers()
+            self._cond.notify_all()
+
+    def set_site_limit(self, site: str, limit: int):
+        """Change the concurrency limit for one site"""
+        with self._cond:
+            self.site_limits[site] = max(1, limit)
+            self._cond.notify_all()
+
+    def _spawn_workers(self):
+        self._threads = [t for t in self._threads if t.is_alive()]
+        while len(self._threads) < self.max_workers:
+            thread = threading.Thread(target=self._worker, daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def _site_has_capacity(self, site: str) -> bool:
+        limit = self.site_limits.get(site)
+        return limit is None or self._active_sites.get(site, 0) < limit
+
+    def _next_job(self):
+        """Return the first unstarted job whose site has a free slot
+
+        Must be called with the lock held. Returns (job, site, blocked) where
+        blocked is True if unstarted jobs exist but all of them are held back
+        by their site limit.
+        """
+        first_unseen = None
+        index = self._scan_from
+        while True:
+            try:
+                job = self.jobs[index]
+            except IndexError:
+                break
+            if job not in self._seen:
+                if first_unseen is None:
+                    first_unseen = index
+                site = self.site_of(job)
+                if self._site_has_capacity(site):
+                    self._scan_from = first_unseen
+                    return job, site, False
+            index += 1
+
+        self._scan_from = first_unseen if first_unseen is not None else index
+        return None, None, first_unseen is not None
+
+    def _worker(self):
+        while True:
+            finished = False
+            with self._cond:
+                while True:
+                    if not self._running:
+                        return
+                    if self._active < self.max_workers:
+                        job, site, blocked = self._next_job()
+                        if job is not None:
+                            break
+                        if not blocked and self._active == 0 and self._holds == 0:
+                            # Nothing running and nothing left to start: the run is over
+                            self._running = False
+                            self._cond.notify_all()
+                            finished = True
+                            break
+                    self._cond.wait()
+
+                if not finished:
+                    self._seen.add(job)
+                    self._active += 1
+                    self._active_sites[site] = self._active_sites.get(site, 0) + 1
+
+            if finished:
+                if self.on_idle:
+                    self.on_idle()
+                return
+
+            try:
+                self.run_job(job)
+            except Exception as e:
+                logger.error(f"Unhandled error in download worker: {e}")
+            finally:
+                with self._cond:
+                    self._active -= 1
+                    self._active_sites[site] -= 1
+                    self._cond.notify_all()
@@ -0,0 +1,31 @@
+import time
+import logging
+from typing import List, Tuple
+
+logger = logging.getLogger('VideoDownloader')
+
+
+class StartupTimer:
+    """Named points in the launch, for the --measure-startup report
+
+    Times count from when this module was first imported, which main.py
+    does before anything else.
+    """
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.marks: List[Tuple[str, float]] = []
+
+    def mark(self, name: str):
+        self.marks.append((name, time.perf_counter()))
+
+    def report(self) -> str:
+        """One line per mark: time spent since the previous mark and since launch"""
+        lines = []
+        previous = self.started
+        for name, at in self.marks:
+            lines.append(f"{name:<24} {(at - previous) * 1000:8.1f} ms {(at - self.started) * 1000:10.1f} ms total")
+            previous = at
+        return '\n'.join(lines)
+
+
+startup_timer = StartupTimer()
@@ -0,0 +1,165 @@
+import os
+import errno
+import shutil
+import threading
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger('VideoDownloader')
+
+
+def _format_size(fmt: Dict[str, Any], duration: Optional[float]) -> Optional[float]:
+    """A format's size in bytes: reported, approximated by yt-dlp, or from its bitrate"""
+    size = fmt.get('filesize') or fmt.get('filesize_approx')
+    if size:
+        return size
+    if fmt.get('tbr') and duration:
+        return fmt['tbr'] * 1000 / 8 * duration
+    return None
+
+
+def estimate_size(info_dict: Dict[str, Any], audio_only: bool = False,
+                  max_height: Optional[int] = None) -> Optional[int]:
+    """Estimate the bytes a download will take from yt-dlp's format list
+
+    Takes the largest video format within `max_height` plus the largest
+    audio-only format, which errs on the side of too much rather than too
+    little. Returns None when nothing in the metadata gives a size.
+    """
+    duration = info_dict.get('duration')
+    audio_sizes, video_sizes = [], []
+    for fmt in info_dict.get('formats') or []:
+        size = _format_size(fmt, duration)
+        if size is None:
+            continue
+        if fmt.get('vcodec') == 'none':
+            if fmt.get('acodec') not in (None, 'none'):
+                audio_sizes.append(size)
+        elif max_height is None or not fmt.get('height') or fmt['height'] <= max_height:
+            video_sizes.append(size)
+
+    if audio_only and audio_sizes:
+        return int(max(audio_sizes))
+    if video_sizes:
+        return int(max(video_sizes) + max(audio_sizes, default=0))
+    size = info_dict.get('filesize') or info_dict.get('filesize_approx')
+    return int(size) if size else None
+
+
+class DiskBudget:
+    """Admission control for downloads by the disk space they will need
+
+    A download is admitted only if every filesystem it writes to (the
+    staging directory and the save directory, once each if they share a
+    filesystem) has its estimated size free, after `reserve` bytes and the
+    space admitted downloads haven't written yet. Downloads without an
+    estimate count as `unknown_size`. The space still owed on the
+    filesystem a download writes to shrinks as it reports progress.
+    """
+    def __init__(self, reserve: int, unknown_size: int):
+        self.reserve = reserve
+        self.unknown_size = unknown_size
+        self._lock = threading.Lock()
+        # Job key -> (filesystem devices, the written one first; estimated bytes; bytes written)
+        self._jobs: Dict[Any, Tuple[List[int], float, float]] = {}
+
+    @property
+    def busy(self) -> bool:
+        """Whether any admitted download still holds space"""
+        with self._lock:
+            return bool(self._jobs)
+
+    def admit(self, key, paths: List[str], size: Optional[int]) -> bool:
+        """Reserve space for a download writing to `paths`, the one it writes to first
+
+        Returns False, reserving nothing, if any of the filesystems is short.
+        """
+        size = size or self.unknown_size
+        devices: Dict[int, str] = {}
+        for path in paths:
+            devices.setdefault(os.stat(path).st_dev, path)
+        with self._lock:
+            for device, path in devices.items():
+                owed = self._owed(device)
+                free = shutil.disk_usage(path).free
+                if free - self.reserve - owed < size:
+                    logger.info(f"Not enough space for {size} more bytes in {path}: "
+                                f"{free} free, {owed:.0f} owed to running downloads")
+                    return False
+            self._jobs[key] = (list(devices), float(size), 0.0)
+            return True
+
+    def update(self, key, written: float):
+        """Record how much a download has written to the first of its paths so far"""
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None:
+                self._jobs[key] = (job[0], job[1], written)
+
+    def release(self, key):
+        """Give back whatever a download still holds"""
+        with self._lock:
+            self._jobs.pop(key, None)
+
+    def _owed(self, device: int) -> float:
+        """Bytes admitted downloads have yet to write to a filesystem (lock held)"""
+        owed = 0.0
+        for devices, size, written in self._jobs.values():
+            if device == devices[0]:
+                owed += max(0.0, size - written)
+            elif device in devices:
+                owed += size
+        return owed
+
+
+def _place(source: str, target: str):
+    """Give `source` the name `target`, failing with FileExistsError if it is taken
+
+    A hard link claims the name atomically; on filesystems without hard
+    links the name is checked first and then renamed onto.
+    """
+    try:
+        os.link(source, target)
+    except FileExistsError:
+        raise
+    except OSError as e:
+        if e.errno == errno.EXDEV:
+            raise
+        if os.path.exists(target):
+            raise FileExistsError(errno.EEXIST, "File exists", target)
+        os.replace(source, target)
+        return
+    os.remove(source)
+
+
+def publish(path: str, directory: str) -> str:
+    """Move a finished file into `directory` so it appears there complete or not at all
+
+    Within one filesystem the file is only renamed. Across filesystems it
+    is copied under a hidden name next to its destination first. A file
+    already in `directory` under the same name is never replaced:
+    FileExistsError is raised (with that file as its filename) and `path`
+    is left where it is. Returns the new path.
+    """
+    target = os.path.join(directory, os.path.basename(path))
+    if os.path.exists(target):
+        raise FileExistsError(errno.EEXIST, "File exists", target)
+    try:
+        _place(path, target)
+        return target
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+
+    temp_path = os.path.join(directory, f".{os.path.basename(path)}.publishing")
+    try:
+        shutil.copyfile(path, temp_path)
+        with open(temp_path, 'rb') as temp_file:
+            os.fsync(temp_file.fileno())
+        _place(temp_path, target)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    os.remove(path)
+    return target
@@ -0,0 +1,94 @@
+import os
+import re
+import hashlib
+import threading
+import logging
+from io import BytesIO
+from typing import Optional, Tuple
+
+logger = logging.getLogger('VideoDownloader')
+
+
+class ThumbnailStore:
+    """Persistent store of list-sized thumbnails
+
+    Files are named after the video ID and a hash of the source URL, so a
+    thumbnail is fresh for as long as its URL doesn't change and a lookup is a
+    single stat. Only the resized rendition is kept. Once the store grows past
+    `max_bytes` the least recently used files are deleted. PIL is imported,
+    and the directory sized up, only when the first thumbnail is stored.
+    """
+    def __init__(self, directory: str, size: Tuple[int, int] = (90, 50),
+                 max_bytes: int = 50 * 1024 * 1024):
+        self.directory = directory
+        self.size = size
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+        self._total_bytes: Optional[int] = None
+
+    def path_for(self, video_id: str, thumbnail_url: str) -> str:
+        """Return the store path for a video's thumbnail"""
+        url_hash = hashlib.sha1(thumbnail_url.encode('utf-8')).hexdigest()[:16]
+        safe_id = re.sub(r'[^A-Za-z0-9_-]', '_', video_id)[:64]
+        return os.path.join(self.directory, f"{safe_id}-{url_hash}.jpg")
+
+    def get(self, video_id: str, thumbnail_url: str) -> Optional[str]:
+        """Return the stored thumbnail path, or None if it isn't stored"""
+        path = self.path_for(video_id, thumbnail_url)
+        try:
+            # Bump the mtime so eviction sees the file as recently used
+            os.utime(path)
+        except OSError:
+            return None
+        return path
+
+    def put(self, video_id: str, thumbnail_url: str, data: bytes) -> str:
+        """Resize downloaded image data, store it and return its path"""
+        from PIL import Image
+        img = Image.open(BytesIO(data))
+        # Let the JPEG decoder downscale while decoding instead of decoding full size
+        img.draft('RGB', (self.size[0] * 2, self.size[1] * 2))
+        img = img.convert('RGB').resize(self.size, Image.LANCZOS)
+
+        with self._lock:
+            if self._total_bytes is None:
+                os.makedirs(self.directory, exist_ok=True)
+                self._total_bytes = sum(entry.stat().st_size for entry in os.scandir(self.directory)
+                                        if entry.is_file())
+
+        path = self.path_for(video_id, thumbnail_url)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        img.save(tmp_path, 'JPEG', quality=90)
+        size = os.path.getsize(tmp_path)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._total_bytes += size
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+        return path
+
+    def _evict(self):
+        """Delete least recently used files down to 90% of the budget (lock held)"""
+        entries = []
+        for entry in os.scandir(self.directory):
+            try:
+                if entry.is_file():
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+            except OSError:
+                continue
+        entries.sort()
+
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError as e:
+                logger.error(f"Error evicting thumbnail {path}: {e}")
+        self._total_bytes = total
@@ -0,0 +1,86 @@
+import re
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from typing import Dict, Optional, Pattern, Tuple
+
+URL_PATTERNS = {
+    'youtube': r'(?:youtube\.com\/(?:[^\/]+\/.+\/|(?:v|e(?:mbed)?)\/|.*[?&]v=)|youtu\.be\/)([^"&?\/\s]{11})',
+    'vimeo': r'vimeo\.com\/(\d+)',
+    'facebook': r'facebook\.com\/.*\/videos\/(\d+)',
+    'twitter': r'twitter\.com\/.*\/status\/(\d+)',
+    'instagram': r'instagram\.com\/p\/([a-zA-Z0-9_-]+)'
+}
+COMPILED_PATTERNS: Dict[str, Pattern] = {platform: re.compile(pattern)
+                                         for platform, pattern in URL_PATTERNS.items()}
+
+
+def _combine_patterns(patterns: Dict[str, str]) -> Pattern:
+    """Join the per-platform patterns into one alternation
+
+    Each pattern's ID group is renamed after its platform, so a single search
+    tells both which platform matched (`lastgroup`) and the video ID.
+    """
+    alternatives = []
+    for platform, pattern in patterns.items():
+        named = re.sub(r'(?<!\\)\((?!\?)', f'(?P<{platform}>', pattern, count=1)
+        alternatives.append(f'(?:{named})')
+    return re.compile('|'.join(alternatives))
+
+
+# One pass over a URL instead of one search per platform
+COMBINED_PATTERN = _combine_patterns(URL_PATTERNS)
+VALID_LINK_PATTERN = re.compile(r'^https?://(www\.)?(youtube|youtu\.be|vimeo|dailymotion|facebook|twitter|instagram).*')
+# Query parameters that never change which video a URL points to
+IGNORED_QUERY_PARAMS = {'si', 'feature', 'fbclid'}
+
+
+def is_valid_link(link: str) -> bool:
+    """Check if a URL is valid"""
+    # Improved URL validation to support more platforms
+    return VALID_LINK_PATTERN.match(link) is not None
+
+
+def is_playlist(url: str) -> bool:
+    """Check if URL is a playlist"""
+    return "playlist" in url or "list=" in url
+
+
+def match_video(link: str) -> Optional[Tuple[str, str]]:
+    """Return the (platform, video ID) pair identifying a URL, if it has one"""
+    match = COMBINED_PATTERN.search(link)
+    if match:
+        return match.lastgroup, match.group(match.lastgroup)
+    return None
+
+
+def extract_video_id(link: str) -> str:
+    """Extract video ID from URL"""
+    match = match_video(link)
+    # Default to full link
+    return match[1] if match else link
+
+
+def get_site(link: str) -> str:
+    """Return the URL_PATTERNS platform a URL belongs to, or 'other'"""
+    match = match_video(link)
+    return match[0] if match else 'other'
+
+
+def canonical_url(link: str) -> str:
+    """Return a key that is equal for all URLs pointing at the same video
+
+    Known platforms are keyed by platform and video ID, so short links, embed
+    links and links with timestamps collapse to one key. Anything else falls
+    back to a normalized URL.
+    """
+    match = match_video(link)
+    if match:
+        return f"{match[0]}:{match[1]}"
+
+    parts = urlsplit(link.strip())
+    host = (parts.hostname or '').lower()
+    for prefix in ('www.', 'm.'):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+    query = sorted((key, value) for key, value in parse_qsl(parts.query)
+                   if not key.startswith('utm_') and key not in IGNORED_QUERY_PARAMS)
+    return urlunsplit(('https', host, parts.path.rstrip('/'), urlencode(query), ''))
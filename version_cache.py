@@ -0,0 +1,88 @@
+import os
+import json
+import time
+import threading
+import logging
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger('VideoDownloader')
+
+
+class VersionCache:
+    """yt-dlp version checks remembered between launches
+
+    The installed version is stored with the executable's size and mtime
+    and only probed again once the file changes. The latest release is
+    fetched at most once per `ttl` seconds, and then as a conditional
+    request with the stored ETag, so an unchanged release costs a 304 with
+    no body. The file is read on first use, not when the cache is created.
+    """
+    def __init__(self, path: str, ttl: float):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._data: Optional[Dict[str, Any]] = None
+
+    def installed(self, exe_path: str, probe: Callable[[], Optional[str]]) -> Optional[str]:
+        """Return the installed version, calling probe() only if the executable changed"""
+        try:
+            stat = os.stat(exe_path)
+        except OSError:
+            return None
+        signature = [exe_path, stat.st_size, stat.st_mtime]
+        with self._lock:
+            data = self._load()
+            if data.get('installed_signature') == signature and data.get('installed'):
+                return data['installed']
+        version = probe()
+        if version is not None:
+            with self._lock:
+                data = self._load()
+                data['installed_signature'] = signature
+                data['installed'] = version
+                self._save(data)
+        return version
+
+    def latest(self, fetch: Callable[[Optional[str]], Tuple[Optional[str], Optional[str]]],
+               force: bool = False) -> str:
+        """Return the latest release tag
+
+        fetch(etag) requests the release and returns (tag, etag), with tag
+        None when the server answered 304 Not Modified.
+        """
+        with self._lock:
+            data = self._load()
+            fresh = time.time() - data.get('latest_checked_at', 0) < self.ttl
+            if fresh and not force and data.get('latest'):
+                return data['latest']
+            etag = data.get('latest_etag') if data.get('latest') else None
+        tag, new_etag = fetch(etag)
+        with self._lock:
+            data = self._load()
+            if tag is None:
+                tag = data['latest']
+            else:
+                data['latest'] = tag
+                data['latest_etag'] = new_etag
+            data['latest_checked_at'] = time.time()
+            self._save(data)
+        return tag
+
+    def _load(self) -> Dict[str, Any]:
+        if self._data is None:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as cache_file:
+                    self._data = json.load(cache_file)
+            except (OSError, ValueError):
+                self._data = {}
+        return self._data
+
+    def _save(self, data: Dict[str, Any]):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as cache_file:
+                json.dump(data, cache_file)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.error(f"Error saving yt-dlp version cache: {e}")
@@ -0,0 +1,437 @@
+import json
+import time
+import functools
+import threading
+import importlib.util
+import multiprocessing
+import logging
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger('VideoDownloader')
+
+WORKER_START_TIMEOUT = 30  # seconds a new worker may take to import yt_dlp
+WORKER_STOP_TIMEOUT = 2  # seconds a worker gets to exit before it is terminated
+PROGRESS_MESSAGE_INTERVAL = 0.1  # seconds between progress messages of a download
+MAX_CACHED_INSTANCES = 4  # YoutubeDL objects, with their HTTP sessions, each worker keeps
+ERROR_LINES_KEPT = 20
+# Options every YoutubeDL in a worker gets; output goes to messages, not the console
+BASE_PARAMS = {'quiet': True, 'noprogress': True, 'no_warnings': True}
+# Options that change from one download to the next (the proxy URL names the job); they are
+# set on a cached YoutubeDL per call instead of keying the cache
+PER_CALL_PARAMS = ('outtmpl', 'proxy', 'ratelimit', 'concurrent_fragment_downloads')
+
+
+# Fields format selection adds to an info dict; dropped before formats are selected again
+FORMAT_SELECTION_FIELDS = ('requested_formats', 'requested_downloads', 'format_id', 'url', 'protocol')
+
+
+def resolved_format_ids(info: Dict[str, Any]) -> List[str]:
+    """IDs of the formats yt-dlp picked for an info dict, one per stream"""
+    return [f['format_id'] for f in info.get('requested_formats') or [info]]
+
+
+def without_format_selection(info: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of an extracted info dict that formats can be selected from again"""
+    return {key: value for key, value in info.items() if key not in FORMAT_SELECTION_FIELDS}
+
+
+class WorkerError(Exception):
+    """A worker could not be started or died mid-request"""
+
+
+class YtdlpError(Exception):
+    """yt-dlp reported an error for a request"""
+
+
+def ytdlp_module_available() -> bool:
+    """Check if the yt_dlp package can be imported, without importing it"""
+    return importlib.util.find_spec('yt_dlp') is not None
+
+
+class _Worker:
+    def __init__(self, process, conn, version: str):
+        self.process = process
+        self.conn = conn
+        self.version = version
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(WORKER_STOP_TIMEOUT)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.conn.close()
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.terminate()
+        self.conn.close()
+
+
+class YtdlpWorkerPool:
+    """Long-lived worker processes that run yt_dlp in-process
+
+    Starting the yt-dlp executable costs an interpreter start and importing
+    every extractor on each call. Workers pay that once and then serve
+    requests over a pipe, keeping recently used YoutubeDL objects (and with
+    them their HTTP connections) alive between requests.
+
+    run() sends one request to an idle worker, starting a new one while fewer
+    than `size` exist, and blocks until it is done. Everything the worker
+    reports on the way (metadata records, playlist entries, download
+    progress) is handed to `on_message` as a dict with a 'type' key.
+    Workers are spawned, never forked, so they don't inherit the GUI's
+    threads or sockets.
+    """
+    def __init__(self, size: int):
+        self.size = max(1, size)
+        self.version: Optional[str] = None
+        self._context = multiprocessing.get_context('spawn')
+        self._cond = threading.Condition()
+        self._idle: List[_Worker] = []
+        self._count = 0
+        self._closed = False
+        self._failed: Optional[str] = None  # why workers can't start, once that is known
+
+    @property
+    def available(self) -> bool:
+        return not self._closed and self._failed is None
+
+    def resize(self, size: int):
+        """Change how many workers may exist; extra idle ones are stopped"""
+        with self._cond:
+            self.size = max(1, size)
+            surplus = []
+            while self._idle and self._count > self.size:
+                surplus.append(self._idle.pop())
+                self._count -= 1
+            self._cond.notify_all()
+        for worker in surplus:
+            worker.stop()
+
+    def run(self, request: Dict[str, Any], on_message: Optional[Callable[[Dict[str, Any]], None]] = None) -> Any:
+        """Run a request on a worker and return its result
+
+        Raises YtdlpError when yt-dlp fails the request and WorkerError when
+        no worker could run it.
+        """
+        worker = self._checkout()
+        try:
+            worker.conn.send(request)
+            while True:
+                message = worker.conn.recv()
+                kind = message.get('type')
+                if kind == 'done':
+                    return message.get('result')
+                if kind == 'error':
+                    raise YtdlpError(message.get('error') or "Unknown error")
+                if on_message is not None:
+                    try:
+                        on_message(message)
+                    except Exception as e:
+                        # The worker is mid-request; keep reading so the pipe stays in step
+                        logger.error(f"Error handling yt-dlp worker message: {e}")
+        except (EOFError, OSError) as e:
+            worker.kill()
+            worker = None
+            raise WorkerError(f"yt-dlp worker exited: {e}")
+        finally:
+            self._checkin(worker)
+
+    def close(self):
+        """Stop the idle workers; busy ones stop when their request returns"""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._count -= len(idle)
+            self._cond.notify_all()
+        for worker in idle:
+            worker.stop()
+
+    def _checkout(self) -> _Worker:
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise WorkerError("yt-dlp worker pool is closed")
+                if self._failed is not None:
+                    raise WorkerError(self._failed)
+                if self._idle:
+                    return self._idle.pop()
+                if self._count < self.size:
+                    self._count += 1
+                    break
+                self._cond.wait()
+        try:
+            return self._start_worker()
+        except Exception:
+            with self._cond:
+                self._count -= 1
+                self._cond.notify_all()
+            raise
+
+    def _checkin(self, worker: Optional[_Worker]):
+        with self._cond:
+            if worker is not None and not self._closed and self._count <= self.size:
+                self._idle.append(worker)
+            else:
+                self._count -= 1
+                if worker is not None:
+                    threading.Thread(target=worker.stop, daemon=True).start()
+            self._cond.notify_all()
+
+    def _start_worker(self) -> _Worker:
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        process.start()
+        child_conn.close()
+        try:
+            if not parent_conn.poll(WORKER_START_TIMEOUT):
+                raise WorkerError("yt-dlp worker did not start in time")
+            hello = parent_conn.recv()
+        except (EOFError, OSError, WorkerError) as e:
+            process.terminate()
+            parent_conn.close()
+            raise WorkerError(f"yt-dlp worker failed to start: {e}")
+        if hello.get('type') != 'ready':
+            process.join(WORKER_STOP_TIMEOUT)
+            parent_conn.close()
+            # yt_dlp itself is missing or broken; don't keep trying
+            self._failed = hello.get('error') or "yt-dlp worker failed to start"
+            raise WorkerError(self._failed)
+        self.version = hello.get('version')
+        logger.info(f"Started yt-dlp worker {process.pid} (yt_dlp {self.version})")
+        return _Worker(process, parent_conn, self.version)
+
+
+# Everything below runs inside the worker processes
+
+class _MessageLog:
+    """yt-dlp logger that keeps the last error lines for error reports"""
+    def __init__(self):
+        self.errors: List[str] = []
+
+    def debug(self, message: str):
+        pass
+
+    def info(self, message: str):
+        pass
+
+    def warning(self, message: str):
+        pass
+
+    def error(self, message: str):
+        self.errors = (self.errors + [message])[-ERROR_LINES_KEPT:]
+
+
+class _Extractor:
+    """Serves requests in a worker process with yt_dlp already imported"""
+    def __init__(self, yt_dlp, conn):
+        self.yt_dlp = yt_dlp
+        self.conn = conn
+        self.log = _MessageLog()
+        self._instances: 'OrderedDict[str, Any]' = OrderedDict()
+        self._in_place: Optional[bool] = None  # see _can_update_in_place()
+        self._downloading = False
+        self._staged = False  # downloading raw streams; yt-dlp's own post-processing isn't reported
+        self._progress_sent = 0.0
+
+    def handle(self, request: Dict[str, Any]):
+        op = request.get('op')
+        try:
+            if op == 'version':
+                result = self.yt_dlp.version.__version__
+            elif op == 'extract':
+                result = self.extract(request['urls'], request.get('params') or {})
+            elif op == 'playlist':
+                result = self.list_playlist(request['url'], request.get('params') or {})
+            elif op == 'download':
+                result = self.download(request['url'], request.get('params') or {})
+            elif op == 'download_streams':
+                result = self.download_streams(request['url'], request.get('params') or {})
+            else:
+                raise ValueError(f"Unknown request: {op}")
+            self.conn.send({'type': 'done', 'result': result})
+        except Exception as e:
+            self.conn.send({'type': 'error', 'error': str(e) or type(e).__name__})
+        finally:
+            self._downloading = False
+            self._staged = False
+
+    def close(self):
+        for ydl in self._instances.values():
+            ydl.close()
+        self._instances.clear()
+
+    def _ydl(self, params: Dict[str, Any]):
+        """Return a YoutubeDL for these options, reusing a recent one if possible"""
+        per_call = PER_CALL_PARAMS if self._can_update_in_place() else ()
+        session_params = {name: value for name, value in params.items() if name not in per_call}
+        key = json.dumps(session_params, sort_keys=True, default=str)
+        ydl = self._instances.pop(key, None)
+        if ydl is None:
+            ydl = self.yt_dlp.YoutubeDL(dict(BASE_PARAMS, **session_params, logger=self.log,
+                                             progress_hooks=[self._on_progress],
+                                             postprocessor_hooks=[self._on_postprocess]))
+        self._instances[key] = ydl
+        while len(self._instances) > MAX_CACHED_INSTANCES:
+            _, old = self._instances.popitem(last=False)
+            old.close()
+        if per_call:
+            self._apply_call_params(ydl, params)
+        return ydl
+
+    def _can_update_in_place(self) -> bool:
+        """Whether this yt_dlp still has the internals _apply_call_params() relies on
+
+        Without them, per-call options key the cache like the rest, which
+        costs a new YoutubeDL per download but never runs one with the
+        previous job's proxy or output template.
+        """
+        if self._in_place is None:
+            cls = self.yt_dlp.YoutubeDL
+            self._in_place = callable(getattr(cls, '_parse_outtmpl', None)) and all(
+                isinstance(getattr(cls, name, None), functools.cached_property)
+                for name in ('proxies', '_request_director'))
+            if not self._in_place:
+                logger.warning("This yt_dlp can't change the proxy or output template of a YoutubeDL; "
+                               "downloads get a new one each")
+        return self._in_place
+
+    def _apply_call_params(self, ydl, params: Dict[str, Any]):
+        """Set this call's PER_CALL_PARAMS on a cached YoutubeDL, clearing the last call's"""
+        for name in ('ratelimit', 'concurrent_fragment_downloads'):
+            if name in params:
+                ydl.params[name] = params[name]
+            else:
+                ydl.params.pop(name, None)
+        # YoutubeDL expands the template into one per file type when it is created
+        ydl.params['outtmpl'] = {'default': params['outtmpl']} if 'outtmpl' in params else {}
+        ydl._parse_outtmpl()
+        if params.get('proxy') != ydl.params.get('proxy'):
+            if 'proxy' in params:
+                ydl.params['proxy'] = params['proxy']
+            else:
+                ydl.params.pop('proxy', None)
+            # The proxy is baked into the request handlers, built on first use; only they
+            # are rebuilt, the extractors and cookies stay warm
+            if '_request_director' in ydl.__dict__:
+                ydl.__dict__.pop('_request_director').close()
+            ydl.__dict__.pop('proxies', None)
+
+    def extract(self, urls: List[str], params: Dict[str, Any]) -> int:
+        """Send an 'info' or 'url_error' message per URL; returns how many resolved"""
+        ydl = self._ydl(dict(params, skip_download=True, noplaylist=True))
+        resolved = 0
+        for url in urls:
+            try:
+                info = ydl.extract_info(url, download=False)
+            except self.yt_dlp.utils.DownloadError as e:
+                self.conn.send({'type': 'url_error', 'url': url, 'error': str(e)})
+                continue
+            self.conn.send({'type': 'info', 'url': url, 'info': ydl.sanitize_info(info)})
+            resolved += 1
+        return resolved
+
+    def list_playlist(self, url: str, params: Dict[str, Any]) -> int:
+        """Send an 'entry' message per playlist entry as the extractor yields it"""
+        ydl = self._ydl(dict(params, skip_download=True, extract_flat='in_playlist'))
+        info = ydl.extract_info(url, download=False, process=False)
+        # A video URL with a list= parameter resolves to the playlist in a second step
+        if info.get('_type') in ('url', 'url_transparent'):
+            info = ydl.extract_info(info['url'], download=False, process=False, ie_key=info.get('ie_key'))
+        entries = info.get('entries')
+        if entries is None:
+            entries = [info]
+        elif hasattr(entries, 'getslice'):
+            entries = entries.getslice()
+        count = 0
+        for entry in entries:
+            if not entry:
+                continue
+            self.conn.send({'type': 'entry', 'entry': {field: entry.get(field)
+                                                       for field in ('id', 'url', 'webpage_url', 'title')}})
+            count += 1
+        return count
+
+    def download(self, url: str, params: Dict[str, Any]) -> Optional[str]:
+        """Download a video, sending progress; returns the final file path"""
+        ydl = self._ydl(params)
+        self.log.errors = []
+        self._downloading = True
+        self._progress_sent = 0.0
+        try:
+            info = ydl.extract_info(url, download=True)
+        except self.yt_dlp.utils.DownloadError as e:
+            raise YtdlpError('\n'.join(self.log.errors) or str(e))
+        downloads = info.get('requested_downloads') or [info]
+        return downloads[-1].get('filepath') or info.get('filepath')
+
+    def download_streams(self, url: str, params: Dict[str, Any]) -> List[str]:
+        """Download the streams params['format'] selects as separate files, unmerged
+
+        Formats are resolved once with the selector as given; the formats it
+        picked (e.g. video and audio of a bestvideo+bestaudio selector) are
+        then downloaded one after the other from the same extraction, so
+        merging is left to the caller. Returns the downloaded file paths.
+        """
+        ydl = self._ydl(params)
+        info = ydl.sanitize_info(ydl.extract_info(url, download=False))
+        ydl = self._ydl(dict(params, format=','.join(resolved_format_ids(info))))
+        self.log.errors = []
+        self._downloading = True
+        # Each stream runs yt-dlp's per-file post-processors (moving, fixups) as it finishes,
+        # the first one before the next stream starts; the transfer only ends with the last
+        self._staged = True
+        self._progress_sent = 0.0
+        try:
+            info = ydl.process_ie_result(without_format_selection(info), download=True)
+        except self.yt_dlp.utils.DownloadError as e:
+            raise YtdlpError('\n'.join(self.log.errors) or str(e))
+        return [download.get('filepath') for download in info.get('requested_downloads') or [info]
+                if download.get('filepath')]
+
+    def _on_progress(self, status: Dict[str, Any]):
+        if not self._downloading or status.get('status') != 'downloading':
+            return
+        now = time.monotonic()
+        if now - self._progress_sent < PROGRESS_MESSAGE_INTERVAL:
+            return
+        self._progress_sent = now
+        self.conn.send({
+            'type': 'progress',
+            'downloaded': status.get('downloaded_bytes'),
+            'total': status.get('total_bytes') or status.get('total_bytes_estimate'),
+            'speed': status.get('speed'),
+            'eta': status.get('eta'),
+            'fragments': status.get('fragment_count'),
+        })
+
+    def _on_postprocess(self, status: Dict[str, Any]):
+        if self._downloading and not self._staged and status.get('status') == 'started':
+            self.conn.send({'type': 'postprocess', 'postprocessor': status.get('postprocessor')})
+
+
+def _worker_main(conn):
+    try:
+        import yt_dlp
+    except Exception as e:
+        conn.send({'type': 'error', 'error': f"yt_dlp can't be imported: {e}"})
+        conn.close()
+        return
+    conn.send({'type': 'ready', 'version': yt_dlp.version.__version__})
+    extractor = _Extractor(yt_dlp, conn)
+    try:
+        while True:
+            try:
+                request = conn.recv()
+            except EOFError:
+                break
+            if request is None:
+                break
+            extractor.handle(request)
+    finally:
+        extractor.close()
+        conn.close()